@@ -0,0 +1,367 @@
+"""
+Batch generation of many posters, e.g. one per student for a class set.
+
+A manifest lists the posters to make:
+
+    {
+        "defaults": {"num_digits": 200, "formats": ["pdf", "png"], "title": "π in Indian Scripts"},
+        "seeds": [1, 2, 3],
+        "jobs": [{"seed": 314, "num_digits": 430, "title": "Room 12", "name": "room12"}]
+    }
+
+Every entry of "seeds" becomes a job with the defaults; "jobs" entries
+override them. Job fields: seed, num_digits, title, formats (pdf, svg, png,
+webp, tex, json), dpi, shape and name (the output file stem, by default
+pi_<digits>_seed<seed>).
+
+Jobs are rendered across a process pool. The workers are forked from a
+process that has already loaded the digits and fonts when the platform
+allows it (they are otherwise loaded once per worker), and outputs go to a
+directory or a zip file. In a directory every file is written atomically
+and a job whose files all exist is skipped, so an interrupted or partly
+failed batch is resumed by running it again; batch_report.json lists what
+was done and what failed.
+
+Usage:
+    python batch.py manifest.json --out posters/
+    python batch.py --seeds 1-300 --formats pdf,png --out posters/
+    python batch.py manifest.json --zip posters.zip
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import zipfile
+import concurrent.futures
+from concurrent.futures import as_completed
+
+import digit_store
+from main import (
+    MAX_DIGITS, MIN_DIGITS, LEFT_RIGHT_MARGIN_PT, calculate_grid_dimensions, build_pi_grid, generate_grid_latex,
+    get_pi_digits,
+)
+from numeral_scripts import NUMERAL_SCRIPTS, SCRIPT_NAMES, script_font
+from shape_masks import shape_names
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("pdf", "svg", "png", "webp", "tex", "json")
+DEFAULT_JOB = {
+    "num_digits": 200,
+    "title": "π in Indian Scripts",
+    "formats": ["pdf"],
+    "dpi": 150,
+    "shape": "pi",
+}
+REPORT_NAME = "batch_report.json"
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def expand_manifest(manifest):
+    """
+    The list of complete, validated jobs in a manifest (see the module
+    docstring). Raises ValueError on unknown fields or formats, missing
+    seeds or duplicate names.
+    """
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    defaults = {**DEFAULT_JOB, **manifest.get("defaults", {})}
+    entries = [{"seed": seed} for seed in manifest.get("seeds", [])] + list(manifest.get("jobs", []))
+
+    jobs, names = [], set()
+    for entry in entries:
+        job = {**defaults, **entry}
+        unknown = set(job) - set(DEFAULT_JOB) - {"seed", "name"}
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        try:
+            job["seed"] = int(job["seed"])
+            job["num_digits"] = int(job["num_digits"])
+            job["dpi"] = int(job["dpi"])
+        except KeyError:
+            raise ValueError("Every job needs a seed (so the batch can be reproduced and resumed)")
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid seed, num_digits or dpi in job {entry}")
+        job["title"] = str(job["title"])
+        if isinstance(job["formats"], str):
+            job["formats"] = job["formats"].split(",")
+        job["formats"] = [fmt.strip().lower() for fmt in job["formats"]]
+        bad = [fmt for fmt in job["formats"] if fmt not in FORMATS]
+        if bad or not job["formats"]:
+            raise ValueError(f"Unknown formats {bad}; choose from {', '.join(FORMATS)}")
+        if job["shape"] not in shape_names():
+            raise ValueError(f"Unknown shape {job['shape']!r}")
+        if not MIN_DIGITS <= job["num_digits"] <= MAX_DIGITS:
+            raise ValueError(f"num_digits must be between {MIN_DIGITS} and {MAX_DIGITS} (use main.py --book for more)")
+        job["name"] = str(job.get("name") or f"pi_{job['num_digits']}_seed{job['seed']}")
+        if not _NAME_PATTERN.match(job["name"]):
+            raise ValueError(f"Invalid output name {job['name']!r}")
+        if job["name"] in names:
+            raise ValueError(f"Duplicate output name {job['name']!r}")
+        names.add(job["name"])
+        jobs.append(job)
+    return jobs
+
+
+def output_names(job):
+    return [f"{job['name']}.{fmt}" for fmt in job["formats"]]
+
+
+def render_job(job):
+    """{file name: bytes} for every format of one job."""
+    import vector_render
+    import raster_render
+
+    rows, cols = calculate_grid_dimensions(job["num_digits"])
+    pi_grid = build_pi_grid(rows, cols, job["seed"], shape=job["shape"])
+    files = {}
+    for fmt in job["formats"]:
+        name = f"{job['name']}.{fmt}"
+        if fmt == "pdf":
+            files[name] = vector_render.render_pdf(pi_grid, job["title"])
+        elif fmt == "svg":
+            files[name] = vector_render.render_svg(pi_grid, job["title"]).encode("utf-8")
+        elif fmt in ("png", "webp"):
+            files[name] = raster_render.render_raster(pi_grid, fmt, job["title"], dpi=job["dpi"])
+        elif fmt == "tex":
+            files[name] = generate_grid_latex(pi_grid, job["title"]).encode("utf-8")
+        elif fmt == "json":
+            files[name] = "".join(pi_grid.iter_json(job["num_digits"])).encode("utf-8")
+    return files
+
+
+def _run_job(job):
+    # Runs in a worker: errors are returned, not raised, so one bad job
+    # never stops the batch
+    start = time.perf_counter()
+    try:
+        return job["name"], render_job(job), None, time.perf_counter() - start
+    except Exception as e:  # Reported per job
+        return job["name"], None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+def warm_up(jobs=()):
+    """
+    Load what every job needs into this process: the digits (from the digit
+    store or the Chudnovsky series), the font files and metrics, and the glyph tiles of
+    each raster resolution used (when they fit in the tile cache).
+    """
+    import font_files
+    import raster_render
+    from poster_layout import PosterLayout
+
+    digit_store.get_store()
+    get_pi_digits(max([job["num_digits"] for job in jobs] + [MAX_DIGITS]))
+    for script in SCRIPT_NAMES:
+        start = NUMERAL_SCRIPTS[script]
+        path = font_files.resolve_font_file(script_font(script), False, tuple(range(start, start + 10)))
+        if path:
+            font_files.load_font(path)
+    # The tiles depend on the grid size and dpi; draw them per combination
+    for num_digits, dpi in {(job["num_digits"], job["dpi"]) for job in jobs
+                            if {"png", "webp"} & set(job["formats"])}:
+        rows, cols = calculate_grid_dimensions(num_digits)
+        raster = raster_render.RasterLayout(PosterLayout(rows, cols, LEFT_RIGHT_MARGIN_PT), dpi)
+        raster_render.warm_glyphs(raster.cell_px, raster.font_px)
+
+
+def make_pool(workers=None, jobs=()):
+    """
+    Process pool for render_job. Forked from this (warmed-up) process when
+    it has a single thread, so workers share the loaded digits and fonts;
+    otherwise (e.g. in the threaded server) each worker loads them once.
+    """
+    import multiprocessing  # Only needed once a pool is made
+    workers = workers or os.cpu_count() or 1
+    if "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+        warm_up(jobs)
+        return concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+    context = multiprocessing.get_context("spawn")
+    return concurrent.futures.ProcessPoolExecutor(workers, mp_context=context, initializer=warm_up,
+                                                  initargs=(list(jobs),))
+
+
+def iter_results(jobs, workers=None, pool=None):
+    """
+    Yield (name, {file name: bytes} or None, error or None, seconds) for
+    every job as it finishes. workers=1 renders in this process.
+    """
+    if not jobs:
+        return
+    if workers == 1 and pool is None:
+        for job in jobs:
+            yield _run_job(job)
+        return
+    own_pool = pool is None
+    if own_pool:
+        pool = make_pool(min(workers or os.cpu_count() or 1, len(jobs)), jobs)
+    try:
+        futures = [pool.submit(_run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        if own_pool:
+            pool.shutdown(cancel_futures=True)
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def run_to_directory(jobs, out_dir, workers=None, resume=True, progress=None):
+    """
+    Render jobs into out_dir, skipping (with resume) jobs whose files all
+    exist. progress(done, total, name, error, seconds) is called as each
+    job finishes. Writes and returns the report:
+    {"done": [...], "skipped": [...], "failed": {name: error}}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    report = {"done": [], "skipped": [], "failed": {}}
+    pending = []
+    for job in jobs:
+        if resume and all(os.path.exists(os.path.join(out_dir, name)) for name in output_names(job)):
+            report["skipped"].append(job["name"])
+        else:
+            pending.append(job)
+
+    for count, (name, files, error, seconds) in enumerate(iter_results(pending, workers), 1):
+        if error is None:
+            for file_name, data in files.items():
+                _write_atomic(os.path.join(out_dir, file_name), data)
+            report["done"].append(name)
+        else:
+            report["failed"][name] = error
+        if progress:
+            progress(count, len(pending), name, error, seconds)
+
+    _write_atomic(os.path.join(out_dir, REPORT_NAME), json.dumps(report, indent=2).encode("utf-8"))
+    return report
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Write-only, unseekable stream collecting what zipfile writes."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(jobs, workers=None, pool=None, progress=None):
+    """
+    Yield a zip archive of every job's files in chunks, one per finished
+    job, followed by batch_report.json; nothing is held beyond one job.
+    """
+    out = _ChunkWriter()
+    report = {"done": [], "skipped": [], "failed": {}}
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for count, (name, files, error, seconds) in enumerate(iter_results(jobs, workers, pool), 1):
+            if error is None:
+                for file_name, data in files.items():
+                    archive.writestr(file_name, data)
+                report["done"].append(name)
+            else:
+                report["failed"][name] = error
+            if progress:
+                progress(count, len(jobs), name, error, seconds)
+            yield out.take()
+        archive.writestr(REPORT_NAME, json.dumps(report, indent=2))
+    yield out.take()
+
+
+def parse_seeds(text):
+    """Seeds from "1-300", "1,5,9" or a mix such as "1-10,42"."""
+    seeds = []
+    for part in text.split(","):
+        if "-" in part.strip()[1:]:
+            first, last = part.rsplit("-", 1)
+            seeds.extend(range(int(first), int(last) + 1))
+        elif part.strip():
+            seeds.append(int(part))
+    return seeds
+
+
+def _print_progress(done, total, name, error, seconds):
+    status = "ok" if error is None else f"FAILED ({error})"
+    print(f"[{done}/{total}] {name} {status} ({seconds:.2f}s)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render many pi posters in parallel from a manifest.")
+    parser.add_argument("manifest", nargs="?", help="Manifest JSON file (see batch.py)")
+    parser.add_argument("--seeds", help="Seeds to add as jobs with the defaults, e.g. 1-300 or 1,5,9")
+    parser.add_argument("--digits", type=int, help="Default number of digits (default: 200)")
+    parser.add_argument("--formats", help="Default formats, e.g. pdf,png (default: pdf)")
+    parser.add_argument("--title", help="Default title")
+    parser.add_argument("--dpi", type=int, help="Default image resolution (default: 150)")
+    parser.add_argument("--out", help="Output directory")
+    parser.add_argument("--zip", help="Write a zip file instead of a directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-resume", action="store_true", help="Render jobs even if their files exist")
+    args = parser.parse_args(argv)
+
+    manifest = {}
+    if args.manifest:
+        with open(args.manifest, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest, list):
+            manifest = {"jobs": manifest}
+    defaults = dict(manifest.get("defaults", {}))
+    for field, value in (("num_digits", args.digits), ("formats", args.formats), ("title", args.title),
+                         ("dpi", args.dpi)):
+        if value is not None:
+            defaults[field] = value
+    manifest = {**manifest, "defaults": defaults}
+    if args.seeds:
+        manifest["seeds"] = list(manifest.get("seeds", [])) + parse_seeds(args.seeds)
+    if not args.out and not args.zip:
+        parser.error("give --out DIRECTORY or --zip FILE")
+
+    try:
+        jobs = expand_manifest(manifest)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{len(jobs)} posters, {sum(len(job['formats']) for job in jobs)} files", file=sys.stderr)
+
+    start = time.perf_counter()
+    if args.zip:
+        with open(args.zip, "wb") as f:
+            for chunk in iter_zip(jobs, args.workers, progress=_print_progress):
+                f.write(chunk)
+        print(f"Wrote {args.zip} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        return 0
+
+    report = run_to_directory(jobs, args.out, args.workers, not args.no_resume, _print_progress)
+    print(f"{len(report['done'])} rendered, {len(report['skipped'])} already done, "
+          f"{len(report['failed'])} failed in {time.perf_counter() - start:.1f}s "
+          f"(see {os.path.join(args.out, REPORT_NAME)})", file=sys.stderr)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Time to turn a grid's digit values and script ids into display characters:
+per cell with chr() (the old convert_digit and row_chars), per row with
+str.translate, and for the whole grid with one NumPy fancy-index into
+numeral_scripts.GLYPHS.
+
+Usage: python benchmarks/bench_conversion.py [repeat]
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numeral_scripts import NUMERAL_SCRIPTS, SCRIPT_NAMES, GLYPHS, DIGIT_TABLES
+
+SIZES = [(25, 18), (300, 300), (1000, 1000)]
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def per_cell(digits, script_ids):
+    starts = [NUMERAL_SCRIPTS[script] for script in SCRIPT_NAMES]
+    return [[chr(starts[s] + d) if d < 10 else "." for d, s in zip(row_d, row_s)]
+            for row_d, row_s in zip(digits.tolist(), script_ids.tolist())]
+
+
+LATIN = np.frombuffer(b"0123456789.", dtype=np.uint8)
+
+
+def per_row_translate(digits, script_ids):
+    # Each row in the script of its first cell, as when converting text in one script
+    return [LATIN[row_d].tobytes().decode("ascii").translate(DIGIT_TABLES[SCRIPT_NAMES[row_s[0]]])
+            for row_d, row_s in zip(digits, script_ids)]
+
+
+def fancy_index(digits, script_ids):
+    return GLYPHS[script_ids, digits].tolist()
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rng = np.random.default_rng(0)
+    print(f"{'grid':>11} {'per cell':>10} {'translate':>10} {'fancy idx':>10}")
+    for rows, cols in SIZES:
+        digits = rng.integers(0, 10, (rows, cols), dtype=np.uint8)
+        script_ids = rng.integers(0, len(SCRIPT_NAMES), (rows, cols), dtype=np.uint8)
+        assert per_cell(digits, script_ids) == fancy_index(digits, script_ids)
+        times = [best_of(lambda: func(digits, script_ids), repeat) for func in (per_cell, per_row_translate, fancy_index)]
+        print(f"{rows:>5}x{cols:<5} " + " ".join(f"{t * 1e3:>8.2f}ms" for t in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Time the script-assignment engines of create_pi_grid.
+
+Usage: python benchmarks/bench_grid_engine.py [rows cols]
+"""
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import grid_engine
+from main import create_pi_grid, SCRIPT_IDS, SCRIPT_NAMES
+
+
+def best_of(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    rows, cols = (int(arg) for arg in sys.argv[1:3]) if len(sys.argv) > 2 else (316, 316)
+    fixed = {(0, 0): SCRIPT_IDS["Latin"], (0, 1): SCRIPT_IDS["Latin"]}
+    num_scripts = len(SCRIPT_NAMES)
+
+    print(f"{rows}x{cols} grid ({rows * cols} cells)")
+    # The legacy loop includes digit lookup and masking, so time it end to end
+    python_time = best_of(lambda: create_pi_grid(rows, cols, 1), repeat=1)
+    engine_python = python_time - best_of(lambda: create_pi_grid(rows, cols, 1, engine="fast"))
+    compat_time = best_of(lambda: grid_engine.assign_scripts_compat(rows, cols, num_scripts, fixed, random.Random(1)))
+    fast_time = best_of(lambda: grid_engine.assign_scripts_fast(rows, cols, num_scripts, fixed, np.random.default_rng(1)))
+    print(f"  python loop (assignment only, approx): {engine_python:.4f}s")
+    print(f"  compat engine: {compat_time:.4f}s ({engine_python / compat_time:.1f}x)")
+    print(f"  fast engine:   {fast_time:.4f}s ({engine_python / fast_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Size, cell count and generation time of the LaTeX poster source in the
+inline style (\\fontspec and \\fontsize in every cell), with per-font
+cell macros, and with one TikZ scope per font; plus the xelatex compile
+time of each when xelatex is installed.
+
+Usage: python benchmarks/bench_latex.py [repeat]
+"""
+import io
+import os
+import re
+import sys
+import shutil
+import timeit
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_jobs import compile_latex
+from main import build_pi_grid, generate_grid_latex
+
+STYLES = {
+    "inline": dict(style="inline"),
+    "macros": dict(style="macros"),
+    "scopes": dict(style="macros", group_by_script=True),
+}
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    has_xelatex = shutil.which("xelatex") is not None
+    if not has_xelatex:
+        print("xelatex not found; skipping the LaTeX compiles")
+
+    for rows, cols in ((10, 20), (40, 60), (100, 100)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            pi_grid = build_pi_grid(rows, cols, seed=1)
+        print(f"{rows}x{cols} grid")
+        baseline = None
+        for label, options in STYLES.items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                latex_code = generate_grid_latex(pi_grid, **options)
+                generate = best_of(lambda: generate_grid_latex(pi_grid, **options), repeat)
+            size = len(latex_code.encode("utf-8"))
+            baseline = baseline or size
+            fonts = latex_code.count(r"\fontspec{") + latex_code.count(r"\newfontfamily")
+            cells = len(re.findall(r"^(\\node at|\\[dh]c[a-zP]*\{)", latex_code, re.M))
+            line = (f"  {label:7} {size / 1024:8.1f} KiB ({size / baseline:4.0%})  {cells} cells, "
+                    f"{fonts} font switches, generated in {generate:.4f}s")
+            if has_xelatex:
+                line += f", compiled in {best_of(lambda: compile_latex(latex_code), repeat):.2f}s"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
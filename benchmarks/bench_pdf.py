@@ -0,0 +1,63 @@
+"""
+PDF latency of the legacy compile (two xelatex passes, full preamble), the
+fast one (single pass with the precompiled preamble format) and the native
+vector renderer (no LaTeX).
+
+Usage: python benchmarks/bench_pdf.py [repeat]
+"""
+import io
+import os
+import sys
+import shutil
+import timeit
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import latex_format
+import vector_render
+from pdf_jobs import compile_latex
+from main import build_digit_grid, generate_grid_latex
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    for num_digits in (200, 430):
+        with contextlib.redirect_stdout(io.StringIO()):
+            pi_grid = build_digit_grid(num_digits, seed=1)
+            first = best_of(lambda: vector_render.render_pdf(pi_grid), 1)
+            warm = best_of(lambda: vector_render.render_pdf(pi_grid), repeat)
+            svg = best_of(lambda: vector_render.render_svg(pi_grid), repeat)
+        print(f"{num_digits} digits, vector renderer")
+        print(f"  PDF (first, loads fonts): {first:.4f}s")
+        print(f"  PDF:                      {warm:.4f}s")
+        print(f"  SVG:                      {svg:.4f}s")
+
+    if shutil.which("xelatex") is None:
+        print("xelatex not found; skipping the LaTeX compiles")
+        return
+
+    latex_format.warm_fonts()
+    for num_digits in (200, 430):
+        with contextlib.redirect_stdout(io.StringIO()):
+            latex_code = generate_grid_latex(build_digit_grid(num_digits, seed=1))
+        # Build the format outside the timed runs, as the server does at start
+        _, dumpable, name = latex_format.prepare_source(latex_code)
+        has_format = latex_format.get_format(dumpable, name) is not None
+
+        legacy = best_of(lambda: compile_latex(latex_code, passes=2, fast=False), repeat)
+        single = best_of(lambda: compile_latex(latex_code, fast=False), repeat)
+        fast = best_of(lambda: compile_latex(latex_code, fast=True), repeat)
+        print(f"{num_digits} digits")
+        print(f"  two passes (before):        {legacy:.3f}s")
+        print(f"  single pass:                {single:.3f}s ({legacy / single:.1f}x)")
+        print(f"  single pass + format{'' if has_format else ' (unavailable)'}: {fast:.3f}s ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compare the Chudnovsky digit generator against the mpmath.mp.pi path.
+
+Usage: python benchmarks/bench_pi_digits.py [digit counts...]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mpmath
+from pi_stream import ChudnovskySeries, iter_pi_digits
+
+
+def time_call(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def mpmath_digits(n):
+    with mpmath.workdps(n + 10):
+        return str(mpmath.mp.pi)[:n + 1]
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'digits':>10} {'mpmath':>10} {'stream':>10} {'resume 2x':>10} {'fresh 2x':>10}")
+    for n in counts:
+        mp_time, mp_result = time_call(lambda: mpmath_digits(n))
+        stream_time, stream_result = time_call(lambda: "".join(iter_pi_digits(n)))
+        assert stream_result == mp_result, f"digit mismatch at n={n}"
+
+        # Extending a checkpoint from n to 2n versus computing 2n from scratch
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = os.path.join(tmp, "series.ckpt")
+            ChudnovskySeries(checkpoint).digits(n)
+            resume_time, _ = time_call(lambda: ChudnovskySeries(checkpoint).digits(2 * n))
+        fresh_time, _ = time_call(lambda: ChudnovskySeries().digits(2 * n))
+
+        print(f"{n:>10} {mp_time:>9.3f}s {stream_time:>9.3f}s {resume_time:>9.3f}s {fresh_time:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
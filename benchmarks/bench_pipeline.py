@@ -0,0 +1,233 @@
+"""
+Time and peak memory of every stage of the poster pipeline, from 10 to
+10^6 digits: the pi digits, the grid dimensions, the pi-shape mask, the
+grid per sampling strategy (legacy loop, fast and counter engines), the LaTeX and
+JSON output, and the Flask endpoints through the test client.
+
+Each stage is timed (best of --repeat runs), then run once more under
+tracemalloc for its peak allocation. Stages too slow for a size are skipped
+(see MAX_DIGITS_PER_STAGE). Results can be saved and compared with an
+earlier run; the script exits with status 1 if a stage got more than
+--tolerance slower or larger than the baseline, or if an endpoint misses
+its budget in ENDPOINT_BUDGETS.
+
+Usage:
+    python benchmarks/bench_pipeline.py --save baseline.json
+    (make changes)
+    python benchmarks/bench_pipeline.py --compare baseline.json
+
+    Options: --sizes 10,430,10000  --repeat 3  --tolerance 0.5  --stages latex,endpoint
+"""
+import io
+import os
+import sys
+import json
+import timeit
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digit_store
+from main import (
+    MAX_DIGITS, calculate_grid_dimensions, generate_pi_shape_mask, get_pi_digits, create_pi_grid,
+    build_pi_grid, generate_grid_latex, generate_json_data,
+)
+from numeral_scripts import SCRIPT_NAMES
+from shape_masks import shape_mask
+from book_layout import BookLayout
+
+DEFAULT_SIZES = [10, 100, 430, 10 ** 4, 10 ** 5, 10 ** 6]
+STRATEGIES = ["random", "least_used", "weighted"]
+WEIGHTS = {script: 1.0 + i % 3 for i, script in enumerate(SCRIPT_NAMES)}
+
+# Largest digit count each stage is run at: the legacy per-cell loop is far
+# too slow beyond 10^4 cells, and the endpoints cap the grid at MAX_DIGITS.
+# Without a digit store, computing 10^6 digits takes over ten seconds.
+MAX_DIGITS_PER_STAGE = {
+    "get_pi_digits": 10 ** 5,
+    "create_pi_grid[python,": 10 ** 4,
+    "generate_json_data": MAX_DIGITS,
+    "endpoint ": MAX_DIGITS,
+    "endpoint /generate_book": 10 ** 5,
+}
+
+# Seconds an endpoint may take at poster sizes (<= MAX_DIGITS digits) on a
+# cold cache, whatever the baseline says
+ENDPOINT_BUDGETS = {
+    "endpoint /generate_pi_data": 0.25,
+    "endpoint /generate_pi_data?format=compact": 0.25,
+    "endpoint /generate_latex": 0.25,
+    "endpoint /generate_svg": 0.5,
+}
+
+# Differences below these are noise, whatever the tolerance
+MIN_TIME_DIFF = 0.002
+MIN_MEMORY_DIFF = 1 << 20
+
+
+def grid_size(num_digits):
+    """(rows, cols) the poster (or, past MAX_DIGITS, the book) uses for num_digits."""
+    if num_digits <= MAX_DIGITS:
+        return calculate_grid_dimensions(num_digits)
+    book = BookLayout(num_digits)
+    return book.rows, book.cols
+
+
+def _client():
+    import server
+    server.app.testing = True
+    return server, server.app.test_client()
+
+
+def _post(path, payload):
+    def run():
+        server, client = _client()
+        server.response_cache.clear()
+        response = client.post(path, json=payload)
+        assert response.status_code == 200, (path, response.status_code)
+        return response.get_data()
+    return run
+
+
+def stages(num_digits):
+    """Yield (stage name, function to time) for one digit count."""
+    rows, cols = grid_size(num_digits)
+    yield "get_pi_digits", lambda: get_pi_digits(num_digits)
+    yield "calculate_grid_dimensions", lambda: calculate_grid_dimensions(num_digits)
+
+    def mask():
+        shape_mask.cache_clear()
+        return generate_pi_shape_mask(rows, cols)
+    yield "generate_pi_shape_mask", mask
+
+    for strategy in STRATEGIES:
+        yield f"create_pi_grid[python,{strategy}]", lambda s=strategy: create_pi_grid(rows, cols, 1, s, WEIGHTS)
+        yield f"create_pi_grid[fast,{strategy}]", lambda s=strategy: create_pi_grid(rows, cols, 1, s, WEIGHTS, "fast")
+        yield f"create_pi_grid[counter,{strategy}]", lambda s=strategy: create_pi_grid(rows, cols, 1, s, WEIGHTS, "counter")
+
+    pi_grid = build_pi_grid(rows, cols, 1, engine="fast")
+    yield "generate_latex", lambda: generate_grid_latex(pi_grid)
+    yield "generate_json_data", lambda: generate_json_data(num_digits, 1)
+    yield "PiGrid.iter_json", lambda: sum(map(len, pi_grid.iter_json(num_digits)))
+
+    pi_data = pi_grid.to_dict(num_digits)
+    yield "endpoint /generate_pi_data", _post("/generate_pi_data", {"num_digits": num_digits, "seed": 1})
+    yield "endpoint /generate_pi_data?format=compact", _post("/generate_pi_data?format=compact",
+                                                             {"num_digits": num_digits, "seed": 1})
+    yield "endpoint /generate_latex", _post("/generate_latex", {"data": pi_data})
+    yield "endpoint /generate_svg", _post("/generate_svg", {"data": pi_data})
+    yield "endpoint /generate_book", _post("/generate_book", {"num_digits": num_digits, "seed": 1})
+
+
+def stage_limit(name):
+    """Largest digit count a stage is run at, or None."""
+    store = digit_store.get_store()
+    if name == "get_pi_digits" and store is not None:
+        return max(len(store) - 1, MAX_DIGITS_PER_STAGE[name])
+    # The most specific (longest) matching prefix wins
+    matches = [prefix for prefix in MAX_DIGITS_PER_STAGE if name.startswith(prefix)]
+    return MAX_DIGITS_PER_STAGE[max(matches, key=len)] if matches else None
+
+
+def measure(func, repeat):
+    """(best time in seconds, peak traced allocation in bytes) of func()."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, selected=None, report=print):
+    """{"stage@digits": {"seconds": ..., "peak_bytes": ...}} for every stage and size."""
+    # The endpoints save their output (e.g. pi_visualization.tex) to the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            return _run(sizes, repeat, selected, report)
+        finally:
+            os.chdir(cwd)
+
+
+def _run(sizes, repeat, selected, report):
+    results = {}
+    for num_digits in sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            stage_list = list(stages(num_digits))
+        for name, func in stage_list:
+            if selected and not any(part in name for part in selected):
+                continue
+            limit = stage_limit(name)
+            if limit is not None and num_digits > limit:
+                continue
+            seconds, peak = measure(func, repeat)
+            results[f"{name}@{num_digits}"] = {"seconds": seconds, "peak_bytes": peak}
+            report(f"{name:<42} {num_digits:>8} {seconds * 1e3:>11.3f}ms {peak / 2 ** 20:>9.2f}MiB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Descriptions of the stages that regressed against baseline or missed an endpoint budget."""
+    problems = []
+    for key, result in results.items():
+        name, num_digits = key.rsplit("@", 1)
+        budget = ENDPOINT_BUDGETS.get(name)
+        if budget is not None and int(num_digits) <= MAX_DIGITS and result["seconds"] > budget:
+            problems.append(f"{key}: {result['seconds']:.3f}s is over the {budget}s budget")
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if (result["seconds"] > old["seconds"] * (1 + tolerance)
+                and result["seconds"] - old["seconds"] > MIN_TIME_DIFF):
+            problems.append(f"{key}: {old['seconds'] * 1e3:.3f}ms -> {result['seconds'] * 1e3:.3f}ms")
+        if (result["peak_bytes"] > old["peak_bytes"] * (1 + tolerance)
+                and result["peak_bytes"] - old["peak_bytes"] > MIN_MEMORY_DIFF):
+            problems.append(f"{key}: peak {old['peak_bytes'] / 2 ** 20:.2f}MiB -> {result['peak_bytes'] / 2 ** 20:.2f}MiB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pi poster pipeline")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated digit counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is kept)")
+    parser.add_argument("--stages", default=None, help="Only run stages whose name contains one of these (comma-separated)")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with results saved earlier with --save")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown or memory growth against the baseline (default: 0.5, i.e. 50%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    selected = args.stages.split(",") if args.stages else None
+    print(f"{'stage':<42} {'digits':>8} {'time':>13} {'peak':>12}")
+    results = run(sizes, args.repeat, selected)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.save}")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        return 1
+    print("No regressions" + (f" against {args.compare}" if args.compare else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Time the raster renderer: atlas build, in-memory render and PNG encoding,
+and a streamed large-format PNG.
+
+Usage: python benchmarks/bench_raster.py [dpi]
+"""
+import io
+import os
+import sys
+import time
+import timeit
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import raster_render
+from main import build_digit_grid, build_pi_grid
+
+
+def best_of(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    dpi = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    for num_digits in (200, 430):
+        with contextlib.redirect_stdout(io.StringIO()):
+            pi_grid = build_digit_grid(num_digits, seed=1)
+        first = best_of(lambda: raster_render.render_image(pi_grid, dpi=dpi), 1)
+        warm = best_of(lambda: raster_render.render_image(pi_grid, dpi=dpi))
+        png = best_of(lambda: raster_render.render_raster(pi_grid, "png", dpi=dpi))
+        size = raster_render.render_image(pi_grid, dpi=dpi).size
+        print(f"{num_digits} digits at {dpi} dpi ({size[0]}x{size[1]})")
+        print(f"  first render (builds atlas): {first:.4f}s")
+        print(f"  render:                      {warm:.4f}s")
+        print(f"  render + PNG encode:         {png:.4f}s")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pi_grid = build_pi_grid(400, 400, seed=1, engine="fast")
+    start = time.perf_counter()
+    with open(os.devnull, "wb") as f:
+        width, height = raster_render.render_png_tiled(pi_grid, f, dpi=72, cell_size=40)
+    print(f"Streamed 400x400 grid PNG ({width}x{height}, {width * height / 1e6:.0f} MP): "
+          f"{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Load test of the production server (serve.py): throughput and latency of
+uncached poster requests for 1, 2 and 4 worker processes.
+
+Every request is a /generate_svg of a 430-digit poster with a new seed, so
+each one builds a grid and renders it (nothing comes from the response
+cache). Throughput only scales with the workers up to the number of cores;
+the client threads run in this process, which needs a core of its own.
+
+Usage: python benchmarks/bench_server.py [seconds per run] [worker counts, e.g. 1,2,4]
+"""
+import os
+import re
+import sys
+import json
+import time
+import signal
+import subprocess
+import http.client
+import threading
+import itertools
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATH = "/generate_svg"
+NUM_DIGITS = 430
+
+# Shared by the client threads; next() on a count is atomic
+seeds = itertools.count()
+
+
+def start_server(workers):
+    process = subprocess.Popen([sys.executable, "serve.py", "--port", "0", "--workers", str(workers)],
+                               cwd=REPO, stderr=subprocess.PIPE, text=True)
+    for line in process.stderr:
+        match = re.search(r"Listening on http://([^:]+):(\d+)", line)
+        if match:
+            # Keep reading the log so the server never blocks on a full pipe
+            threading.Thread(target=process.stderr.read, daemon=True).start()
+            return process, match.group(1), int(match.group(2))
+    raise RuntimeError("server did not start")
+
+
+def client(host, port, stop_at, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    headers = {"Content-Type": "application/json"}
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        body = json.dumps({"num_digits": NUM_DIGITS, "seed": next(seeds)})
+        connection.request("POST", PATH, body, headers)
+        response = connection.getresponse()
+        response.read()
+        if response.status == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(response.status)
+    connection.close()
+
+
+def load(host, port, clients, seconds):
+    """(requests per second, latencies, error statuses) of clients hammering the server."""
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + seconds
+    threads = [threading.Thread(target=client, args=(host, port, stop_at, latencies, errors))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), sorted(latencies), errors
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    worker_counts = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 2, 4]
+    print(f"{os.cpu_count()} cores; POST {PATH} ({NUM_DIGITS} digits, new seed each time) for {seconds:g}s per run")
+    base = None
+    for workers in worker_counts:
+        process, host, port = start_server(workers)
+        try:
+            clients = 2 * workers
+            load(host, port, clients, 1)  # Warm-up
+            rate, latencies, errors = load(host, port, clients, seconds)
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(30)
+        base = base or rate
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+        print(f"{workers} workers, {clients} clients: {rate:7.1f} req/s ({rate / base:.2f}x), "
+              f"p50 {p50:.0f} ms, p95 {p95:.0f} ms" + (f", {len(errors)} errors" if errors else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Time to build the pi-shape mask with the old Pillow drawing and with
+shape_masks (uncached, cached, and one page of rows), from poster size up
+to a 10^7-cell book grid.
+
+Usage: python benchmarks/bench_shape_masks.py [repeat]
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shape_masks import shape_mask, shape_mask_rows
+
+SIZES = [(25, 18), (420, 300), (3800, 2700)]
+PAGE_ROWS = 80
+
+
+def pillow_mask(rows, cols):
+    img = Image.new('1', (cols, rows), 0)
+    draw = ImageDraw.Draw(img)
+    width, height = cols * 0.7, rows * 0.7
+    x_offset, y_offset = (cols - width) / 2, (rows - height) / 2
+    draw.rectangle([(x_offset, y_offset), (x_offset + width, y_offset + height * 0.2)], fill=1)
+    for center in (x_offset + width * 0.25, x_offset + width * 0.75):
+        draw.rectangle([(center - width * 0.1, y_offset), (center + width * 0.1, y_offset + height)], fill=1)
+    return np.array(img)
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def uncached(rows, cols):
+    shape_mask.cache_clear()
+    return shape_mask(rows, cols)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'grid':>12} {'pillow':>10} {'numpy':>10} {'cached':>10} {'one page':>10}")
+    for rows, cols in SIZES:
+        assert np.array_equal(pillow_mask(rows, cols), uncached(rows, cols))
+        old = best_of(lambda: pillow_mask(rows, cols), repeat)
+        new = best_of(lambda: uncached(rows, cols), repeat)
+        shape_mask(rows, cols)
+        cached = best_of(lambda: shape_mask(rows, cols), repeat)
+        start = rows // 2
+
+        def page():
+            shape_mask_rows.cache_clear()
+            return shape_mask_rows(rows, cols, start, min(rows, start + PAGE_ROWS))
+        page_time = best_of(page, repeat)
+        print(f"{rows:>5}x{cols:<6} {old * 1e3:>8.3f}ms {new * 1e3:>8.3f}ms {cached * 1e6:>8.2f}us {page_time * 1e3:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
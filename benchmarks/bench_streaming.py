@@ -0,0 +1,65 @@
+"""
+Peak memory and time of writing the LaTeX and JSON documents for grids of
+10^4 to 10^6 cells, built in memory (generate_grid_latex, json.dumps of
+to_dict) versus streamed row by row (iter_grid_latex, PiGrid.iter_json).
+
+The grids are random digit/script arrays rather than pi, since computing a
+million digits is slow and does not change what is measured.
+
+Usage: python benchmarks/bench_streaming.py [max cells]
+"""
+import io
+import os
+import sys
+import json
+import time
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from main import generate_grid_latex, iter_grid_latex
+from numeral_scripts import SCRIPT_NAMES
+from pi_grid import PiGrid
+
+
+def random_grid(rows, cols):
+    rng = np.random.default_rng(1)
+    return PiGrid(rng.integers(0, 10, (rows, cols)), rng.integers(0, len(SCRIPT_NAMES), (rows, cols)),
+                  rng.random((rows, cols)) < 0.1, seed=1)
+
+
+def measure(write):
+    """(peak traced bytes, seconds) of write(f) into /dev/null."""
+    with open(os.devnull, "w", encoding="utf-8") as f, contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        start = time.perf_counter()
+        write(f)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    max_cells = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10 ** 6
+    cases = {
+        "LaTeX, in memory": lambda pi_grid: lambda f: f.write(generate_grid_latex(pi_grid)),
+        "LaTeX, streamed": lambda pi_grid: lambda f: f.writelines(iter_grid_latex(pi_grid)),
+        "JSON, in memory": lambda pi_grid: lambda f: f.write(json.dumps(pi_grid.to_dict(), indent=2)),
+        "JSON, streamed": lambda pi_grid: lambda f: f.writelines(pi_grid.iter_json()),
+    }
+    for rows, cols in ((100, 100), (316, 317), (1000, 1000)):
+        if rows * cols > max_cells:
+            break
+        pi_grid = random_grid(rows, cols)
+        print(f"{rows * cols} cells ({rows}x{cols}, grid arrays {pi_grid.nbytes / 2 ** 20:.1f} MiB)")
+        for label, case in cases.items():
+            peak, elapsed = measure(case(pi_grid))
+            print(f"  {label:17} peak {peak / 2 ** 20:8.1f} MiB  {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Layout and page-by-page generation of pi posters too large for one page.
+
+calculate_grid_dimensions fits at most MAX_DIGITS digits on a single A4
+page. A BookLayout instead picks a grid for any number of digits: on one
+sheet if the digits stay at least min_font_pt tall, otherwise spread over
+as many sheets (A4 up to A0) as needed, every page with the same cell size.
+The pi-shape highlight is laid over the whole book grid, so it runs across
+page breaks.
+
+Pages are generated one at a time (iter_book_pages, book_page): the script
+ids of each page come from grid_engine.assign_band_scripts with one band per
+page, and the digits are read a page at a time, so a 100k-digit book never
+needs the whole grid. The result is the same as generating the book in one
+go with the parallel engine.
+"""
+import math
+
+import numpy as np
+
+import digit_store
+import grid_engine
+from pi_grid import PiGrid
+from pi_stream import iter_pi_digits
+from numeral_scripts import SCRIPT_NAMES, SCRIPT_IDS
+from main import (
+    A4_WIDTH_PT, A4_HEIGHT_PT, TOP_MARGIN_PT, BOTTOM_MARGIN_PT, TITLE_SPACE_PT, FOOTER_SPACE_PT,
+    LEFT_RIGHT_MARGIN_PT, MIN_DIGITS, get_pi_digits, resolve_seed,
+)
+from poster_layout import PosterLayout
+from shape_masks import shape_mask, shape_mask_rows
+
+# Portrait sheet sizes in points
+PAPER_SIZES = {
+    "A4": (A4_WIDTH_PT, A4_HEIGHT_PT),
+    "A3": (842.0, 1191.0),
+    "A2": (1191.0, 1684.0),
+    "A1": (1684.0, 2384.0),
+    "A0": (2384.0, 3370.0),
+}
+
+# Smallest digit size in points that is still comfortably legible in print
+DEFAULT_MIN_FONT_PT = 6.0
+
+
+def _font_ratio(rows, cols):
+    """Font size to cell size ratio used by calculate_exact_font_size."""
+    cell_scale = min(1.0, 30.0 / max(rows, cols))
+    return min(0.9, 0.7 + 0.2 * (1 - cell_scale))
+
+
+class BookLayout:
+    """
+    Grid and pagination for a poster of any number of digits.
+
+    Parameters:
+    -----------
+    num_digits : int
+        Number of cells (digits of pi, counting the "3" and the point)
+    min_font_pt : float
+        Smallest acceptable digit size in points
+    paper : str
+        Sheet size, a key of PAPER_SIZES
+    left_right_margin_pt : float
+        Left and right page margin
+    shape : str
+        Highlighted shape laid over the whole book, a name from shape_masks
+    """
+
+    def __init__(self, num_digits, min_font_pt=DEFAULT_MIN_FONT_PT, paper="A4",
+                 left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, shape="pi"):
+        if paper not in PAPER_SIZES:
+            raise ValueError(f"Unknown paper size {paper!r}; choose from {', '.join(PAPER_SIZES)}")
+        if min_font_pt <= 0:
+            raise ValueError("min_font_pt must be positive")
+        self.num_digits = max(MIN_DIGITS, int(num_digits))
+        self.min_font_pt = min_font_pt
+        self.paper = paper
+        self.margin = left_right_margin_pt
+        self.shape = shape
+        width, height = PAPER_SIZES[paper]
+        available_width = width - 2 * left_right_margin_pt
+        available_height = height - TOP_MARGIN_PT - BOTTOM_MARGIN_PT - TITLE_SPACE_PT - FOOTER_SPACE_PT
+
+        # One sheet, shaped like the available area (as calculate_grid_dimensions)
+        cols = max(3, round(math.sqrt(self.num_digits * available_width / available_height)))
+        rows = max(3, math.ceil(self.num_digits / cols))
+        cell = min(available_width / cols, available_height / rows)
+        if cell * _font_ratio(rows, cols) >= min_font_pt:
+            self.rows, self.cols, self.rows_per_page = rows, cols, rows
+            return
+
+        # Several sheets of full rows, with the largest grid per sheet that
+        # keeps the digits at least min_font_pt tall
+        cell = min_font_pt / 0.9
+        while True:
+            cols = max(1, int(available_width // cell))
+            rows_per_page = max(2, int(available_height // cell))
+            fitted = min(available_width / cols, available_height / rows_per_page)
+            if fitted * _font_ratio(rows_per_page, cols) >= min_font_pt or cols == 1:
+                break
+            cell *= 1.01
+        self.cols = cols
+        self.rows = max(2, math.ceil(self.num_digits / cols))
+        self.rows_per_page = min(rows_per_page, self.rows)
+
+    @property
+    def num_pages(self):
+        return -(-self.rows // self.rows_per_page)
+
+    def page_rows(self, page):
+        """(first row, end row) of a page in the book grid."""
+        if not 0 <= page < self.num_pages:
+            raise IndexError(f"Page {page} out of range (the book has {self.num_pages})")
+        start = page * self.rows_per_page
+        return start, min(start + self.rows_per_page, self.rows)
+
+    def poster_layout(self):
+        """The PosterLayout of the whole book, for the renderers."""
+        paper_size = None if self.paper == "A4" else PAPER_SIZES[self.paper]
+        return PosterLayout(self.rows, self.cols, self.margin, self.rows_per_page, paper_size=paper_size)
+
+    def font_size(self):
+        return self.poster_layout().font_size
+
+    def pi_mask(self):
+        """Highlight mask of the whole book grid (read-only)."""
+        return shape_mask(self.rows, self.cols, self.shape)
+
+    def page_mask(self, page):
+        """Rows of the highlight mask on one page, without the rest of the book."""
+        start, end = self.page_rows(page)
+        return shape_mask_rows(self.rows, self.cols, start, end, self.shape)
+
+    def to_dict(self):
+        return {
+            "num_digits": self.num_digits,
+            "rows": self.rows,
+            "cols": self.cols,
+            "rows_per_page": self.rows_per_page,
+            "pages": self.num_pages,
+            "paper": self.paper,
+            "font_size": round(self.font_size(), 2),
+        }
+
+
+# The "3" and the decimal point are always Latin, as in build_pi_grid
+_FIXED = {(0, 0): SCRIPT_IDS["Latin"], (0, 1): SCRIPT_IDS["Latin"]}
+
+
+def _script_weights(sampling_strategy, script_weights):
+    if sampling_strategy == "weighted" and script_weights is not None:
+        return [script_weights.get(script, 1.0) for script in SCRIPT_NAMES]
+    return None
+
+
+def _page_scripts(book, page, seed, sampling_strategy, weights, above):
+    start, end = book.page_rows(page)
+    return grid_engine.assign_band_scripts(seed, page, end - start, book.cols, len(SCRIPT_NAMES), _FIXED,
+                                           sampling_strategy, weights, above)
+
+
+def _page_digits(book):
+    """
+    Yield the "3.14159..." characters of each page in turn, from the digit
+    store when it is large enough and from pi_stream otherwise.
+    """
+    total = book.rows * book.cols
+    store = digit_store.get_store()
+    if store is not None and total <= len(store):
+        for page in range(book.num_pages):
+            start, end = book.page_rows(page)
+            yield store.pi_slice((end - start) * book.cols, start * book.cols)
+        return
+
+    pending = ""
+    chunks = iter_pi_digits(total - 1)
+    for page in range(book.num_pages):
+        start, end = book.page_rows(page)
+        size = (end - start) * book.cols
+        while len(pending) < size:
+            pending += next(chunks, "0" * (size - len(pending)))
+        yield pending[:size]
+        pending = pending[size:]
+
+
+def iter_book_pages(book, seed=None, sampling_strategy="random", script_weights=None):
+    """
+    Yield (page number, PiGrid of the page's rows) for every page in order,
+    holding only one page at a time. All pages share the resolved seed,
+    which is stored on each page's PiGrid.
+    """
+    seed_int = resolve_seed(seed)
+    weights = _script_weights(sampling_strategy, script_weights)
+    above = None
+    for page, chars in enumerate(_page_digits(book)):
+        script_ids = _page_scripts(book, page, seed_int, sampling_strategy, weights, above)
+        above = script_ids[-1]
+        yield page, PiGrid.from_pi_digits(chars, script_ids, book.page_mask(page), seed_int, sampling_strategy)
+
+
+def book_page(book, page, seed, sampling_strategy="random", script_weights=None):
+    """
+    PiGrid of a single page, generated without the pages before it (only
+    the previous page's scripts are recomputed, for the seam). Equal to the
+    page yielded by iter_book_pages for the same (integer) seed.
+    """
+    weights = _script_weights(sampling_strategy, script_weights)
+    above = None
+    if page > 0:
+        above = _page_scripts(book, page - 1, seed, sampling_strategy, weights, None)[-1]
+    start, end = book.page_rows(page)
+    script_ids = _page_scripts(book, page, seed, sampling_strategy, weights, above)
+    chars = get_pi_digits((end - start) * book.cols - 1, start * book.cols)
+    return PiGrid.from_pi_digits(chars, script_ids, book.page_mask(page), seed, sampling_strategy)
+
+
+def book_script_usage(book, seed, sampling_strategy="random", script_weights=None):
+    """
+    {script: count} over the whole book, from the script ids alone (no
+    digits), page by page.
+    """
+    weights = _script_weights(sampling_strategy, script_weights)
+    counts = np.zeros(len(SCRIPT_NAMES), dtype=np.int64)
+    above = None
+    for page in range(book.num_pages):
+        script_ids = _page_scripts(book, page, seed, sampling_strategy, weights, above)
+        above = script_ids[-1]
+        counts += np.bincount(script_ids.ravel(), minlength=len(SCRIPT_NAMES))
+    return {script: int(count) for script, count in zip(SCRIPT_NAMES, counts) if count > 0}
@@ -0,0 +1,176 @@
+import os
+import mmap
+import argparse
+
+# Default location of the precomputed digit store (next to this file)
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pi_digits.dat")
+
+# Environment variable that can point the application at a different store
+STORE_PATH_ENV = "PI_DIGIT_STORE"
+
+# Extra digits computed beyond the requested count so rounding of the
+# last printed digit never reaches the digits we keep
+GUARD_DIGITS = 10
+
+# pi to 1000 decimals ("3.1415..."), enough for every single-page poster
+# without opening the store or computing anything
+EMBEDDED_PI = (
+    "3."
+    "14159265358979323846264338327950288419716939937510"
+    "58209749445923078164062862089986280348253421170679"
+    "82148086513282306647093844609550582231725359408128"
+    "48111745028410270193852110555964462294895493038196"
+    "44288109756659334461284756482337867831652712019091"
+    "45648566923460348610454326648213393607260249141273"
+    "72458700660631558817488152092096282925409171536436"
+    "78925903600113305305488204665213841469519415116094"
+    "33057270365759591953092186117381932611793105118548"
+    "07446237996274956735188575272489122793818301194912"
+    "98336733624406566430860213949463952247371907021798"
+    "60943702770539217176293176752384674818467669405132"
+    "00056812714526356082778577134275778960917363717872"
+    "14684409012249534301465495853710507922796892589235"
+    "42019956112129021960864034418159813629774771309960"
+    "51870721134999999837297804995105973173281609631859"
+    "50244594553469083026425223082533446850352619311881"
+    "71010003137838752886587533208381420617177669147303"
+    "59825349042875546873115956286388235378759375195778"
+    "18577805321712268066130019278766111959092164201989"
+)
+
+# Open stores, one per path, shared by every caller in this process
+_open_stores = {}
+
+
+def compute_pi_digits(num_digits, checkpoint_path=None):
+    """
+    Compute pi with the Chudnovsky series and return "3" followed by
+    num_digits decimals (no decimal point), as stored in the digit store file.
+    """
+    from pi_stream import ChudnovskySeries
+
+    return ChudnovskySeries(checkpoint_path).digits(num_digits)
+
+
+def build_digit_store(num_digits, path=DEFAULT_STORE_PATH, digits=None, checkpoint_path=None):
+    """
+    Write a digit store containing "3" followed by num_digits decimals of pi.
+
+    The file is raw ASCII so a slice of the memory map decodes directly to a
+    string. It is written to a temporary file first and renamed into place,
+    so readers in other processes never see a partially written store.
+
+    Parameters:
+    -----------
+    num_digits : int
+        Number of decimal digits of pi to store
+    path : str
+        Destination file
+    digits : str or None
+        Precomputed digits in store layout; computed if None
+    checkpoint_path : str or None
+        Chudnovsky series checkpoint to resume from (see pi_stream.py)
+    """
+    if digits is None:
+        digits = compute_pi_digits(num_digits, checkpoint_path)
+    digits = digits[:num_digits + 1]
+    if len(digits) < num_digits + 1:
+        raise ValueError(f"Only {len(digits) - 1} digits supplied, {num_digits} requested")
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(digits.encode("ascii"))
+    os.replace(tmp_path, path)
+
+    # Drop a stale mapping of the old file so the next lookup sees the new one
+    close_store(path)
+    return path
+
+
+class DigitStore:
+    """
+    Read-only, memory-mapped view of a digit store file.
+
+    Positions passed to pi_slice are positions in the usual printed form of pi
+    ("3.14159..."), so index 0 is "3", index 1 is "." and index k >= 2 is the
+    (k-1)th decimal digit.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def num_decimals(self):
+        """Number of decimal digits available in the store."""
+        return len(self._map) - 1
+
+    def __len__(self):
+        # Length of the printed form "3." + decimals
+        return len(self._map) + 1
+
+    def decimals(self, count, start=0):
+        """
+        Return count decimal digits of pi starting at decimal position start
+        (0 is the first digit after the decimal point).
+        """
+        return self._map[start + 1:start + 1 + count].decode("ascii")
+
+    def pi_slice(self, length, offset=0):
+        """
+        Return length characters of "3.14159..." starting at offset.
+        """
+        end = offset + length
+        if offset >= 2:
+            return self.decimals(length, offset - 2)
+        prefix = "3."[offset:end]
+        return prefix + self.decimals(max(0, end - 2))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def get_store(path=None):
+    """
+    Return the shared DigitStore for path, or None if no store has been built.
+
+    The path defaults to $PI_DIGIT_STORE or DEFAULT_STORE_PATH. Each process
+    maps the file once; the pages live in the OS page cache and are shared
+    between worker processes.
+    """
+    if path is None:
+        path = os.environ.get(STORE_PATH_ENV, DEFAULT_STORE_PATH)
+    store = _open_stores.get(path)
+    if store is None:
+        if not os.path.exists(path):
+            return None
+        store = DigitStore(path)
+        _open_stores[path] = store
+    return store
+
+
+def close_store(path):
+    """Close and forget the shared mapping for path, if any."""
+    store = _open_stores.pop(path, None)
+    if store is not None:
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed pi digit store.")
+    parser.add_argument("--digits", type=int, default=1000000,
+                        help="number of decimal digits to store (default: 1000000)")
+    parser.add_argument("--output", default=DEFAULT_STORE_PATH,
+                        help=f"store file to write (default: {DEFAULT_STORE_PATH})")
+    parser.add_argument("--checkpoint", default=None,
+                        help="series checkpoint file to resume from and update")
+    args = parser.parse_args()
+
+    path = build_digit_store(args.digits, args.output, checkpoint_path=args.checkpoint)
+    print(f"Wrote {args.digits} digits of pi to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Font files and metrics for the native poster renderers.
+
+Finds the TrueType/OpenType file behind each font name used in the LaTeX
+output (through fontconfig, PI_FONT_DIR or the usual font directories),
+reads the few tables needed to place glyphs (cmap, hmtx, head, hhea, OS/2)
+and, when the optional fontTools package is installed, subsets fonts down
+to the glyphs a poster uses before they are embedded.
+"""
+import io
+import os
+import zlib
+import logging
+import re
+import struct
+import shutil
+import subprocess
+from functools import lru_cache
+
+try:
+    from fontTools import subset as ft_subset
+    from fontTools.ttLib import TTFont
+    # Tables the subsetter cannot handle are dropped; that is fine here
+    logging.getLogger("fontTools.subset").setLevel(logging.ERROR)
+except ImportError:  # Optional dependency
+    ft_subset = None
+    TTFont = None
+
+FONT_DIR_ENV = "PI_FONT_DIR"
+
+# Tried in order when a font is not installed
+FALLBACK_FONTS = ["Noto Sans", "DejaVu Sans"]
+
+_FONT_EXTENSIONS = (".ttf", ".otf")
+
+
+def _font_dirs():
+    here = os.path.dirname(os.path.abspath(__file__))
+    dirs = [os.environ.get(FONT_DIR_ENV), os.path.join(here, "fonts"),
+            os.path.expanduser("~/.fonts"), os.path.expanduser("~/.local/share/fonts"),
+            "/usr/share/fonts", "/usr/local/share/fonts", "/Library/Fonts", "C:\\Windows\\Fonts"]
+    return [d for d in dirs if d and os.path.isdir(d)]
+
+
+@lru_cache(maxsize=None)
+def _font_file_index():
+    """{normalized file stem: path} for every font file in the font directories."""
+    index = {}
+    for directory in _font_dirs():
+        for root, _, files in os.walk(directory):
+            for name in files:
+                stem, ext = os.path.splitext(name)
+                if ext.lower() in _FONT_EXTENSIONS:
+                    index.setdefault(stem.lower().replace("-", "").replace("_", ""), os.path.join(root, name))
+    return index
+
+
+def _fc_match(font_name, bold):
+    if shutil.which("fc-match") is None:
+        return None
+    pattern = f"{font_name}:bold" if bold else font_name
+    try:
+        result = subprocess.run(["fc-match", "-f", "%{family}\n%{file}", pattern],
+                                capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    lines = result.stdout.splitlines()
+    if len(lines) < 2 or font_name.lower() not in lines[0].lower():
+        return None  # fontconfig substituted a different family
+    path = lines[1]
+    return path if path.lower().endswith(_FONT_EXTENSIONS) and os.path.exists(path) else None
+
+
+@lru_cache(maxsize=None)
+def find_font_file(font_name, bold=False):
+    """
+    Path of the file for a font name such as "Noto Sans Bengali", or None.
+    Files in PI_FONT_DIR and ./fonts win over the fontconfig match.
+    """
+    stem = font_name.replace(" ", "").lower()
+    styles = ["bold", ""] if bold else ["regular", ""]
+    index = _font_file_index()
+    for style in styles:
+        path = index.get(stem + style)
+        if path:
+            return path
+    return _fc_match(font_name, bold)
+
+
+def resolve_font_file(font_name, bold=False, code_points=()):
+    """
+    find_font_file, falling back to FALLBACK_FONTS (then regular weight).
+    With code_points, the first candidate that has all of them wins; if
+    none does, the first one found is returned.
+    """
+    first = None
+    for name in [font_name] + FALLBACK_FONTS:
+        for weight in ([bold, False] if bold else [False]):
+            path = find_font_file(name, weight)
+            if not path:
+                continue
+            if first is None:
+                first = path
+            if not code_points or all(load_font(path).has_glyph(code) for code in code_points):
+                return path
+    return first
+
+
+class FontInfo:
+    """
+    Glyph ids, advance widths and vertical metrics of a TrueType/OpenType
+    file, read straight from its tables.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.tables = self._table_directory()
+        self.is_cff = b"CFF " in self.tables
+        self.postscript_name = self._postscript_name() or re.sub(r"[^A-Za-z0-9-]", "", os.path.basename(path).rsplit(".", 1)[0])
+
+        head = self._table(b"head")
+        self.units_per_em = struct.unpack_from(">H", head, 18)[0]
+        self.bbox = struct.unpack_from(">hhhh", head, 36)
+        hhea = self._table(b"hhea")
+        self.ascent, self.descent = struct.unpack_from(">hh", hhea, 4)
+        num_h_metrics = struct.unpack_from(">H", hhea, 34)[0]
+        hmtx = self._table(b"hmtx")
+        self.advances = struct.unpack_from(">" + "Hxx" * num_h_metrics, hmtx)
+        self.cap_height = self.ascent
+        os2 = self.tables.get(b"OS/2")
+        if os2 is not None:
+            version = struct.unpack_from(">H", self.data, os2[0])[0]
+            if version >= 2 and os2[1] >= 90:
+                self.cap_height = struct.unpack_from(">h", self.data, os2[0] + 88)[0]
+        self._cmap = self._read_cmap()
+
+    def _table_directory(self):
+        if self.data[:4] == b"ttcf":
+            raise ValueError(f"Font collections are not supported: {self.path}")
+        num_tables = struct.unpack_from(">H", self.data, 4)[0]
+        tables = {}
+        for i in range(num_tables):
+            tag, _, offset, length = struct.unpack_from(">4sIII", self.data, 12 + 16 * i)
+            tables[tag] = (offset, length)
+        return tables
+
+    def _table(self, tag):
+        offset, length = self.tables[tag]
+        return self.data[offset:offset + length]
+
+    def _postscript_name(self):
+        if b"name" not in self.tables:
+            return None
+        name = self._table(b"name")
+        count, string_offset = struct.unpack_from(">HH", name, 2)
+        for i in range(count):
+            platform, encoding, _, name_id, length, offset = struct.unpack_from(">HHHHHH", name, 6 + 12 * i)
+            if name_id != 6:
+                continue
+            raw = name[string_offset + offset:string_offset + offset + length]
+            text = raw.decode("utf-16-be" if platform in (0, 3) else "latin-1", "replace")
+            return re.sub(r"[^A-Za-z0-9-]", "", text) or None
+        return None
+
+    def _read_cmap(self):
+        cmap = self._table(b"cmap")
+        num_subtables = struct.unpack_from(">H", cmap, 2)[0]
+        subtables = {}
+        for i in range(num_subtables):
+            platform, encoding, offset = struct.unpack_from(">HHI", cmap, 4 + 8 * i)
+            subtables[(platform, encoding)] = offset
+        for key in ((3, 10), (0, 4), (0, 6), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0)):
+            if key in subtables:
+                offset = subtables[key]
+                fmt = struct.unpack_from(">H", cmap, offset)[0]
+                if fmt == 12:
+                    return self._cmap_format12(cmap, offset)
+                if fmt == 4:
+                    return self._cmap_format4(cmap, offset)
+        return {}
+
+    @staticmethod
+    def _cmap_format4(cmap, offset):
+        seg_count = struct.unpack_from(">H", cmap, offset + 6)[0] // 2
+        ends = struct.unpack_from(f">{seg_count}H", cmap, offset + 14)
+        starts = struct.unpack_from(f">{seg_count}H", cmap, offset + 16 + 2 * seg_count)
+        deltas = struct.unpack_from(f">{seg_count}h", cmap, offset + 16 + 4 * seg_count)
+        range_offsets_at = offset + 16 + 6 * seg_count
+        range_offsets = struct.unpack_from(f">{seg_count}H", cmap, range_offsets_at)
+        mapping = {}
+        for i in range(seg_count):
+            for code in range(starts[i], ends[i] + 1):
+                if code == 0xFFFF:
+                    continue
+                if range_offsets[i] == 0:
+                    glyph = (code + deltas[i]) & 0xFFFF
+                else:
+                    at = range_offsets_at + 2 * i + range_offsets[i] + 2 * (code - starts[i])
+                    glyph = struct.unpack_from(">H", cmap, at)[0]
+                    if glyph:
+                        glyph = (glyph + deltas[i]) & 0xFFFF
+                if glyph:
+                    mapping[code] = glyph
+        return mapping
+
+    @staticmethod
+    def _cmap_format12(cmap, offset):
+        num_groups = struct.unpack_from(">I", cmap, offset + 12)[0]
+        mapping = {}
+        for i in range(num_groups):
+            start, end, glyph = struct.unpack_from(">III", cmap, offset + 16 + 12 * i)
+            for code in range(start, end + 1):
+                mapping[code] = glyph + code - start
+        return mapping
+
+    def glyph_id(self, code_point):
+        """Glyph id of a code point (0, the .notdef glyph, if missing)."""
+        return self._cmap.get(code_point, 0)
+
+    def has_glyph(self, code_point):
+        return code_point in self._cmap
+
+    def advance(self, glyph_id):
+        """Advance width of a glyph in font units."""
+        return self.advances[min(glyph_id, len(self.advances) - 1)]
+
+    def text_width(self, text, size):
+        """Width of text set at size points."""
+        return sum(self.advance(self.glyph_id(ord(char))) for char in text) * size / self.units_per_em
+
+    def subset(self, code_points):
+        """
+        Font file bytes reduced to the glyphs of code_points, keeping glyph
+        ids unchanged. Without fontTools the whole file is returned.
+        """
+        if ft_subset is None:
+            return self.data
+        options = ft_subset.Options()
+        options.retain_gids = True
+        options.notdef_outline = True
+        options.layout_features = []
+        options.name_IDs = ["*"]
+        font = TTFont(io.BytesIO(self.data))
+        subsetter = ft_subset.Subsetter(options)
+        subsetter.populate(unicodes=sorted(code_points))
+        subsetter.subset(font)
+        out = io.BytesIO()
+        font.save(out)
+        return out.getvalue()
+
+
+@lru_cache(maxsize=64)
+def load_font(path):
+    return FontInfo(path)
+
+
+@lru_cache(maxsize=256)
+def compressed_font_data(path, code_points):
+    """
+    (zlib-compressed font bytes, subsetted) for embedding the glyphs of the
+    code_points frozenset, cached since posters reuse the same fonts.
+    """
+    info = load_font(path)
+    data = info.subset(code_points)
+    return zlib.compress(data, 6), len(data), data is not info.data
@@ -0,0 +1,702 @@
+"""
+Script-assignment engines for create_pi_grid.
+
+Scripts are represented by integer ids (their position in NUMERAL_SCRIPTS)
+and the grid by a (rows, cols) uint8 array, so forbidden-neighbour sets are
+bitmasks instead of Python sets of strings.
+
+Four engines are provided:
+
+- "compat" reproduces the legacy loop in main.create_pi_grid exactly: same
+  candidate ordering, same consumption of the random stream, so a given seed
+  yields a byte-identical grid.
+- "fast" fills the grid in four vectorized NumPy steps. Output is a valid
+  colouring, but not the legacy grid.
+- "parallel" splits the grid into bands of rows, fills each band with the
+  fast engine in a process pool and repairs the seams between bands.
+- "counter" makes every cell's script a pure function of (seed, row, col),
+  so any tile of a grid can be generated on its own (see assign_tile_scripts).
+"""
+import os
+import bisect
+import functools
+import concurrent.futures
+import numpy as np
+
+# Number of 32-bit words drawn from the Python RNG per refill in compat mode
+WORD_BLOCK = 4096
+
+
+class _WordStream:
+    """
+    Pre-drawn 32-bit outputs of a random.Random-compatible generator.
+
+    getrandbits(32 * n) returns the next n Mersenne Twister outputs packed
+    little-endian, so one call replaces thousands of per-cell calls. Every
+    legacy draw (choice via getrandbits(k), random()) is a pure function of
+    these words.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.start_state = rng.getstate()
+        self.words = []
+        self.pos = 0
+        self.drawn = 0
+
+    def next(self):
+        if self.pos == len(self.words):
+            bits = self.rng.getrandbits(32 * WORD_BLOCK)
+            self.words = np.frombuffer(bits.to_bytes(4 * WORD_BLOCK, "little"), dtype="<u4").tolist()
+            self.pos = 0
+            self.drawn += WORD_BLOCK
+        word = self.words[self.pos]
+        self.pos += 1
+        return word
+
+    def randbelow(self, n):
+        # Same rejection loop as random.Random._randbelow_with_getrandbits
+        shift = 32 - n.bit_length()
+        r = self.next() >> shift
+        while r >= n:
+            r = self.next() >> shift
+        return r
+
+    def random(self):
+        # Same construction as random.Random.random (53-bit float from two words)
+        a = self.next() >> 5
+        b = self.next() >> 6
+        return (a * 67108864.0 + b) * (1.0 / 9007199254740992.0)
+
+    def finish(self):
+        """Leave the generator exactly as far advanced as the words consumed."""
+        used = self.drawn - (len(self.words) - self.pos)
+        self.rng.setstate(self.start_state)
+        if used:
+            self.rng.getrandbits(32 * used)
+
+
+class AliasTable:
+    """
+    Walker alias table over a list of script ids: a weighted choice among
+    them costs one index draw and one uniform draw, whatever their number.
+    Weights that are all zero are treated as equal.
+    """
+    __slots__ = ("ids", "prob", "alias")
+
+    def __init__(self, ids, weights):
+        count = len(ids)
+        total = sum(weights)
+        if total <= 0:
+            weights, total = [1.0] * count, float(count)
+        scaled = [w * count / total for w in weights]
+        self.ids = list(ids)
+        self.prob = [1.0] * count
+        self.alias = list(range(count))
+        # Vose's method: pair each under-full column with an over-full one
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            lo, hi = small.pop(), large.pop()
+            self.prob[lo] = scaled[lo]
+            self.alias[lo] = hi
+            scaled[hi] += scaled[lo] - 1.0
+            (small if scaled[hi] < 1.0 else large).append(hi)
+
+    def sample(self, randbelow, random):
+        """
+        One id, from randbelow(n) (an int below n) and random() (a float in
+        [0, 1)), e.g. random.Random's randrange and random.
+        """
+        column = randbelow(len(self.ids))
+        return self.ids[column] if random() < self.prob[column] else self.ids[self.alias[column]]
+
+
+class AliasSampler:
+    """
+    Weighted choice of a script id outside a forbidden bitmask in constant
+    time. Each distinct bitmask gets its own AliasTable over the allowed ids,
+    built the first time it is seen (there are only as many as neighbour
+    combinations occur) and kept for every later cell and grid. If every
+    script is forbidden, all of them are allowed.
+    """
+
+    def __init__(self, weights):
+        self.weights = [float(w) for w in weights]
+        self._tables = {}
+
+    def table(self, forbidden):
+        table = self._tables.get(forbidden)
+        if table is None:
+            ids = [s for s in range(len(self.weights)) if not (forbidden >> s) & 1] or list(range(len(self.weights)))
+            table = self._tables[forbidden] = AliasTable(ids, [self.weights[s] for s in ids])
+        return table
+
+    def sample(self, forbidden, randbelow, random):
+        return self.table(forbidden).sample(randbelow, random)
+
+
+@functools.lru_cache(maxsize=32)
+def alias_sampler(weights):
+    """The shared AliasSampler for a tuple of per-id weights."""
+    return AliasSampler(weights)
+
+
+class UsageIndex:
+    """
+    Usage count of every script id, with the ids bucketed by count, so the
+    ids can be walked in (count, id) order without sorting. The least used
+    id outside a forbidden bitmask is then found after looking at no more
+    than popcount(forbidden) + 1 ids. Ids in preferred come before all
+    others, as WELL_SUPPORTED_SCRIPTS in the legacy loop.
+    """
+
+    def __init__(self, num_scripts, preferred=None):
+        preferred = set(range(num_scripts) if preferred is None else preferred)
+        self.counts = [0] * num_scripts
+        self._group = [0 if s in preferred else 1 for s in range(num_scripts)]
+        # Per group: {count: ids with that count, ascending} and the counts present, ascending
+        self._buckets = ({}, {})
+        self._levels = ([], [])
+        for s in range(num_scripts):
+            self._insert(s)
+
+    def _insert(self, script):
+        group, count = self._group[script], self.counts[script]
+        bucket = self._buckets[group].get(count)
+        if bucket is None:
+            bucket = self._buckets[group][count] = []
+            bisect.insort(self._levels[group], count)
+        bisect.insort(bucket, script)
+
+    def _remove(self, script):
+        group, count = self._group[script], self.counts[script]
+        bucket = self._buckets[group][count]
+        bucket.remove(script)
+        if not bucket:
+            del self._buckets[group][count]
+            self._levels[group].remove(count)
+
+    def add(self, script):
+        """Count one more use of script."""
+        self._remove(script)
+        self.counts[script] += 1
+        self._insert(script)
+
+    def ordered(self, forbidden=0):
+        """Ids not in forbidden, preferred first, each part by (count, id)."""
+        counts, group = self.counts, self._group
+        return sorted((s for s in range(len(counts)) if not (forbidden >> s) & 1),
+                      key=lambda s: (group[s], counts[s], s))
+
+    def least_used(self, forbidden=0):
+        """ordered(forbidden)[0], or id 0 if every id is forbidden."""
+        for buckets, levels in zip(self._buckets, self._levels):
+            for count in levels:
+                for s in buckets[count]:
+                    if not (forbidden >> s) & 1:
+                        return s
+        return 0
+
+
+def assign_scripts_compat(rows, cols, num_scripts, fixed, rng, sampling_strategy="random",
+                          weights=None, preferred=None):
+    """
+    Assign script ids cell by cell exactly like the legacy create_pi_grid loop.
+
+    Parameters:
+    -----------
+    rows, cols : int
+        Dimensions of the grid
+    num_scripts : int
+        Number of scripts; ids are 0..num_scripts-1 in NUMERAL_SCRIPTS order
+    fixed : dict
+        {(row, col): script_id} for cells assigned before the loop starts
+    rng : random.Random or the random module
+        Generator whose stream is consumed exactly as the legacy loop would
+    sampling_strategy : str
+        "random", "least_used", or "weighted"
+    weights : list or None
+        Per-id weights for "weighted" (defaults to 1.0 each)
+    preferred : iterable or None
+        Ids moved to the front of the candidate list (WELL_SUPPORTED_SCRIPTS)
+    """
+    if weights is None:
+        weights = [1.0] * num_scripts
+    all_ids = list(range(num_scripts))
+    preferred_mask = sum(1 << s for s in (preferred if preferred is not None else all_ids))
+    all_preferred = preferred_mask == (1 << num_scripts) - 1
+    sampler = alias_sampler(tuple(weights)) if sampling_strategy == "weighted" else None
+
+    grid = [[-1] * cols for _ in range(rows)]
+    counts = [0] * num_scripts
+    usage = UsageIndex(num_scripts, preferred)
+    for (r, c), s in fixed.items():
+        grid[r][c] = s
+        counts[s] += 1
+        usage.add(s)
+    fixed_rows = {r for r, _ in fixed}
+
+    # Script ids ordered by (usage count, id), i.e. the legacy stable sort by
+    # usage, for "random"; "least_used" finds its pick in the usage index
+    order = sorted(all_ids, key=lambda s: (counts[s], s))
+
+    words = _WordStream(rng)
+    randbelow = words.randbelow
+
+    for row in range(rows):
+        above = grid[row - 1] if row > 0 else None
+        current = grid[row]
+        for col in range(cols):
+            if current[col] >= 0:
+                continue
+
+            # Filled neighbours: the previous row, the left cell and any fixed cells
+            forbidden = 0
+            if above is not None:
+                if col > 0:
+                    forbidden |= 1 << above[col - 1]
+                forbidden |= 1 << above[col]
+                if col + 1 < cols and above[col + 1] >= 0:
+                    forbidden |= 1 << above[col + 1]
+            if col > 0 and current[col - 1] >= 0:
+                forbidden |= 1 << current[col - 1]
+            if col + 1 < cols and current[col + 1] >= 0:
+                forbidden |= 1 << current[col + 1]
+            if row + 1 in fixed_rows:
+                below = grid[row + 1]
+                for c in range(max(0, col - 1), min(cols, col + 2)):
+                    if below[c] >= 0:
+                        forbidden |= 1 << below[c]
+
+            if sampling_strategy == "least_used":
+                chosen = usage.least_used(forbidden)
+                usage.add(chosen)
+            elif sampling_strategy == "weighted":
+                chosen = sampler.sample(forbidden, randbelow, words.random)
+            else:
+                valid = [s for s in order if not (forbidden >> s) & 1]
+                if not all_preferred:
+                    valid = ([s for s in valid if (preferred_mask >> s) & 1] +
+                             [s for s in valid if not (preferred_mask >> s) & 1])
+                if not valid:
+                    valid = all_ids
+                chosen = valid[randbelow(len(valid))]
+
+                # Keep order sorted by (count, id) by moving the chosen id right
+                counts[chosen] += 1
+                i = order.index(chosen)
+                key = (counts[chosen], chosen)
+                while i + 1 < num_scripts and (counts[order[i + 1]], order[i + 1]) < key:
+                    order[i] = order[i + 1]
+                    i += 1
+                order[i] = chosen
+            current[col] = chosen
+
+    words.finish()
+    return np.array(grid, dtype=np.uint8)
+
+
+# Rows per band in parallel mode; fixed so results do not depend on worker count
+BAND_ROWS = 256
+
+# Cells per chunk when building (cells x scripts) weight matrices
+CHOICE_CHUNK = 65536
+
+# The four classes of cells by (row parity, column parity), in fill order.
+# Two cells of the same class are never 8-adjacent, so each class can be
+# assigned in a single vectorized step.
+PARITY_CLASSES = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+
+def neighbour_masks(grid, assigned):
+    """
+    Bitmask of the scripts used by the assigned 8-neighbours of every cell.
+    """
+    rows, cols = grid.shape
+    bits = np.zeros((rows + 2, cols + 2), dtype=np.uint32)
+    bits[1:-1, 1:-1] = np.where(assigned, np.left_shift(np.uint32(1), grid.astype(np.uint32)), 0)
+    masks = np.zeros((rows, cols), dtype=np.uint32)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            if dr or dc:
+                masks |= bits[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc]
+    return masks
+
+
+def choose_allowed(forbidden, num_scripts, np_rng, probabilities=None, max_rounds=8):
+    """
+    Pick one script id per cell, avoiding the scripts in each cell's
+    forbidden bitmask, with chances proportional to probabilities (uniform
+    if None).
+
+    Draws are made from the unconstrained distribution and redrawn where they
+    hit a forbidden script, which is exact and needs only a few vectorized
+    rounds (at most 8 of 16 scripts are ever forbidden). Cells still pending
+    after max_rounds, e.g. because every allowed script has zero weight, are
+    resolved with an explicit (cells x scripts) weight matrix that falls back
+    to uniform.
+    """
+    count = len(forbidden)
+    chosen = np.zeros(count, dtype=np.uint8)
+    cdf = None
+    if probabilities is not None and probabilities.sum() > 0:
+        cdf = np.cumsum(probabilities) / probabilities.sum()
+
+    pending = np.arange(count)
+    for _ in range(max_rounds):
+        if not len(pending):
+            return chosen
+        if cdf is None:
+            draws = np_rng.integers(0, num_scripts, size=len(pending), dtype=np.uint8)
+        else:
+            draws = np.searchsorted(cdf, np_rng.random(len(pending)), side="right")
+            draws = np.minimum(draws, num_scripts - 1).astype(np.uint8)
+        ok = (forbidden[pending] >> draws.astype(np.uint32)) & 1 == 0
+        chosen[pending[ok]] = draws[ok]
+        pending = pending[~ok]
+
+    if probabilities is None:
+        probabilities = np.ones(num_scripts)
+    script_bits = np.left_shift(np.uint32(1), np.arange(num_scripts, dtype=np.uint32))
+    for start in range(0, len(pending), CHOICE_CHUNK):
+        cells = pending[start:start + CHOICE_CHUNK]
+        allowed = (forbidden[cells][:, None] & script_bits[None, :]) == 0
+        cell_weights = allowed * probabilities
+        totals = cell_weights.sum(axis=1)
+        empty = totals <= 0
+        if empty.any():
+            cell_weights[empty] = allowed[empty]
+            totals[empty] = allowed[empty].sum(axis=1)
+        cumulative = np.cumsum(cell_weights, axis=1)
+        draws = np_rng.random(len(cells)) * totals
+        picks = (cumulative <= draws[:, None]).sum(axis=1)
+        chosen[cells] = np.minimum(picks, num_scripts - 1)
+    return chosen
+
+
+def assign_scripts_fast(rows, cols, num_scripts, fixed, np_rng, sampling_strategy="random",
+                        weights=None):
+    """
+    Assign script ids with NumPy in four whole-grid steps, one per
+    PARITY_CLASSES entry. Each step excludes the scripts of every already
+    assigned 8-neighbour, so the result never has two adjacent cells in the
+    same script. Fixed cells are kept as given.
+
+    "least_used" depends on running totals after every cell and is inherently
+    sequential, so it is delegated to the compat engine.
+
+    Parameters:
+    -----------
+    np_rng : numpy.random.Generator
+        Source of the per-cell draws
+    weights : list or None
+        Per-id weights for "weighted"; ignored by "random"
+    """
+    if sampling_strategy == "least_used":
+        import random
+        rng = random.Random(int(np_rng.integers(1 << 62)))
+        return assign_scripts_compat(rows, cols, num_scripts, fixed, rng, sampling_strategy)
+
+    probabilities = None
+    if sampling_strategy == "weighted" and weights is not None:
+        probabilities = np.asarray(weights, dtype=np.float64)
+
+    grid = np.zeros((rows, cols), dtype=np.uint8)
+    # One-hot script bits of assigned cells, padded by one cell on every side
+    bits = np.zeros((rows + 2, cols + 2), dtype=np.uint32)
+    for (r, c), s in fixed.items():
+        grid[r, c] = s
+        bits[r + 1, c + 1] = 1 << s
+
+    for row_parity, col_parity in PARITY_CLASSES:
+        class_rows = len(range(row_parity, rows, 2))
+        class_cols = len(range(col_parity, cols, 2))
+        if not class_rows or not class_cols:
+            continue
+        forbidden = np.zeros((class_rows, class_cols), dtype=np.uint32)
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if dr or dc:
+                    r0 = 1 + row_parity + dr
+                    c0 = 1 + col_parity + dc
+                    forbidden |= bits[r0:r0 + 2 * class_rows - 1:2, c0:c0 + 2 * class_cols - 1:2]
+
+        chosen = choose_allowed(forbidden.ravel(), num_scripts, np_rng, probabilities)
+        chosen = chosen.reshape(class_rows, class_cols)
+        for (r, c), s in fixed.items():
+            if r % 2 == row_parity and c % 2 == col_parity:
+                chosen[r // 2, c // 2] = s
+        grid[row_parity::2, col_parity::2] = chosen
+        bits[1 + row_parity:rows + 1:2, 1 + col_parity:cols + 1:2] = np.left_shift(np.uint32(1), chosen.astype(np.uint32))
+
+    return grid
+
+
+def _band_rng(seed, band, stream=0):
+    """Independent, reproducible generator for one band (or its seam repair)."""
+    return np.random.default_rng(np.random.SeedSequence([seed, band, stream]))
+
+
+def _assign_band(args):
+    """Process-pool task: fill one band of rows with the fast engine."""
+    seed, band, band_rows, cols, num_scripts, fixed, sampling_strategy, weights = args
+    return assign_scripts_fast(band_rows, cols, num_scripts, fixed, _band_rng(seed, band),
+                               sampling_strategy, weights)
+
+
+def _repair_seam(grid, row, num_scripts, np_rng, weights, fixed):
+    """
+    Reassign the cells of row (the first row of a band) that clash with the
+    row above. Even and odd columns are repaired in separate steps so the
+    cells repaired together are never adjacent, and each repaired cell avoids
+    all 8 neighbours, so no new clash is introduced.
+    """
+    rows, cols = grid.shape
+    above = np.left_shift(np.uint32(1), grid[row - 1].astype(np.uint32))
+    from_above = above.copy()
+    from_above[1:] |= above[:-1]
+    from_above[:-1] |= above[1:]
+    clashing = (from_above >> grid[row].astype(np.uint32)) & 1 == 1
+    for c in range(cols):
+        if (row, c) in fixed:
+            clashing[c] = False
+
+    probabilities = None if weights is None else np.asarray(weights, dtype=np.float64)
+    for parity in (0, 1):
+        cells = np.flatnonzero(clashing)
+        cells = cells[cells % 2 == parity]
+        if not len(cells):
+            continue
+        lo, hi = max(0, row - 1), min(rows, row + 2)
+        window = grid[lo:hi]
+        forbidden = neighbour_masks(window, np.ones(window.shape, dtype=bool))[row - lo, cells]
+        grid[row, cells] = choose_allowed(forbidden, num_scripts, np_rng, probabilities)
+
+
+def assign_band_scripts(seed, band, band_rows, cols, num_scripts, fixed, sampling_strategy="random",
+                        weights=None, above=None):
+    """
+    Script ids of one band of rows on its own: the rows band * band_rows
+    onwards of assign_scripts_parallel(..., seed, band_rows=band_rows), for
+    grids generated a band (e.g. a page) at a time. band_rows must be at
+    least 2, since a one-row band's seam repair also looks at the band below.
+    "least_used", which the parallel engine does not split into bands, is
+    balanced within each band.
+
+    Parameters:
+    -----------
+    fixed : dict
+        Fixed cells of the whole grid, {(row, col): script id}
+    above : numpy.ndarray or None
+        Last row of the previous band, as returned for it by this function;
+        the band's first row is repaired against it. None for band 0.
+    """
+    top = band * band_rows
+    band_fixed = {(r - top, c): s for (r, c), s in fixed.items() if top <= r < top + band_rows}
+    grid = _assign_band((seed, band, band_rows, cols, num_scripts, band_fixed, sampling_strategy, weights))
+    if above is None:
+        return grid
+    stacked = np.concatenate([np.asarray(above, dtype=np.uint8)[None, :], grid])
+    seam_fixed = {(r + 1, c): s for (r, c), s in band_fixed.items()}
+    seam_weights = weights if sampling_strategy == "weighted" else None
+    _repair_seam(stacked, 1, num_scripts, _band_rng(seed, band, 1), seam_weights, seam_fixed)
+    return stacked[1:]
+
+
+def assign_scripts_parallel(rows, cols, num_scripts, fixed, seed, sampling_strategy="random",
+                            weights=None, workers=None, band_rows=BAND_ROWS):
+    """
+    Assign script ids for very large grids using every core.
+
+    The grid is cut into bands of band_rows rows. Each band is filled
+    independently by the fast engine in a worker process, seeded from
+    (seed, band index), then the first row of every band is repaired where it
+    clashes with the band above. Because band boundaries and seeds do not
+    depend on the number of workers, the result for a given seed is the same
+    however many processes are used.
+
+    Parameters:
+    -----------
+    seed : int
+        Seed from which every band's generator is derived
+    workers : int or None
+        Size of the process pool (defaults to os.cpu_count()); 1 runs in-process
+    band_rows : int
+        Rows per band
+    """
+    if sampling_strategy == "least_used":
+        # Running usage totals make this strategy sequential
+        return assign_scripts_fast(rows, cols, num_scripts, fixed, np.random.default_rng(seed),
+                                   sampling_strategy, weights)
+
+    tasks = []
+    for band, top in enumerate(range(0, rows, band_rows)):
+        height = min(band_rows, rows - top)
+        band_fixed = {(r - top, c): s for (r, c), s in fixed.items() if top <= r < top + height}
+        tasks.append((seed, band, height, cols, num_scripts, band_fixed, sampling_strategy, weights))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        bands = [_assign_band(task) for task in tasks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            bands = list(pool.map(_assign_band, tasks))
+
+    grid = np.concatenate(bands, axis=0)
+    seam_weights = weights if sampling_strategy == "weighted" else None
+    for band in range(1, len(tasks)):
+        _repair_seam(grid, band * band_rows, num_scripts, _band_rng(seed, band, 1), seam_weights, fixed)
+    return grid
+
+
+# A phase-k cell of the parity fill depends on neighbours up to k - 1 cells
+# away, so a tile is computed with this many extra cells on every side
+TILE_HALO = len(PARITY_CLASSES) - 1
+
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix64(x):
+    """splitmix64 finalizer of a uint64 array."""
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def cell_uniforms(seed, row_ids, col_ids):
+    """
+    Uniform draw in [0, 1) for every (row, col) pair, from a counter-based
+    hash of (seed, row, col) rather than a sequential stream, so the draw of
+    any cell can be computed without those before it.
+
+    Parameters:
+    -----------
+    row_ids, col_ids : array_like
+        Broadcastable arrays of cell coordinates
+    """
+    with np.errstate(over="ignore"):
+        key = _mix64(np.asarray([seed & 0xFFFFFFFFFFFFFFFF], dtype=np.uint64))
+        x = _mix64(key + np.asarray(row_ids, dtype=np.uint64) * _GOLDEN)
+        x = _mix64(x ^ (np.asarray(col_ids, dtype=np.uint64) * _MIX2 + _GOLDEN))
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def choose_by_draw(forbidden, draws, num_scripts, probabilities=None):
+    """
+    The script id picked by each draw in [0, 1) among the scripts not in the
+    cell's forbidden bitmask, with chances proportional to probabilities
+    (uniform if None, or if every allowed script has zero weight). Unlike
+    choose_allowed, the pick depends only on the cell's own draw.
+    """
+    if probabilities is None:
+        probabilities = np.ones(num_scripts)
+    script_bits = np.left_shift(np.uint32(1), np.arange(num_scripts, dtype=np.uint32))
+    chosen = np.zeros(len(forbidden), dtype=np.uint8)
+    for start in range(0, len(forbidden), CHOICE_CHUNK):
+        cells = slice(start, start + CHOICE_CHUNK)
+        allowed = (forbidden[cells][:, None] & script_bits[None, :]) == 0
+        cell_weights = allowed * probabilities
+        totals = cell_weights.sum(axis=1)
+        empty = totals <= 0
+        if empty.any():
+            cell_weights[empty] = allowed[empty]
+            totals[empty] = allowed[empty].sum(axis=1)
+        cumulative = np.cumsum(cell_weights, axis=1)
+        picks = (cumulative <= (draws[cells] * totals)[:, None]).sum(axis=1)
+        chosen[cells] = np.minimum(picks, num_scripts - 1)
+    return chosen
+
+
+def assign_tile_scripts(seed, top, left, height, width, rows, cols, num_scripts, fixed,
+                        sampling_strategy="random", weights=None):
+    """
+    Script ids of the height x width tile at (top, left) of a rows x cols
+    grid, identical to the same cells of assign_scripts_counter(rows, cols,
+    ...) but computed from the tile and a TILE_HALO border around it only.
+
+    Cells are filled in the four PARITY_CLASSES steps of the fast engine,
+    each avoiding the scripts of its already assigned 8-neighbours, but every
+    cell's draw comes from cell_uniforms(seed, row, col). A cell therefore
+    depends only on cells at most TILE_HALO rows and columns away, and two
+    tiles agree on the scripts along their shared edge, so adjacent cells
+    never share a script across tiles either.
+
+    "least_used" needs running totals over the whole grid and is treated as
+    "random".
+
+    Parameters:
+    -----------
+    rows, cols : int
+        Dimensions of the whole grid (cells beyond its edges do not exist)
+    fixed : dict
+        Fixed cells of the whole grid, {(row, col): script id}
+    weights : list or None
+        Per-id weights for "weighted"; ignored otherwise
+    """
+    if not (0 <= top and 0 <= left and top + height <= rows and left + width <= cols):
+        raise ValueError("Tile does not fit in the grid")
+    probabilities = None
+    if sampling_strategy == "weighted" and weights is not None:
+        probabilities = np.asarray(weights, dtype=np.float64)
+
+    # The tile and its halo are filled; the ring of cells around them only
+    # holds fixed cells, which the cells on the edge of the halo must avoid
+    # like everywhere else in the grid
+    r0, r1 = max(0, top - TILE_HALO - 1), min(rows, top + height + TILE_HALO + 1)
+    c0, c1 = max(0, left - TILE_HALO - 1), min(cols, left + width + TILE_HALO + 1)
+    fill = np.zeros((r1 - r0, c1 - c0), dtype=bool)
+    fill[max(0, top - TILE_HALO) - r0:min(rows, top + height + TILE_HALO) - r0,
+         max(0, left - TILE_HALO) - c0:min(cols, left + width + TILE_HALO) - c0] = True
+    draws = cell_uniforms(seed, np.arange(r0, r1)[:, None], np.arange(c0, c1)[None, :])
+
+    # Fixed cells are in place from the start, so every neighbour avoids them
+    grid = np.zeros((r1 - r0, c1 - c0), dtype=np.uint8)
+    assigned = np.zeros((r1 - r0, c1 - c0), dtype=bool)
+    for (r, c), s in fixed.items():
+        if r0 <= r < r1 and c0 <= c < c1:
+            grid[r - r0, c - c0] = s
+            assigned[r - r0, c - c0] = True
+    for row_parity, col_parity in PARITY_CLASSES:
+        # The classes are those of the whole grid, not of the region
+        in_class = (slice((row_parity - r0) % 2, None, 2), slice((col_parity - c0) % 2, None, 2))
+        forbidden = neighbour_masks(grid, assigned)[in_class]
+        chosen = choose_by_draw(forbidden.ravel(), draws[in_class].ravel(), num_scripts, probabilities)
+        update = fill[in_class] & ~assigned[in_class]
+        grid[in_class] = np.where(update, chosen.reshape(forbidden.shape), grid[in_class])
+        assigned[in_class] |= update
+    return grid[top - r0:top - r0 + height, left - c0:left - c0 + width]
+
+
+def _assign_tile(args):
+    """Process-pool task: one band of rows of the counter engine."""
+    return assign_tile_scripts(*args)
+
+
+def assign_scripts_counter(rows, cols, num_scripts, fixed, seed, sampling_strategy="random",
+                           weights=None, workers=None, band_rows=BAND_ROWS):
+    """
+    Assign script ids so that each cell's script is a pure function of
+    (seed, row, col) and the grid size: the whole-grid form of
+    assign_tile_scripts. Bands of band_rows rows are generated independently
+    (in a process pool if workers > 1) and need no seam repair, so the
+    result never depends on band_rows or workers.
+
+    Parameters:
+    -----------
+    seed : int
+        Seed of the per-cell hash
+    workers : int or None
+        Size of the process pool (default 1, i.e. in-process)
+    """
+    tasks = [(seed, top, 0, min(band_rows, rows - top), cols, rows, cols, num_scripts, fixed,
+              sampling_strategy, weights) for top in range(0, rows, band_rows)]
+    workers = workers or 1
+    if workers == 1 or len(tasks) <= 1:
+        bands = [_assign_tile(task) for task in tasks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            bands = list(pool.map(_assign_tile, tasks))
+    return np.concatenate(bands, axis=0) if bands else np.zeros((0, cols), dtype=np.uint8)
@@ -0,0 +1,178 @@
+"""
+Precompiled preamble formats and font warmup for fast xelatex compiles.
+
+The package loading at the top of every generated poster (fontspec, tikz,
+xcolor, ...) is the same for every request, so it is dumped once into a
+format file with mylatexformat and reused by every later compile with
+-fmt. XeTeX cannot dump loaded OpenType fonts, so the dump stops right
+after the \\usepackage lines (at the \\endofdump marker inserted by
+prepare_source) and \\setmainfont and everything after it are still read
+on each run.
+"""
+import os
+import re
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+
+from numeral_scripts import SCRIPT_NAMES, script_font
+
+logger = logging.getLogger(__name__)
+
+FORMAT_DIR_ENV = "PI_LATEX_FORMAT_DIR"
+FAST_ENV = "PI_LATEX_FAST"
+
+# Expands to \relax when the format is not in use, so the source compiles either way
+END_OF_DUMP = r"\csname endofdump\endcsname"
+
+# Log messages that mean another xelatex pass would change the output
+_RERUN_PATTERN = re.compile(r"Rerun to get|Label\(s\) may have changed|Please rerun")
+
+_formats = {}
+_formats_lock = threading.Lock()
+_build_locks = {}
+
+
+def fast_mode_enabled():
+    """Fast compiles are on unless PI_LATEX_FAST is set to 0/false/no."""
+    return os.environ.get(FAST_ENV, "1").lower() not in ("0", "false", "no")
+
+
+def format_dir():
+    return os.environ.get(FORMAT_DIR_ENV) or os.path.join(tempfile.gettempdir(), "pi_latex_formats")
+
+
+def split_preamble(latex_code):
+    """
+    Split a document into (dumpable, rest): the leading \\documentclass and
+    \\usepackage lines, which can go into a format, and everything after.
+    """
+    lines = latex_code.split("\n")
+    end = 0
+    while end < len(lines) and lines[end].lstrip().startswith((r"\documentclass", r"\usepackage")):
+        end += 1
+    return "\n".join(lines[:end]), "\n".join(lines[end:])
+
+
+def prepare_source(latex_code):
+    """
+    The document with the end-of-dump marker after its package lines, and
+    the name of the format matching those lines.
+    """
+    dumpable, rest = split_preamble(latex_code)
+    name = "pi_preamble_" + hashlib.sha256(dumpable.encode("utf-8")).hexdigest()[:16]
+    return "\n".join([dumpable, END_OF_DUMP, rest]), dumpable, name
+
+
+def needs_rerun(log_text):
+    """True if the xelatex log asks for another pass (cross-references changed)."""
+    return bool(_RERUN_PATTERN.search(log_text))
+
+
+def _mylatexformat_available():
+    try:
+        result = subprocess.run(["kpsewhich", "mylatexformat.ltx"], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0 and bool(result.stdout.strip())
+
+
+def build_format(dumpable, name, timeout=300):
+    """
+    Dump the preamble lines into <format_dir>/<name>.fmt. Returns the
+    directory holding the format, or None if it could not be built.
+    """
+    directory = format_dir()
+    if os.path.exists(os.path.join(directory, f"{name}.fmt")):
+        return directory
+    if shutil.which("xelatex") is None or not _mylatexformat_available():
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix="pi_fmt_", dir=directory)
+    try:
+        with open(os.path.join(workdir, f"{name}.tex"), "w", encoding="utf-8") as f:
+            f.write("\n".join([dumpable, END_OF_DUMP, r"\begin{document}", r"\end{document}"]))
+        result = subprocess.run(
+            ["xelatex", "-ini", "-interaction=nonstopmode", f"-jobname={name}",
+             "&xelatex", "mylatexformat.ltx", f"{name}.tex"],
+            cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout,
+        )
+        built = os.path.join(workdir, f"{name}.fmt")
+        if result.returncode != 0 or not os.path.exists(built):
+            logger.warning("Could not build LaTeX format %s; compiling without it", name)
+            return None
+        os.replace(built, os.path.join(directory, f"{name}.fmt"))
+        return directory
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("Could not build LaTeX format %s: %s", name, e)
+        return None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def get_format(dumpable, name):
+    """
+    Directory of the format for these preamble lines, building it on first
+    use (once per process, even under concurrent requests). None if formats
+    are unavailable, in which case callers compile normally.
+    """
+    with _formats_lock:
+        if name in _formats:
+            return _formats[name]
+        build_lock = _build_locks.setdefault(name, threading.Lock())
+    with build_lock:
+        with _formats_lock:
+            if name in _formats:
+                return _formats[name]
+        directory = build_format(dumpable, name)
+        with _formats_lock:
+            _formats[name] = directory
+        return directory
+
+
+def warm_fonts(fonts=None):
+    """
+    Resolve every font the posters use through fontconfig, so the first
+    compile does not pay for the font lookup. Returns the fonts that were
+    not found (empty if fc-match is unavailable).
+    """
+    if fonts is None:
+        fonts = sorted({"Noto Sans"} | {script_font(script) for script in SCRIPT_NAMES})
+    if shutil.which("fc-match") is None:
+        return []
+    missing = []
+    for font in fonts:
+        try:
+            result = subprocess.run(["fc-match", "-f", "%{family}", font], capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if font.lower() not in result.stdout.lower():
+            missing.append(font)
+    return missing
+
+
+def warm_up(sample_latex=None):
+    """
+    Font lookup and format build for the standard preamble, meant to be run
+    in the background at server start. sample_latex is a poster's LaTeX, or
+    a function returning it (called only if the format is used).
+    """
+    missing = warm_fonts()
+    if missing:
+        logger.warning("Fonts not found: %s", ", ".join(missing))
+    if sample_latex is not None and fast_mode_enabled():
+        if callable(sample_latex):
+            sample_latex = sample_latex()
+        _, dumpable, name = prepare_source(sample_latex)
+        get_format(dumpable, name)
+
+
+def start_warm_up(sample_latex=None):
+    """Run warm_up on a daemon thread."""
+    thread = threading.Thread(target=warm_up, args=(sample_latex,), name="latex-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -1,44 +1,19 @@
 import unicodedata
+import argparse
+import logging
+import time
 import math
 import random
-import mpmath
 import json
 import numpy as np
-from PIL import Image, ImageDraw
-
-# Set precision for pi calculation
-mpmath.mp.dps = 1000  # Set precision to 1000 digits
-
-# Unicode numeral scripts with starting code points for digits (0-9)
-# Only including Indian scripts as specified
-NUMERAL_SCRIPTS = {
-    # Indian scripts
-    "Assamese": 0x09E6,  # Same as Bengali
-    "Bengali": 0x09E6,
-    "Devanagari": 0x0966,  # Used for Hindi, Sanskrit, Marathi, Bodo, Dogri, Konkani, Maithili, Nepali
-    "Gujarati": 0x0AE6,
-    "Gurmukhi": 0x0A66,  # Used for Punjabi
-    "Kannada": 0x0CE6,
-    "Malayalam": 0x0D66,
-    "Odia": 0x0B66,  # Formerly known as Oriya
-    "Ol Chiki": 0x1C50,  # Used for Santali
-    "Tamil": 0x0BE6,
-    "Telugu": 0x0C66,
-    "Urdu": 0x06F0,  # Uses Extended Arabic-Indic digits
-    "Kashmiri": 0x06F0,  # Uses Perso-Arabic script (Extended Arabic-Indic digits)
-    "Sindhi": 0x06F0,  # Uses Perso-Arabic script (Extended Arabic-Indic digits)
-    "Manipuri": 0xABF0,  # Meetei Mayek script
-    
-    # Add Latin for English
-    "Latin": 0x0030,
-}
-
-# Scripts that are well-supported in most LaTeX distributions and browsers
-WELL_SUPPORTED_SCRIPTS = [
-    "Latin", "Devanagari", "Bengali", "Assamese", "Gujarati", 
-    "Gurmukhi", "Tamil", "Telugu", "Kannada", "Malayalam", 
-    "Odia", "Urdu", "Kashmiri", "Sindhi", "Manipuri", "Ol Chiki"
-]
+import digit_store
+import grid_engine
+from numeral_scripts import NUMERAL_SCRIPTS, SCRIPT_NAMES, SCRIPT_IDS, WELL_SUPPORTED_SCRIPTS, DIGIT_TABLES, script_font
+from pi_grid import PiGrid
+from shape_masks import shape_mask, shape_mask_rows
+import metrics
+
+logger = logging.getLogger(__name__)
 
 # Constants for grid configuration and constraints
 MIN_DIGITS = 10
@@ -56,6 +31,9 @@ LEFT_RIGHT_MARGIN_PT = 5.0  # Reduced to 0.18 cm (was 28.3 for 1cm)
 TITLE_SPACE_PT = 42.0  # Space for title and padding below
 FOOTER_SPACE_PT = 20.0  # Space for footer text
 
+# Source of seeds for unseeded grids (OS entropy, no shared state to reseed)
+_seed_source = random.SystemRandom()
+
 def calculate_grid_dimensions(num_digits):
     """
     Calculate optimal rows and columns for a given number of digits to fit an A4 page ratio.
@@ -79,8 +57,8 @@ def calculate_grid_dimensions(num_digits):
     cols = max(3, round(cols))  # Minimum 3 columns
     rows = max(3, math.ceil(num_digits / cols))  # Minimum 3 rows, round up to ensure enough cells
     
-    print(f"Available space ratio: {actual_ratio:.3f} (vs A4 ratio: {A4_RATIO:.3f})")
-    print(f"Grid dimensions: {rows} rows x {cols} columns")
+    logger.debug("Available space ratio: %.3f (vs A4 ratio: %.3f)", actual_ratio, A4_RATIO)
+    logger.debug("Grid dimensions: %d rows x %d columns", rows, cols)
     return rows, cols
 
 def calculate_exact_font_size(rows, cols, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT):
@@ -106,91 +84,101 @@ def calculate_exact_font_size(rows, cols, left_right_margin_pt=LEFT_RIGHT_MARGIN
     
     # Reduced baseline skip to decrease vertical spacing
     baseline_skip = font_size * 1.05  # Reduced from 1.2 to 1.05
-    print(font_size, baseline_skip, left_right_margin_pt, cols, rows, cell_scale)
+    logger.debug("Font size %.3f, baseline skip %.3f, margin %s, %dx%d grid, cell scale %.3f",
+                 font_size, baseline_skip, left_right_margin_pt, rows, cols, cell_scale)
     return font_size, baseline_skip
 
-def get_pi_digits(n=200):
+@metrics.timed("digits")
+def get_pi_digits(n=200, offset=0):
+    """
+    Return n+1 characters of pi ("3.14159...", including the decimal point)
+    starting at character offset.
+
+    Digits come from the 1000 decimals embedded in digit_store, then from
+    the memory-mapped digit store when one has been built (see
+    digit_store.py) and is large enough; otherwise they are computed with
+    the Chudnovsky series of pi_stream (see computed_pi).
+    """
+    if offset + n + 1 <= len(digit_store.EMBEDDED_PI):
+        return digit_store.EMBEDDED_PI[offset:offset + n + 1]
+
+    store = digit_store.get_store()
+    if store is not None and offset + n + 1 <= len(store):
+        return store.pi_slice(n + 1, offset)
+
+    return computed_pi(offset + n + 1)[offset:offset + n + 1]
+
+# Longest "3.14..." computed by computed_pi in this process
+_computed_pi = ""
+
+def computed_pi(length):
     """
-    Generate the first n digits of pi using mpmath for high precision.
+    At least length characters of pi ("3.14159...") computed with the
+    Chudnovsky series, as when building the digit store. The longest result
+    is kept, so shorter and repeated requests are sliced from it.
     """
-    pi_str = str(mpmath.mp.pi)
-    # Keep the decimal point and take the first n+1 characters (including the decimal)
-    pi_digits = pi_str[:n+1]  # Include decimal point
-    return pi_digits
+    global _computed_pi
+    pi_str = _computed_pi
+    if len(pi_str) < length:
+        digits = digit_store.compute_pi_digits(length - 1)
+        pi_str = digits[0] + "." + digits[1:]
+        if len(pi_str) > len(_computed_pi):
+            _computed_pi = pi_str
+    return pi_str
 
 def convert_digit(digit, script):
     """
     Convert a single digit to the specified script.
+    The decimal point is returned as is.
     """
-    if digit == '.':
-        # Return the decimal point as is
-        return '.'
-    
-    start_code = NUMERAL_SCRIPTS[script]
-    return chr(start_code + int(digit))
+    return str(digit).translate(DIGIT_TABLES[script])
 
-def generate_pi_shape_mask(rows, cols):
+@metrics.timed("mask")
+def generate_pi_shape_mask(rows, cols, shape="pi"):
     """
-    Generate a mask in the shape of the π symbol.
+    Generate a mask in the shape of the π symbol (or another shape from
+    shape_masks, e.g. "circle").
     Returns a 2D array where True indicates a pixel that should be colored red.
     """
-    # Create a blank image
-    img = Image.new('1', (cols, rows), 0)
-    draw = ImageDraw.Draw(img)
-    
-    # Calculate dimensions for the pi symbol
-    width = cols * 0.7
-    height = rows * 0.7
-    x_offset = (cols - width) / 2
-    y_offset = (rows - height) / 2
-    
-    # Draw the horizontal line of pi
-    line_height = height * 0.2
-    draw.rectangle([(x_offset, y_offset), 
-                   (x_offset + width, y_offset + line_height)], fill=1)
-    
-    # Draw the left vertical line
-    left_x = x_offset + width * 0.25
-    draw.rectangle([(left_x - width * 0.1, y_offset), 
-                   (left_x + width * 0.1, y_offset + height)], fill=1)
-    
-    # Draw the right vertical line
-    right_x = x_offset + width * 0.75
-    draw.rectangle([(right_x - width * 0.1, y_offset), 
-                   (right_x + width * 0.1, y_offset + height)], fill=1)
-    
-    # Convert to numpy array
-    mask = np.array(img)
-    return mask
+    # Cached and read-only in shape_masks; callers get their own copy
+    return shape_mask(rows, cols, shape).copy()
 
-def get_valid_scripts(row, col, grid_scripts, rows, cols, used_scripts_count):
+def resolve_seed(seed=None):
     """
-    Get a list of valid scripts that don't conflict with adjacent cells,
-    prioritizing scripts that have been used less frequently.
+    The integer seed a grid is generated (and reported) with: seed itself if
+    it converts to an int, otherwise a fresh random one.
     """
-    adjacent_scripts = set()
-    
-    # Check all 8 adjacent positions
-    for dr in [-1, 0, 1]:
-        for dc in [-1, 0, 1]:
-            if dr == 0 and dc == 0:
-                continue  # Skip the current cell
-            
-            r, c = row + dr, col + dc
-            if 0 <= r < rows and 0 <= c < cols and grid_scripts[r][c] is not None:
-                adjacent_scripts.add(grid_scripts[r][c])
-    
-    # Get scripts that aren't used in adjacent cells
-    valid_scripts = [script for script in NUMERAL_SCRIPTS.keys() if script not in adjacent_scripts]
-    
-    # Sort by usage count (prefer less used scripts)
-    valid_scripts.sort(key=lambda s: used_scripts_count.get(s, 0))
-    
-    return valid_scripts
+    # Always use a seed - either the provided one or a new random one
+    if seed is not None:
+        # Explicitly convert to int in case it's a string or float
+        try:
+            seed_int = int(seed)
+            logger.debug("Using seed: %d", seed_int)
+            return seed_int
+        except (ValueError, TypeError):
+            # If conversion fails, generate a new random seed
+            seed_int = _seed_source.randint(1, 1000000)
+            logger.info("Invalid seed provided, using random seed: %d", seed_int)
+            return seed_int
+    # Generate a reproducible random seed
+    seed_int = _seed_source.randint(1, 1000000)
+    logger.debug("No seed provided, using random seed: %d", seed_int)
+    return seed_int
 
-def create_pi_grid(rows=10, cols=20, seed=None, sampling_strategy="random", script_weights=None):
+def create_pi_grid(rows=10, cols=20, seed=None, sampling_strategy="random", script_weights=None, engine="python", workers=None):
     """
     Create a grid of pi digits using different scripts for adjacent cells.
+
+    Returns (grid_digits, grid_scripts, script_usage, total_scripts_used, pi_mask);
+    see build_pi_grid for the parameters and the compact PiGrid form.
+    """
+    pi_grid = build_pi_grid(rows, cols, seed, sampling_strategy, script_weights, engine, workers)
+    return pi_grid.grid_digits, pi_grid.grid_scripts, pi_grid.script_usage, pi_grid.total_scripts_used, pi_grid.mask
+
+def build_pi_grid(rows=10, cols=20, seed=None, sampling_strategy="random", script_weights=None, engine="python", workers=None, shape="pi"):
+    """
+    Create a grid of pi digits using different scripts for adjacent cells,
+    returned as a PiGrid.
     
     Parameters:
     -----------
@@ -202,24 +190,24 @@ def create_pi_grid(rows=10, cols=20, seed=None, sampling_strategy="random", scri
         How to choose scripts - "random", "least_used", or "weighted"
     script_weights : dict or None
         If sampling_strategy is "weighted", use these weights for each script
+    engine : str
+        "python" (the original per-cell loop), "compat" (array-based, same
+        output as "python" for a given seed), "fast" (vectorized NumPy,
+        different but equally valid output for a given seed), "parallel"
+        (the fast engine on bands of rows across a process pool) or
+        "counter" (each cell a pure function of seed, row and column; see
+        build_pi_tile)
+    workers : int or None
+        Number of processes for the "parallel" engine (default: all cores)
+        or the "counter" engine (default: 1)
+    shape : str
+        Highlighted shape, a name from shape_masks ("pi", "circle", ...)
     """
-    # Always set a random seed - either the provided one or a new random one
-    if seed is not None:
-        # Explicitly convert to int in case it's a string or float
-        try:
-            seed_int = int(seed)
-            random.seed(seed_int)
-            print(f"Using seed: {seed_int}")
-        except (ValueError, TypeError):
-            # If conversion fails, generate a new random seed
-            seed_int = random.randint(1, 1000000)
-            random.seed(seed_int)
-            print(f"Invalid seed provided, using random seed: {seed_int}")
-    else:
-        # Generate a reproducible random seed
-        seed_int = random.randint(1, 1000000)
-        random.seed(seed_int)
-        print(f"No seed provided, using random seed: {seed_int}")
+    seed_int = resolve_seed(seed)
+    
+    # Per-call generator, so concurrent calls never share (or reseed) the
+    # global random state; same stream as random.seed(seed_int)
+    rng = random.Random(seed_int)
 
     pi_digits = get_pi_digits(rows * cols)
     
@@ -228,25 +216,58 @@ def create_pi_grid(rows=10, cols=20, seed=None, sampling_strategy="random", scri
     grid_digits = [[None for _ in range(cols)] for _ in range(rows)]
     
     # Generate pi shape mask for colored cells
-    pi_mask = generate_pi_shape_mask(rows, cols)
+    pi_mask = generate_pi_shape_mask(rows, cols, shape)
+    
+    # Script assignment is timed on its own (digits and mask time themselves)
+    start = time.perf_counter()
+    if engine in ("compat", "fast", "parallel", "counter"):
+        fixed = {(0, 0): SCRIPT_IDS["Latin"], (0, 1): SCRIPT_IDS["Latin"]}
+        weights = None
+        if script_weights is not None:
+            weights = [script_weights.get(script, 1.0) for script in SCRIPT_NAMES]
+        if engine == "compat":
+            preferred = [SCRIPT_IDS[script] for script in WELL_SUPPORTED_SCRIPTS]
+            script_ids = grid_engine.assign_scripts_compat(
+                rows, cols, len(SCRIPT_NAMES), fixed, rng, sampling_strategy, weights, preferred
+            )
+        elif engine == "parallel":
+            script_ids = grid_engine.assign_scripts_parallel(
+                rows, cols, len(SCRIPT_NAMES), fixed, seed_int, sampling_strategy, weights, workers
+            )
+        elif engine == "counter":
+            script_ids = grid_engine.assign_scripts_counter(
+                rows, cols, len(SCRIPT_NAMES), fixed, seed_int, sampling_strategy, weights, workers
+            )
+        else:
+            script_ids = grid_engine.assign_scripts_fast(
+                rows, cols, len(SCRIPT_NAMES), fixed, np.random.default_rng(seed_int), sampling_strategy, weights
+            )
+        metrics.record("scripts", time.perf_counter() - start)
+
+        return PiGrid.from_pi_digits(pi_digits, script_ids, pi_mask, seed_int, sampling_strategy)
     
-    # Track script usage
-    used_scripts_count = {script: 0 for script in NUMERAL_SCRIPTS.keys()}
+    # Track script usage, bucketed by count (see grid_engine.UsageIndex)
+    usage = grid_engine.UsageIndex(len(SCRIPT_NAMES), [SCRIPT_IDS[script] for script in WELL_SUPPORTED_SCRIPTS])
     
     # Set first digit to Latin "3"
     grid_scripts[0][0] = "Latin"
     grid_digits[0][0] = "3"
-    used_scripts_count["Latin"] += 1
+    usage.add(SCRIPT_IDS["Latin"])
     
     # Set second position to decimal point (keep it as a period)
     grid_scripts[0][1] = "Latin"
     grid_digits[0][1] = "."
-    used_scripts_count["Latin"] += 1
+    usage.add(SCRIPT_IDS["Latin"])
     
     # Default weights for weighted sampling if none provided
     if script_weights is None:
         script_weights = {script: 1.0 for script in NUMERAL_SCRIPTS.keys()}
     
+    # Alias tables per set of neighbouring scripts, shared with other grids using the same weights
+    sampler = None
+    if sampling_strategy == "weighted":
+        sampler = grid_engine.alias_sampler(tuple(float(script_weights.get(script, 1.0)) for script in SCRIPT_NAMES))
+    
     # Fill the rest of the grid
     for row in range(rows):
         for col in range(cols):
@@ -265,60 +286,154 @@ def create_pi_grid(rows=10, cols=20, seed=None, sampling_strategy="random", scri
             if digit == '.':
                 continue
             
-            # Get valid scripts for this position (those not already in adjacent cells)
-            valid_scripts = get_valid_scripts(row, col, grid_scripts, rows, cols, used_scripts_count)
-            
-            # For better browser compatibility, prefer well-supported scripts
-            well_supported = [s for s in valid_scripts if s in WELL_SUPPORTED_SCRIPTS]
-            if well_supported:
-                valid_scripts = well_supported + [s for s in valid_scripts if s not in WELL_SUPPORTED_SCRIPTS]
-            
-            if not valid_scripts:
-                # If no valid scripts, use any script (this shouldn't happen with 15+ scripts)
-                valid_scripts = list(NUMERAL_SCRIPTS.keys())
+            # Bitmask of the scripts already in adjacent cells
+            forbidden = 0
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    r, c = row + dr, col + dc
+                    if (dr or dc) and 0 <= r < rows and 0 <= c < cols and grid_scripts[r][c] is not None:
+                        forbidden |= 1 << SCRIPT_IDS[grid_scripts[r][c]]
             
             # Choose a script based on the selected sampling strategy
-            if sampling_strategy == "random":
-                # Completely random selection from valid scripts
-                chosen_script = random.choice(valid_scripts)
-            
-            elif sampling_strategy == "least_used":
-                # Original strategy: choose least used script (valid_scripts is already sorted by usage)
-                chosen_script = valid_scripts[0]
+            if sampling_strategy == "least_used":
+                # The least used valid script, well-supported scripts first
+                chosen_script = SCRIPT_NAMES[usage.least_used(forbidden)]
             
             elif sampling_strategy == "weighted":
-                # Weighted random selection based on script_weights
-                # First filter the weights to only include valid scripts
-                valid_weights = {script: script_weights.get(script, 1.0) for script in valid_scripts}
-                total_weight = sum(valid_weights.values())
-                if total_weight > 0:
-                    # Normalize weights
-                    normalized_weights = [valid_weights[script]/total_weight for script in valid_scripts]
-                    chosen_script = random.choices(valid_scripts, weights=normalized_weights, k=1)[0]
-                else:
-                    # Fallback to random if weights are all zero
-                    chosen_script = random.choice(valid_scripts)
+                # Weighted random selection among the valid scripts (uniform if their weights are all zero)
+                chosen_script = SCRIPT_NAMES[sampler.sample(forbidden, rng.randrange, rng.random)]
+            
             else:
-                # Default to random if strategy not recognized
-                chosen_script = random.choice(valid_scripts)
+                # Random selection from the valid scripts, listed by usage
+                # with the well-supported ones first (any strategy not
+                # recognized is treated as random)
+                valid_scripts = [SCRIPT_NAMES[s] for s in usage.ordered(forbidden)]
+                if not valid_scripts:
+                    # If no valid scripts, use any script (this shouldn't happen with 15+ scripts)
+                    valid_scripts = list(NUMERAL_SCRIPTS.keys())
+                chosen_script = rng.choice(valid_scripts)
             
             # Store the script and convert the digit
             grid_scripts[row][col] = chosen_script
             grid_digits[row][col] = convert_digit(digit, chosen_script)
             
             # Update usage count
-            used_scripts_count[chosen_script] += 1
+            usage.add(SCRIPT_IDS[chosen_script])
+    metrics.record("scripts", time.perf_counter() - start)
     
-    # Calculate script diversity statistics
-    script_usage = {script: count for script, count in used_scripts_count.items() if count > 0}
-    total_scripts_used = len(script_usage)
+    return PiGrid.from_lists(grid_digits, grid_scripts, pi_mask, seed_int, sampling_strategy)
+
+def build_pi_tile(rows, cols, top, left, height, width, seed=None, sampling_strategy="random", script_weights=None, shape="pi"):
+    """
+    The height x width tile at (top, left) of the rows x cols grid that
+    build_pi_grid(rows, cols, seed, ..., engine="counter") returns, as a
+    PiGrid, generated without the rest of the grid. Pages or the visible
+    part of a zoomable view of a huge poster can be built this way, in any
+    order and in parallel.
     
-    return grid_digits, grid_scripts, script_usage, total_scripts_used, pi_mask
+    Parameters:
+    -----------
+    rows, cols : int
+        Dimensions of the whole grid
+    top, left : int
+        First row and column of the tile
+    height, width : int
+        Dimensions of the tile
+    seed : int or None
+        Random seed; every tile of one grid must be built with the same one
+    shape : str
+        Highlighted shape, a name from shape_masks, laid over the whole grid
+    """
+    seed_int = resolve_seed(seed)
+    start = time.perf_counter()
+    fixed = {(0, 0): SCRIPT_IDS["Latin"], (0, 1): SCRIPT_IDS["Latin"]}
+    weights = None
+    if script_weights is not None:
+        weights = [script_weights.get(script, 1.0) for script in SCRIPT_NAMES]
+    script_ids = grid_engine.assign_tile_scripts(seed_int, top, left, height, width, rows, cols,
+                                                 len(SCRIPT_NAMES), fixed, sampling_strategy, weights)
+    metrics.record("scripts", time.perf_counter() - start)
+    
+    # The tile's digits are spread over the span of the grid from its first
+    # to its last cell, read in one piece
+    first = top * cols + left
+    span = get_pi_digits((height - 1) * cols + width - 1, first).ljust(height * cols, "0")
+    chars = np.frombuffer(span[:height * cols].encode("ascii"), dtype=np.uint8).reshape(height, cols)[:, :width]
+    pi_mask = shape_mask_rows(rows, cols, top, top + height, shape)[:, left:left + width]
+    return PiGrid.from_pi_digits(chars.tobytes().decode("ascii"), script_ids, pi_mask, seed_int, sampling_strategy)
 
-def generate_latex(grid_digits, grid_scripts, rows=10, cols=20, title="π in Indian Scripts", pi_mask=None, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT):
+def _macro_letters(index):
+    """Letters-only suffix for the index-th font macro (a, b, ..., z, ba, bb, ...)."""
+    letters = ""
+    while True:
+        letters = chr(ord("a") + index % 26) + letters
+        index //= 26
+        if index == 0:
+            return letters
+
+def _macro_row(row, digit_row, script_row, mask_row, rows, cell_scale, font_letters, scope=None):
+    """
+    Cell lines of one grid row in the "macros" LaTeX style: one short macro
+    call per cell. With scope set (group_by_script), only the cells of that
+    font's TikZ scope are returned, without the font suffix; scope="" selects
+    the decimal point.
+    """
+    lines = []
+    y = round(rows * cell_scale - row * cell_scale - cell_scale / 2, 4)
+    for col, (digit_char, script) in enumerate(zip(digit_row, script_row)):
+        highlight = mask_row is not None and mask_row[col]
+        if script == "Latin" and digit_char == ".":
+            # Decimal point in the main font
+            if scope:
+                continue
+            macro = r"\hcP" if highlight else r"\dcP"
+        else:
+            letters = font_letters[script_font(script)]
+            if scope is None:
+                macro = (r"\hc" if highlight else r"\dc") + letters
+            elif scope == letters:
+                macro = r"\hc" if highlight else r"\dc"
+            else:
+                continue
+        x = round(col * cell_scale + cell_scale / 2, 4)
+        lines.append(macro + "{" + f"{x:g},{y:g}" + "}{" + digit_char + "}")
+    return lines
+
+def generate_latex(grid_digits, grid_scripts, rows=10, cols=20, title="π in Indian Scripts", pi_mask=None, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, style="macros", group_by_script=False):
     """
     Generate LaTeX code for the pi grid.
+    
+    Parameters:
+    -----------
+    style : str
+        "macros" declares one \\newfontfamily per used font and a font-size
+        macro in the preamble and writes each cell as a short macro call;
+        "inline" is the original output with a \\fontspec and \\fontsize
+        switch in every cell node
+    group_by_script : bool
+        With the "macros" style, put each font's cells in one TikZ scope
+        that sets the font once
+    """
+    return "".join(iter_latex(grid_digits, grid_scripts, rows, cols, title, pi_mask,
+                              left_right_margin_pt, style, group_by_script))
+
+def iter_latex(grid_digits, grid_scripts, rows=10, cols=20, title="π in Indian Scripts", pi_mask=None, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, style="macros", group_by_script=False):
+    """
+    Yield the LaTeX code of generate_latex in chunks: the preamble, one
+    chunk per grid row (per row and font with group_by_script) and the end
+    of the document. The grids are only accessed one row at a time, so they
+    can be sequences that build rows on demand (see PiGrid.lazy_rows).
     """
+    # One pass over the rows for the fonts and scripts used
+    used_scripts = set()
+    cell_fonts = set()
+    for digit_row, script_row in zip(grid_digits, grid_scripts):
+        for digit_char, script in zip(digit_row, script_row):
+            if script:  # Only add if script is not None
+                used_scripts.add(script)
+                if not (script == "Latin" and digit_char == "."):
+                    cell_fonts.add(script_font(script))
+    
     latex = []
     latex.append(r"\documentclass[12pt]{article}")
     latex.append(r"\usepackage[a4paper, top=2cm, left=0.18cm, right=0.18cm, bottom=0.5cm]{geometry} % Margins: top=2cm, left/right=0.18cm, bottom=0.5cm")
@@ -335,6 +450,30 @@ def generate_latex(grid_digits, grid_scripts, rows=10, cols=20, title="π in Ind
     # Set up fonts
     latex.append(r"\setmainfont{Noto Sans}")
     
+    # Calculate precise font size to fit the grid on the page
+    # Calculate a fresh font size with the provided margin value
+    font_size, baseline_skip = calculate_exact_font_size(rows, cols, left_right_margin_pt)
+    font_size_cmd = f"\\fontsize{{{font_size:.1f}pt}}{{{baseline_skip:.1f}pt}}\\selectfont"
+    
+    if style == "macros":
+        # Each used font is loaded once, with a short cell macro per font
+        # (\dca{x,y}{digit}) and its highlighted variant (\hca{x,y}{digit});
+        # \dcP/\hcP set the decimal point in the main font (upper case, so they
+        # cannot clash with a font suffix)
+        font_letters = {font: _macro_letters(i) for i, font in enumerate(sorted(cell_fonts))}
+        for font, letters in font_letters.items():
+            latex.append(r"\newfontfamily\digitfont" + letters + "{" + font + "}")
+        latex.append(r"\newcommand{\digitsize}{" + font_size_cmd + "}")
+        latex.append(r"\newcommand{\dcP}[2]{\node at (#1) {\digitsize #2};}")
+        latex.append(r"\newcommand{\hcP}[2]{\node at (#1) {\textcolor{highlight}{\digitsize #2}};}")
+        if group_by_script:
+            latex.append(r"\newcommand{\dc}[2]{\node at (#1) {#2};}")
+            latex.append(r"\newcommand{\hc}[2]{\node[text=highlight] at (#1) {#2};}")
+        else:
+            for font, letters in font_letters.items():
+                latex.append(r"\newcommand{\dc" + letters + r"}[2]{\node at (#1) {\digitfont" + letters + r"\digitsize #2};}")
+                latex.append(r"\newcommand{\hc" + letters + r"}[2]{\node at (#1) {\textcolor{highlight}{\digitfont" + letters + r"\digitsize #2}};}")
+    
     # Define colors
     latex.append(r"\definecolor{bg}{RGB}{252, 252, 252}")
     latex.append(r"\definecolor{gridline}{RGB}{220, 220, 220}")
@@ -362,12 +501,7 @@ def generate_latex(grid_digits, grid_scripts, rows=10, cols=20, title="π in Ind
     latex.append(r"\vspace{0.5cm}")
     latex.append(r"\end{center}")
     
-    # Calculate precise font size to fit the grid on the page
-    # Calculate a fresh font size with the provided margin value
-    font_size, baseline_skip = calculate_exact_font_size(rows, cols, left_right_margin_pt)
-    font_size_cmd = f"\\fontsize{{{font_size:.1f}pt}}{{{baseline_skip:.1f}pt}}\\selectfont"
-    print(left_right_margin_pt)
-    print("I am inside", font_size_cmd)
+    logger.debug("LaTeX margin %s, font size %s", left_right_margin_pt, font_size_cmd)
     
     # Calculate cell scale factor for larger grids
     cell_scale = min(1.0, 30.0/max(rows, cols))  # Scale down for larger grids
@@ -380,61 +514,69 @@ def generate_latex(grid_digits, grid_scripts, rows=10, cols=20, title="π in Ind
     latex.append(r"\draw[fill=white, draw=none] (0,0) rectangle (" + 
                 str(cols * cell_scale) + "," + str(rows * cell_scale) + ");")
     
-    # Place digits with adjusted spacing
-    for row in range(rows):
-        for col in range(cols):
-            # Get the digit and script
-            digit_char = grid_digits[row][col]
-            script = grid_scripts[row][col]
+    yield "\n".join(latex) + "\n"
+    
+    # Place digits with adjusted spacing, one row at a time
+    if style == "macros" and group_by_script:
+        # Decimal point first, then one pass over the rows per font scope
+        for row in range(rows):
+            lines = _macro_row(row, grid_digits[row], grid_scripts[row], pi_mask[row] if pi_mask is not None else None,
+                               rows, cell_scale, font_letters, scope="")
+            if lines:
+                yield "\n".join(lines) + "\n"
+        for letters in font_letters.values():
+            yield r"\begin{scope}[every node/.style={font=\digitfont" + letters + r"\digitsize}]" + "\n"
+            for row in range(rows):
+                lines = _macro_row(row, grid_digits[row], grid_scripts[row], pi_mask[row] if pi_mask is not None else None,
+                                   rows, cell_scale, font_letters, scope=letters)
+                if lines:
+                    yield "\n".join(lines) + "\n"
+            yield r"\end{scope}" + "\n"
+    
+    elif style == "macros":
+        for row in range(rows):
+            lines = _macro_row(row, grid_digits[row], grid_scripts[row], pi_mask[row] if pi_mask is not None else None,
+                               rows, cell_scale, font_letters)
+            yield "\n".join(lines) + "\n"
+    
+    else:
+        for row in range(rows):
+            digit_row = grid_digits[row]
+            script_row = grid_scripts[row]
+            mask_row = pi_mask[row] if pi_mask is not None else None
+            latex = []
+            for col in range(cols):
+                # Get the digit and script
+                digit_char = digit_row[col]
+                script = script_row[col]
             
-            # Calculate position with scaled cell size - slightly compressed spacing
-            x = col * cell_scale + cell_scale/2
-            y = rows * cell_scale - row * cell_scale - cell_scale/2  # Invert y-axis for LaTeX
+                # Calculate position with scaled cell size - slightly compressed spacing
+                x = col * cell_scale + cell_scale/2
+                y = rows * cell_scale - row * cell_scale - cell_scale/2  # Invert y-axis for LaTeX
             
-            # Check if this cell should be highlighted (in pi shape)
-            if pi_mask is not None and pi_mask[row][col]:
-                color_cmd = r"\textcolor{highlight}"
-            else:
-                color_cmd = ""
+                # Check if this cell should be highlighted (in pi shape)
+                if mask_row is not None and mask_row[col]:
+                    color_cmd = r"\textcolor{highlight}"
+                else:
+                    color_cmd = ""
             
-            # Add the digit with proper script, color, and font size
-            if script == "Latin" and digit_char == ".":
-                # Handle decimal point specially
-                latex.append(r"\node at (" + f"{x},{y}" + r") {" + color_cmd + r"{" + font_size_cmd + r" .}};")
-            else:
-                # Fix the script variable issue by using proper string formatting
-                font_name = "Noto Sans"
-                if script in ["Urdu", "Kashmiri", "Sindhi"]:
-                    font_name = "Noto Sans Arabic"
-                elif script == "Assamese":
-                    font_name = "Noto Sans Bengali"
-                elif script == "Manipuri":
-                    font_name = "Noto Sans Meetei Mayek"
-                elif script == "Odia":
-                    font_name = "Noto Sans Oriya"
-                elif script == "Latin":
-                    font_name = "Noto Sans"
+                # Add the digit with proper script, color, and font size
+                if script == "Latin" and digit_char == ".":
+                    # Handle decimal point specially
+                    latex.append(r"\node at (" + f"{x},{y}" + r") {" + color_cmd + r"{" + font_size_cmd + r" .}};")
                 else:
-                    font_name = f"Noto Sans {script}"
+                    font_name = script_font(script)
                 
-                latex.append(r"\node at (" + f"{x},{y}" + r") {" + color_cmd + r"{\fontspec{" + font_name + "}" + font_size_cmd + r" " + digit_char + r"}};")
+                    latex.append(r"\node at (" + f"{x},{y}" + r") {" + color_cmd + r"{\fontspec{" + font_name + "}" + font_size_cmd + r" " + digit_char + r"}};")
+            yield "\n".join(latex) + "\n"
     
+    latex = []
     latex.append(r"\end{tikzpicture}")
     latex.append(r"\end{center}")
     
     # Add legend for scripts
     latex.append(r"\vspace{1cm}")
     
-    # Get unique scripts used
-    used_scripts = set()
-    for row in grid_scripts:
-        for script in row:
-            if script:  # Only add if script is not None
-                used_scripts.add(script)
-    
-    # Sort scripts alphabetically
-    used_scripts = sorted(list(used_scripts))
-    
     # Add footer with information
     latex.append(r"\vfill")
     latex.append(r"\begin{center}")
@@ -444,11 +586,39 @@ def generate_latex(grid_digits, grid_scripts, rows=10, cols=20, title="π in Ind
     # End document
     latex.append(r"\end{document}")
     
-    return "\n".join(latex)
+    yield "\n".join(latex)
 
-def generate_json_data(num_digits=200, seed=None, sampling_strategy="random", script_weights=None):
+@metrics.timed("latex")
+def generate_grid_latex(pi_grid, title="π in Indian Scripts", left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, style="macros", group_by_script=False):
     """
-    Generate JSON data for the web interface based on number of digits.
+    Generate LaTeX code for a PiGrid (see generate_latex for style and group_by_script).
+    """
+    return "".join(iter_grid_latex(pi_grid, title, left_right_margin_pt, style, group_by_script))
+
+def iter_grid_latex(pi_grid, title="π in Indian Scripts", left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, style="macros", group_by_script=False):
+    """
+    Yield the LaTeX code for a PiGrid in chunks (see iter_latex), building
+    only one row of the legacy lists at a time.
+    """
+    grid_digits, grid_scripts, pi_mask = pi_grid.lazy_rows()
+    return iter_latex(grid_digits, grid_scripts, pi_grid.rows, pi_grid.cols,
+                      title, pi_mask, left_right_margin_pt, style, group_by_script)
+
+def build_digit_grid(num_digits=200, seed=None, sampling_strategy="random", script_weights=None):
+    """
+    Build the PiGrid shown for a given number of digits, using the optimal
+    grid dimensions. Takes the same parameters as pi_grid_data.
+    """
+    # Calculate optimal rows and columns for this number of digits
+    rows, cols = calculate_grid_dimensions(num_digits)
+    logger.debug("Building %dx%d grid, seed %s, strategy %s", rows, cols, seed, sampling_strategy)
+    
+    # Create the pi grid with the specified sampling strategy
+    return build_pi_grid(rows, cols, seed, sampling_strategy, script_weights)
+
+def pi_grid_data(num_digits=200, seed=None, sampling_strategy="random", script_weights=None):
+    """
+    Generate the data object for the web interface based on number of digits.
     
     Parameters:
     -----------
@@ -461,75 +631,86 @@ def generate_json_data(num_digits=200, seed=None, sampling_strategy="random", sc
     script_weights : dict or None
         If sampling_strategy is "weighted", use these weights for each script
     """
-    # Calculate optimal rows and columns for this number of digits
-    rows, cols = calculate_grid_dimensions(num_digits)
-    print("In generate json", seed, "strategy:", sampling_strategy)
+    pi_grid = build_digit_grid(num_digits, seed, sampling_strategy, script_weights)
     
-    # Create the pi grid with the specified sampling strategy
-    grid_digits, grid_scripts, script_usage, total_scripts_used, pi_mask = create_pi_grid(
-        rows, cols, seed, sampling_strategy, script_weights
-    )
+    # Report the seed the grid was actually generated with
+    return pi_grid.to_dict(num_digits)
+
+def generate_json_data(num_digits=200, seed=None, sampling_strategy="random", script_weights=None):
+    """
+    Generate JSON data for the web interface based on number of digits.
+    Takes the same parameters as pi_grid_data.
+    """
+    return json.dumps(pi_grid_data(num_digits, seed, sampling_strategy, script_weights), indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the pi poster as LaTeX and JSON, and optionally as an image.")
+    parser.add_argument("--digits", type=int, default=200, help="Number of digits of pi (default: 200)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (default: random)")
+    parser.add_argument("--image", help="Also render the poster to this .png or .webp file")
+    parser.add_argument("--dpi", type=int, default=150, help="Image resolution (default: 150)")
+    parser.add_argument("--cell-size", type=float, default=None,
+                        help="Cell size in points for a large-format image sized to fit the grid")
+    parser.add_argument("--book", help="Write the digits as a multi-page PDF book to this file instead, "
+                                       "for any number of digits (no LaTeX)")
+    parser.add_argument("--min-font", type=float, default=6.0,
+                        help="Smallest digit size in points for --book (default: 6)")
+    parser.add_argument("--shape", default="pi", help="Highlighted shape: pi or circle (default: pi)")
+    parser.add_argument("--paper", default="A4", help="Sheet size for --book: A4, A3, A2, A1 or A0 (default: A4)")
+    args = parser.parse_args(argv)
+    
+    if args.book:
+        import book_layout
+        import vector_render
+        book = book_layout.BookLayout(args.digits, args.min_font, args.paper, shape=args.shape)
+        print(f"Pi book ({book.num_digits} digits in a {book.rows}x{book.cols} grid) on {book.num_pages} "
+              f"{book.paper} pages at {book.font_size():.1f}pt")
+        # Each page is generated and written before the next one
+        with open(args.book, "wb") as f:
+            for chunk in vector_render.iter_book_pdf(book, args.seed):
+                f.write(chunk)
+        print(f"PDF book generated: {args.book}")
+        return
     
-    # Convert grid data to format suitable for JSON
-    grid_data = []
-    for row in range(rows):
-        row_data = []
-        for col in range(cols):
-            cell = {
-                "digit": grid_digits[row][col],
-                "script": grid_scripts[row][col],
-                "unicode": hex(ord(grid_digits[row][col])) if grid_digits[row][col] != '.' else "0x2E",
-                "highlight": bool(pi_mask[row][col])  # Add highlight flag for pi shape
-            }
-            row_data.append(cell)
-        grid_data.append(row_data)
-    
-    # Create JSON object
-    data = {
-        "grid": grid_data,
-        "script_usage": script_usage,
-        "total_scripts_used": total_scripts_used,
-        "rows": rows,
-        "cols": cols,
-        "num_digits": num_digits,
-        "seed": seed if seed is not None else random.randint(1, 1000000),
-        "sampling_strategy": sampling_strategy
-    }
-    
-    return json.dumps(data, indent=2)
-
-def main():
     # Set random seed for reproducibility (or use None for random)
-    seed = None
+    seed = args.seed
     
     # Set number of digits and calculate optimal grid dimensions
-    num_digits = 200
+    num_digits = args.digits
     rows, cols = calculate_grid_dimensions(num_digits)
     
     # Create the pi grid
-    grid_digits, grid_scripts, script_usage, total_scripts_used, pi_mask = create_pi_grid(rows, cols, seed)
+    pi_grid = build_pi_grid(rows, cols, seed, shape=args.shape)
+    script_usage = pi_grid.script_usage
+    total_scripts_used = len(script_usage)
     
     # Print the result
     print(f"Pi Visualization ({num_digits} digits in a {rows}x{cols} grid) using {total_scripts_used} different Indian scripts:")
-    for row in grid_digits:
-        print("".join(row))
-    
-    # Generate LaTeX code
-    latex_code = generate_latex(grid_digits, grid_scripts, rows, cols, pi_mask=pi_mask)
+    for row in range(rows):
+        print("".join(pi_grid.row_chars(row)))
     
-    # Save LaTeX to file
+    # Write the LaTeX code to file as it is generated, row by row
     with open("pi_visualization.tex", "w", encoding="utf-8") as f:
-        f.write(latex_code)
-    
-    # Generate JSON data for web interface
-    json_data = generate_json_data(num_digits, seed)
+        f.writelines(iter_grid_latex(pi_grid))
     
-    # Save JSON to file
+    # Write the JSON data for the web interface from the same grid
     with open("pi_data.json", "w", encoding="utf-8") as f:
-        f.write(json_data)
+        f.writelines(pi_grid.iter_json(num_digits))
     
     print(f"\nLaTeX file generated: pi_visualization.tex")
     print(f"JSON data generated: pi_data.json")
+    
+    if args.image:
+        import raster_render
+        if args.image.lower().endswith(".webp"):
+            with open(args.image, "wb") as f:
+                f.write(raster_render.render_raster(pi_grid, "webp", dpi=args.dpi, cell_size=args.cell_size))
+        else:
+            # Written strip by strip, so very large images never sit in memory
+            with open(args.image, "wb") as f:
+                width, height = raster_render.render_png_tiled(pi_grid, f, dpi=args.dpi, cell_size=args.cell_size)
+            print(f"Image size: {width}x{height}")
+        print(f"Image generated: {args.image}")
     print(f"\nTotal scripts used: {total_scripts_used}")
     print("Script usage statistics:")
     for script, count in sorted(script_usage.items(), key=lambda x: x[1], reverse=True):
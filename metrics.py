@@ -0,0 +1,229 @@
+"""
+Lightweight timing instrumentation for the pipeline stages.
+
+Stages (digit fetch, grid assignment, mask, serialization, LaTeX, xelatex,
+rendering) are wrapped in timed(), which records their durations in
+Prometheus-style histograms; the server adds per-endpoint request latency
+and serves everything in the Prometheus text format at /metrics. The
+stages timed while handling a request are also collected for its
+Server-Timing header.
+
+Setting PI_PROFILE_SAMPLE_RATE (0 to 1) runs cProfile on that fraction of
+requests and dumps each profile to PI_PROFILE_DIR (default: a folder in the
+system temp dir) as <endpoint>-<timestamp>.prof, for pstats or snakeviz.
+"""
+import os
+import time
+import random
+import bisect
+import logging
+import cProfile
+import tempfile
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILE_RATE_ENV = "PI_PROFILE_SAMPLE_RATE"
+PROFILE_DIR_ENV = "PI_PROFILE_DIR"
+
+# Upper bounds in seconds, from sub-millisecond array work to xelatex runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0)
+
+
+class Histogram:
+    """
+    Distribution of durations, one series per combination of label values,
+    with cumulative buckets as in Prometheus. Safe to use from several threads.
+    """
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        # Per series: a count per bucket (plus +Inf), then the sum of values
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        """{label values: (cumulative bucket counts, sum, count)}."""
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        result = {}
+        for labels, values in series.items():
+            cumulative, total = [], 0
+            for count in values[:-1]:
+                total += count
+                cumulative.append(total)
+            result[labels] = (cumulative, values[-1], total)
+        return result
+
+    def render(self):
+        """The histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (cumulative, total, count) in sorted(self.snapshot().items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values)]
+            for bound, value in zip([*map(_format_bound, self.buckets), "+Inf"], cumulative):
+                bucket_labels = ",".join(labels + ['le="%s"' % bound])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {value}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+_registry = []
+
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    """A new Histogram, included in render_prometheus()."""
+    hist = Histogram(name, help_text, labels, buckets)
+    _registry.append(hist)
+    return hist
+
+
+def render_prometheus():
+    """Every registered histogram in the Prometheus text format."""
+    return "".join(hist.render() for hist in _registry)
+
+
+STAGE_SECONDS = histogram("pi_stage_seconds", "Time spent in each pipeline stage.", ("stage",))
+
+# (stage, seconds) of the stages run for the current request, or None outside requests
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def record(stage, seconds):
+    """Add one duration of a stage to its histogram and to the current request."""
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage):
+    """
+    Time the enclosed block (or, used as a decorator, each call) as one
+    run of a stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed_iter(stage, chunks):
+    """
+    Yield from chunks, timing the work done to produce them (not the time
+    spent by the consumer) as one run of a stage. For streamed responses.
+    """
+    iterator = iter(chunks)
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            yield chunk
+    finally:
+        record(stage, elapsed)
+
+
+def start_request():
+    """Start collecting the stage timings of the request handled in this context."""
+    _request_timings.set([])
+
+
+def request_timings():
+    """[(stage, seconds)] for the current request, in the order they ran."""
+    return list(_request_timings.get() or [])
+
+
+def server_timing(timings, total=None):
+    """
+    Server-Timing header value for [(stage, seconds)], with repeated stages
+    added up, e.g. "digits;dur=0.41, scripts;dur=1.93, total;dur=3.02".
+    """
+    durations = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    if total is not None:
+        durations["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in durations.items())
+
+
+def profile_sample_rate():
+    try:
+        return min(1.0, max(0.0, float(os.environ.get(PROFILE_RATE_ENV, 0))))
+    except ValueError:
+        return 0.0
+
+
+def profile_dir():
+    return os.environ.get(PROFILE_DIR_ENV) or os.path.join(tempfile.gettempdir(), "pi_profiles")
+
+
+# Only one cProfile profiler can be active at a time
+_profile_lock = threading.Lock()
+
+
+def start_profile():
+    """
+    A running cProfile.Profile for a sampled request (with probability
+    PI_PROFILE_SAMPLE_RATE), or None. Pass it to stop_profile.
+    """
+    rate = profile_sample_rate()
+    if rate <= 0 or random.random() >= rate or not _profile_lock.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:  # Another profiler (e.g. a debugger) is active
+        _profile_lock.release()
+        return None
+    return profile
+
+
+def stop_profile(profile, name):
+    """Stop a profile from start_profile and dump it; returns the file path."""
+    if profile is None:
+        return None
+    try:
+        profile.disable()
+    finally:
+        _profile_lock.release()
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}-{time.time_ns()}.prof")
+    profile.dump_stats(path)
+    logger.info("Profile of %s written to %s", name, path)
+    return path
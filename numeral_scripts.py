@@ -0,0 +1,99 @@
+import numpy as np
+
+# Unicode numeral scripts with starting code points for digits (0-9)
+# Only including Indian scripts as specified
+NUMERAL_SCRIPTS = {
+    # Indian scripts
+    "Assamese": 0x09E6,  # Same as Bengali
+    "Bengali": 0x09E6,
+    "Devanagari": 0x0966,  # Used for Hindi, Sanskrit, Marathi, Bodo, Dogri, Konkani, Maithili, Nepali
+    "Gujarati": 0x0AE6,
+    "Gurmukhi": 0x0A66,  # Used for Punjabi
+    "Kannada": 0x0CE6,
+    "Malayalam": 0x0D66,
+    "Odia": 0x0B66,  # Formerly known as Oriya
+    "Ol Chiki": 0x1C50,  # Used for Santali
+    "Tamil": 0x0BE6,
+    "Telugu": 0x0C66,
+    "Urdu": 0x06F0,  # Uses Extended Arabic-Indic digits
+    "Kashmiri": 0x06F0,  # Uses Perso-Arabic script (Extended Arabic-Indic digits)
+    "Sindhi": 0x06F0,  # Uses Perso-Arabic script (Extended Arabic-Indic digits)
+    "Manipuri": 0xABF0,  # Meetei Mayek script
+    
+    # Add Latin for English
+    "Latin": 0x0030,
+}
+
+# Script ids used by the array-based engines (position in NUMERAL_SCRIPTS)
+SCRIPT_NAMES = list(NUMERAL_SCRIPTS.keys())
+SCRIPT_IDS = {script: i for i, script in enumerate(SCRIPT_NAMES)}
+
+# Lookup tables for converting digits, built once at import.
+# Column DECIMAL_POINT (10) of the matrices is the decimal point, "." in every script.
+LATIN_DIGITS = "0123456789."
+
+# Code point and display character of every (script id, digit value) pair,
+# for converting whole rows or grids with one fancy-index
+CODE_POINTS = np.array(
+    [[NUMERAL_SCRIPTS[script] + d for d in range(10)] + [ord(".")] for script in SCRIPT_NAMES],
+    dtype=np.uint32,
+)
+GLYPHS = np.vectorize(chr, otypes=["U1"])(CODE_POINTS)
+CODE_POINTS.setflags(write=False)
+GLYPHS.setflags(write=False)
+
+# str.translate tables from Latin digits to each script
+DIGIT_TABLES = {script: str.maketrans(LATIN_DIGITS, "".join(GLYPHS[i])) for i, script in enumerate(SCRIPT_NAMES)}
+
+# Reverse table: any script's digit (or a Latin digit or ".") to its Latin character
+TO_LATIN = str.maketrans({char: LATIN_DIGITS[d] for row in GLYPHS for d, char in enumerate(row)})
+
+# Sorted code points of every known digit character, and the digit value of each
+_REVERSE_CODES, _reverse_index = np.unique(CODE_POINTS, return_index=True)
+_REVERSE_VALUES = (_reverse_index % CODE_POINTS.shape[1]).astype(np.uint8)
+
+
+def to_script(text, script):
+    """Latin digits (and ".") in text written in a script, e.g. to_script("3.14", "Tamil")."""
+    return text.translate(DIGIT_TABLES[script])
+
+
+def to_latin(text):
+    """Digits of any script in text written as Latin digits (like convertToLatin in pi_functions.js)."""
+    return text.translate(TO_LATIN)
+
+
+def digit_values(code_points):
+    """
+    Digit value (0-9, or 10 for the decimal point) of an array of code
+    points of any script's digits. Raises ValueError if one is not a digit.
+    """
+    code_points = np.asarray(code_points, dtype=np.int64)
+    index = np.searchsorted(_REVERSE_CODES, code_points).clip(0, len(_REVERSE_CODES) - 1)
+    unknown = _REVERSE_CODES[index] != code_points
+    if unknown.any():
+        raise ValueError(f"Not a digit: {chr(int(code_points[unknown].flat[0]))!r}")
+    return _REVERSE_VALUES[index]
+
+
+# Scripts that are well-supported in most LaTeX distributions and browsers
+WELL_SUPPORTED_SCRIPTS = [
+    "Latin", "Devanagari", "Bengali", "Assamese", "Gujarati", 
+    "Gurmukhi", "Tamil", "Telugu", "Kannada", "Malayalam", 
+    "Odia", "Urdu", "Kashmiri", "Sindhi", "Manipuri", "Ol Chiki"
+]
+
+# Font used to typeset each script's digits (Noto Sans <script> unless listed)
+SCRIPT_FONTS = {
+    "Urdu": "Noto Sans Arabic",
+    "Kashmiri": "Noto Sans Arabic",
+    "Sindhi": "Noto Sans Arabic",
+    "Assamese": "Noto Sans Bengali",
+    "Manipuri": "Noto Sans Meetei Mayek",
+    "Odia": "Noto Sans Oriya",
+    "Latin": "Noto Sans",
+}
+
+def script_font(script):
+    """Name of the font used for a script's digits."""
+    return SCRIPT_FONTS.get(script, f"Noto Sans {script}")
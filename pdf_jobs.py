@@ -0,0 +1,329 @@
+"""
+Background PDF compilation for /generate_pdf.
+
+Jobs are compiled by a bounded pool of worker threads, each running xelatex
+in its own temporary directory, so concurrent requests never share files and
+a slow compile never blocks a request handler. The number of queued and
+running jobs is capped (QueueFull lets the server answer 503), every compile
+has a deadline, and queued or running jobs can be cancelled.
+"""
+import os
+import time
+import signal
+import uuid
+import shutil
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import latex_format
+import metrics
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MAX_PENDING = 32
+DEFAULT_MAX_FINISHED = 256
+MAX_PASSES = 3
+
+TEX_NAME = "pi_visualization"
+
+
+class QueueFull(Exception):
+    """Raised by submit when the queue already holds max_pending jobs."""
+
+
+class PdfCompileError(Exception):
+    """xelatex failed, timed out or produced no PDF."""
+
+
+class Cancelled(Exception):
+    pass
+
+
+def kill_process(process):
+    """Kill an xelatex run together with the tools it spawned (xdvipdfmx)."""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+@metrics.timed("xelatex")
+def compile_latex(latex_code, timeout=DEFAULT_TIMEOUT, passes=None, on_process=None, fast=None):
+    """
+    Compile LaTeX code to PDF bytes in a fresh temporary directory.
+
+    Parameters:
+    -----------
+    latex_code : str
+        Complete LaTeX document
+    timeout : float
+        Seconds allowed for all passes together
+    passes : int or None
+        Number of xelatex runs; None runs once more only while the log asks
+        for a rerun (the generated posters have no cross-references, so one
+        pass is enough), up to MAX_PASSES
+    on_process : callable or None
+        Called with each xelatex Popen (used for cancellation)
+    fast : bool or None
+        Use the precompiled preamble format (see latex_format.py);
+        None follows PI_LATEX_FAST
+    """
+    if fast is None:
+        fast = latex_format.fast_mode_enabled()
+    source, dumpable, format_name = latex_format.prepare_source(latex_code)
+    command = ["xelatex", "-interaction=nonstopmode"]
+    env = None
+    if fast:
+        directory = latex_format.get_format(dumpable, format_name)
+        if directory is not None:
+            command.append(f"-fmt={format_name}")
+            env = dict(os.environ, TEXFORMATS=directory + os.pathsep)
+    command.append(f"{TEX_NAME}.tex")
+
+    deadline = time.monotonic() + timeout
+    workdir = tempfile.mkdtemp(prefix="pi_pdf_")
+    try:
+        with open(os.path.join(workdir, f"{TEX_NAME}.tex"), "w", encoding="utf-8") as f:
+            f.write(source)
+
+        for pass_number in range(passes or MAX_PASSES):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PdfCompileError(f"LaTeX compilation timed out after {timeout:g}s")
+            process = subprocess.Popen(
+                command, cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                start_new_session=(os.name == "posix"),
+            )
+            if on_process is not None:
+                on_process(process)
+            try:
+                output, _ = process.communicate(timeout=remaining)
+            except subprocess.TimeoutExpired:
+                kill_process(process)
+                process.communicate()
+                raise PdfCompileError(f"LaTeX compilation timed out after {timeout:g}s")
+            if process.returncode < 0:
+                raise Cancelled()
+            if process.returncode != 0:
+                tail = output.decode("utf-8", "replace").strip().splitlines()[-5:]
+                raise PdfCompileError("LaTeX compilation failed: " + " / ".join(tail))
+            if passes is None and not _log_asks_for_rerun(workdir):
+                break
+
+        pdf_path = os.path.join(workdir, f"{TEX_NAME}.pdf")
+        if not os.path.exists(pdf_path):
+            raise PdfCompileError("Failed to generate PDF")
+        with open(pdf_path, "rb") as f:
+            return f.read()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _log_asks_for_rerun(workdir):
+    try:
+        with open(os.path.join(workdir, f"{TEX_NAME}.log"), encoding="utf-8", errors="replace") as f:
+            return latex_format.needs_rerun(f.read())
+    except OSError:
+        return False
+
+
+class PdfJob:
+    def __init__(self, key, latex_code):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.latex_code = latex_code
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.process = None
+        self.cancel_requested = False
+        self.done_event = threading.Event()
+
+    def to_dict(self):
+        data = {"job_id": self.id, "status": self.status, "created": self.created,
+                "started": self.started, "finished": self.finished}
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class PdfJobQueue:
+    """
+    Bounded pool of PDF compile workers.
+
+    Parameters:
+    -----------
+    workers : int or None
+        Number of concurrent xelatex compiles (default: all cores)
+    max_pending : int
+        Maximum number of queued plus running jobs
+    timeout : float
+        Seconds allowed per job
+    compile_fn : callable
+        compile_fn(latex_code, timeout=..., on_process=...) -> PDF bytes
+    on_done : callable or None
+        Called with each job that finished successfully
+    """
+
+    def __init__(self, workers=None, max_pending=DEFAULT_MAX_PENDING, timeout=DEFAULT_TIMEOUT,
+                 compile_fn=compile_latex, on_done=None, max_finished=DEFAULT_MAX_FINISHED):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.compile_fn = compile_fn
+        self.on_done = on_done
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-worker")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_by_key = {}
+        self._finished = OrderedDict()
+        self._closed = False
+
+    def submit(self, key, latex_code):
+        """
+        Queue a compile and return its PdfJob. A job already queued or running
+        for the same key is returned instead of compiling twice.
+        """
+        with self._lock:
+            active = self._active_by_key.get(key)
+            if active is not None:
+                return active
+            if self._closed:
+                raise QueueFull("PDF queue is shutting down")
+            if len(self._active_by_key) >= self.max_pending:
+                raise QueueFull(f"PDF queue is full ({self.max_pending} jobs)")
+            job = PdfJob(key, latex_code)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+            job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns the job, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in (QUEUED, RUNNING):
+                return job
+            job.cancel_requested = True
+            process = job.process
+        if job.future.cancel():
+            self._finish(job, CANCELLED)
+        elif process is not None and process.poll() is None:
+            kill_process(process)
+        return job
+
+    def wait(self, job, timeout=None):
+        """Block until the job finishes; returns True if it did."""
+        return job.done_event.wait(timeout)
+
+    def depth(self):
+        """Number of queued plus running jobs."""
+        with self._lock:
+            return len(self._active_by_key)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def close(self, timeout=None):
+        """
+        Graceful shutdown: stop taking jobs, cancel the queued ones and give
+        running compiles up to timeout seconds (None: their own deadline)
+        before killing them. Returns the number of compiles that were killed.
+        """
+        with self._lock:
+            self._closed = True
+            jobs = list(self._active_by_key.values())
+        for job in jobs:
+            if job.status == QUEUED:
+                self.cancel(job.id)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        killed = 0
+        for job in jobs:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job.done_event.wait(remaining):
+                self.cancel(job.id)
+                killed += 1
+        self.shutdown(wait=True)
+        return killed
+
+    def _attach_process(self, job, process):
+        with self._lock:
+            job.process = process
+            cancelled = job.cancel_requested
+        if cancelled:
+            kill_process(process)
+
+    def _run(self, job):
+        with self._lock:
+            cancelled = job.cancel_requested
+            if not cancelled:
+                job.status = RUNNING
+                job.started = time.time()
+        if cancelled:
+            self._finish(job, CANCELLED)
+            return
+        try:
+            pdf = self.compile_fn(job.latex_code, timeout=self.timeout,
+                                  on_process=lambda process: self._attach_process(job, process))
+        except Cancelled:
+            self._finish(job, CANCELLED)
+        except PdfCompileError as e:
+            self._finish(job, CANCELLED if job.cancel_requested else FAILED, error=str(e))
+        except Exception as e:
+            self._finish(job, FAILED, error=f"Error generating PDF: {str(e)}")
+        else:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+            else:
+                self._finish(job, DONE, result=pdf)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._lock:
+            if job.done_event.is_set():
+                return
+            job.status = status
+            job.result = result
+            job.error = error if status == FAILED else None
+            job.finished = time.time()
+            job.process = None
+            job.latex_code = None
+            if self._active_by_key.get(job.key) is job:
+                del self._active_by_key[job.key]
+            self._finished[job.id] = job
+            while len(self._finished) > self.max_finished:
+                old_id, _ = self._finished.popitem(last=False)
+                self._jobs.pop(old_id, None)
+        job.done_event.set()
+        if status == DONE and self.on_done is not None:
+            self.on_done(job)
+
+
+def queue_from_env(**kwargs):
+    """PdfJobQueue configured by PI_PDF_WORKERS, PI_PDF_MAX_PENDING and PI_PDF_TIMEOUT."""
+    workers = os.environ.get("PI_PDF_WORKERS")
+    return PdfJobQueue(
+        workers=int(workers) if workers else None,
+        max_pending=int(os.environ.get("PI_PDF_MAX_PENDING", DEFAULT_MAX_PENDING)),
+        timeout=float(os.environ.get("PI_PDF_TIMEOUT", DEFAULT_TIMEOUT)),
+        **kwargs,
+    )
@@ -0,0 +1,290 @@
+import json
+from collections.abc import Sequence
+
+import numpy as np
+
+from numeral_scripts import SCRIPT_NAMES, SCRIPT_IDS, CODE_POINTS, GLYPHS, digit_values
+
+# Digit value used for the decimal point cell
+DECIMAL_POINT = 10
+
+# "unicode" field of the JSON cells for every (script id, digit value) pair
+_UNICODE_LABELS = np.array([[hex(code) for code in row] for row in CODE_POINTS.tolist()], dtype=object)
+_UNICODE_LABELS[:, DECIMAL_POINT] = "0x2E"
+
+
+class PiGrid:
+    """
+    Compact, array-backed pi grid.
+
+    Holds one uint8 digit value (0-9, or DECIMAL_POINT) and one uint8 script
+    id per cell, plus the pi-shape highlight mask packed eight cells per byte,
+    i.e. a little over 2 bytes per cell. The nested lists and per-cell dicts
+    used by the LaTeX generator, the JSON output and the web interface are
+    produced on demand from these arrays.
+    """
+
+    def __init__(self, digits, script_ids, highlight=None, seed=None, sampling_strategy="random"):
+        self.digits = np.ascontiguousarray(digits, dtype=np.uint8)
+        self.script_ids = np.ascontiguousarray(script_ids, dtype=np.uint8)
+        if self.digits.shape != self.script_ids.shape or self.digits.ndim != 2:
+            raise ValueError("digits and script_ids must be 2D arrays of the same shape")
+        if highlight is None:
+            highlight = np.zeros(self.digits.shape, dtype=bool)
+        self._highlight_bits = np.packbits(np.asarray(highlight, dtype=bool).ravel())
+        self.seed = seed
+        self.sampling_strategy = sampling_strategy
+
+    @classmethod
+    def from_pi_digits(cls, pi_digits, script_ids, highlight=None, seed=None, sampling_strategy="random"):
+        """
+        Build a grid from the "3.14159..." string as returned by get_pi_digits,
+        reading it row by row (padding with 0 if it is too short).
+        """
+        rows, cols = np.shape(script_ids)
+        num_cells = rows * cols
+        chars = pi_digits[:num_cells].ljust(num_cells, "0")
+        chars = np.frombuffer(chars.encode("ascii"), dtype=np.uint8).reshape(rows, cols)
+        values = np.where(chars == ord("."), DECIMAL_POINT, chars - ord("0"))
+        return cls(values, script_ids, highlight, seed, sampling_strategy)
+
+    @classmethod
+    def from_lists(cls, grid_digits, grid_scripts, pi_mask=None, seed=None, sampling_strategy="random"):
+        """
+        Build a grid from the legacy nested lists of display characters and
+        script names.
+        """
+        script_ids = np.array([[SCRIPT_IDS[script] for script in row] for row in grid_scripts], dtype=np.uint8)
+        code_points = np.array([[ord(char) for char in row] for row in grid_digits], dtype=np.int64)
+        values = digit_values(code_points)
+        if script_ids.shape != values.shape or not np.array_equal(CODE_POINTS[script_ids, values], code_points):
+            raise ValueError("Grid digits do not match their scripts")
+        return cls(values, script_ids, pi_mask, seed, sampling_strategy)
+
+    @classmethod
+    def from_data(cls, pi_data):
+        """
+        Build a grid from the data object produced by to_dict (as posted back
+        by the web interface), validating it: the grid must be rectangular
+        (and match "rows" and "cols" if given), every digit must be one of
+        its script's numerals, and no two neighbouring cells (including
+        diagonals) may share a script. Raises ValueError otherwise.
+        """
+        try:
+            grid = pi_data["grid"]
+            rows = len(grid)
+            cols = len(grid[0]) if rows else 0
+            if not rows or not cols or any(len(row) != cols for row in grid):
+                raise ValueError("Grid must be a non-empty rectangle")
+            if (pi_data.get("rows", rows), pi_data.get("cols", cols)) != (rows, cols):
+                raise ValueError("Grid does not match its rows and cols")
+            cells = [cell for row in grid for cell in row]
+            chars = "".join([cell["digit"] for cell in cells])
+            scripts = [cell["script"] for cell in cells]
+            highlight = np.array([bool(cell.get("highlight", False)) for cell in cells], dtype=bool)
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed grid data: {e!r}") from None
+        if len(chars) != rows * cols:
+            raise ValueError("Every cell must hold exactly one digit")
+
+        # Look up each distinct script name once rather than once per cell
+        names, inverse = np.unique(np.array(scripts, dtype=str), return_inverse=True)
+        unknown = [name for name in names.tolist() if name not in SCRIPT_IDS]
+        if unknown:
+            raise ValueError(f"Unknown scripts: {', '.join(unknown)}")
+        script_ids = np.array([SCRIPT_IDS[name] for name in names.tolist()], dtype=np.uint8)[inverse]
+        script_ids = script_ids.reshape(rows, cols)
+
+        code_points = np.frombuffer(chars.encode("utf-32-le"), dtype=np.uint32).reshape(rows, cols)
+        values = digit_values(code_points)
+        if not np.array_equal(CODE_POINTS[script_ids, values], code_points):
+            raise ValueError("Grid digits do not match their scripts")
+        if adjacent_clashes(script_ids).any():
+            raise ValueError("Neighbouring cells share a script")
+        return cls(values, script_ids, highlight.reshape(rows, cols), pi_data.get("seed"),
+                   pi_data.get("sampling_strategy", "random"))
+
+    @property
+    def rows(self):
+        return self.digits.shape[0]
+
+    @property
+    def cols(self):
+        return self.digits.shape[1]
+
+    @property
+    def shape(self):
+        return self.digits.shape
+
+    @property
+    def mask(self):
+        """Highlight mask as a (rows, cols) boolean array."""
+        return np.unpackbits(self._highlight_bits, count=self.rows * self.cols).reshape(self.shape).astype(bool)
+
+    def mask_rows(self, start, end):
+        """Highlight mask of rows start..end, unpacking only those bits."""
+        first, last = start * self.cols, end * self.cols
+        bits = np.unpackbits(self._highlight_bits[first // 8:(last + 7) // 8])
+        return bits[first % 8:first % 8 + last - first].reshape(end - start, self.cols).astype(bool)
+
+    @property
+    def code_points(self):
+        """Unicode code point of every cell's display character."""
+        return CODE_POINTS[self.script_ids, self.digits]
+
+    def row_chars(self, row):
+        """Display characters of one row."""
+        return GLYPHS[self.script_ids[row], self.digits[row]].tolist()
+
+    def row_scripts(self, row):
+        """Script names of one row."""
+        return [SCRIPT_NAMES[i] for i in self.script_ids[row].tolist()]
+
+    @property
+    def grid_digits(self):
+        """Display characters as nested lists (legacy grid_digits)."""
+        return GLYPHS[self.script_ids, self.digits].tolist()
+
+    @property
+    def grid_scripts(self):
+        """Script names as nested lists (legacy grid_scripts)."""
+        return [[SCRIPT_NAMES[i] for i in row] for row in self.script_ids.tolist()]
+
+    def lazy_rows(self):
+        """
+        (grid_digits, grid_scripts, mask) as read-only sequences that build
+        each row only when it is accessed, for writers that stream the grid
+        without holding the nested lists.
+        """
+        return (LazyRows(self.row_chars, self.rows), LazyRows(self.row_scripts, self.rows),
+                LazyRows(lambda row: self.mask_rows(row, row + 1)[0].tolist(), self.rows))
+
+    @property
+    def script_usage(self):
+        """{script: count} for every script used, in NUMERAL_SCRIPTS order."""
+        # Counted in blocks, as bincount widens its input to 8 bytes per cell
+        cells = self.script_ids.ravel()
+        counts = np.zeros(len(SCRIPT_NAMES), dtype=np.int64)
+        for start in range(0, cells.size, 1 << 16):
+            counts += np.bincount(cells[start:start + (1 << 16)], minlength=len(SCRIPT_NAMES))
+        return {script: int(count) for script, count in zip(SCRIPT_NAMES, counts) if count > 0}
+
+    @property
+    def total_scripts_used(self):
+        return len(self.script_usage)
+
+    @property
+    def nbytes(self):
+        return self.digits.nbytes + self.script_ids.nbytes + self._highlight_bits.nbytes
+
+    def cell_rows(self):
+        """
+        Yield each row as a list of the per-cell dicts used in the JSON output.
+        """
+        for row in range(self.rows):
+            script_ids, digits = self.script_ids[row], self.digits[row]
+            chars = GLYPHS[script_ids, digits].tolist()
+            labels = _UNICODE_LABELS[script_ids, digits].tolist()
+            highlights = self.mask_rows(row, row + 1)[0].tolist()
+            yield [
+                {
+                    "digit": char,
+                    "script": SCRIPT_NAMES[script],
+                    "unicode": label,
+                    "highlight": highlight,
+                }
+                for char, script, label, highlight in zip(chars, script_ids.tolist(), labels, highlights)
+            ]
+
+    def to_dict(self, num_digits=None):
+        """
+        The data object served to the web interface (see pi_data.json).
+        """
+        script_usage = self.script_usage
+        return {
+            "grid": list(self.cell_rows()),
+            "script_usage": script_usage,
+            "total_scripts_used": len(script_usage),
+            "rows": self.rows,
+            "cols": self.cols,
+            "num_digits": num_digits if num_digits is not None else self.rows * self.cols,
+            "seed": self.seed,
+            "sampling_strategy": self.sampling_strategy,
+        }
+
+    def iter_json(self, num_digits=None, indent=2, separators=None):
+        """
+        Yield json.dumps(self.to_dict(num_digits), indent=indent,
+        separators=separators) in chunks, one grid row at a time, so the
+        document can be written or streamed without building it in memory.
+        """
+        script_usage = self.script_usage
+        head = {"grid": [None]}
+        rest = {
+            "script_usage": script_usage,
+            "total_scripts_used": len(script_usage),
+            "rows": self.rows,
+            "cols": self.cols,
+            "num_digits": num_digits if num_digits is not None else self.rows * self.cols,
+            "seed": self.seed,
+            "sampling_strategy": self.sampling_strategy,
+        }
+        # Everything around the rows comes from json itself, with the grid
+        # stubbed out by a single null row
+        before, after = json.dumps({**head, **rest}, indent=indent, separators=separators).split("null", 1)
+        if indent is None:
+            item_separator = separators[0] if separators else ", "
+            row_indent = ""
+        else:
+            item_separator = separators[0] if separators else ","
+            row_indent = "\n" + " " * (2 * indent)
+
+        yield before
+        for row, cells in enumerate(self.cell_rows()):
+            text = json.dumps(cells, indent=indent, separators=separators)
+            if row:
+                yield item_separator + row_indent
+            yield text.replace("\n", row_indent) if indent is not None else text
+        yield after
+
+
+def adjacent_clashes(script_ids):
+    """
+    Boolean (rows, cols) array of the cells that share their script with one
+    of their 8 neighbours. The fixed "3" and "." cells are both Latin by
+    design, so that one pair is not a clash.
+    """
+    ids = np.asarray(script_ids)
+    rows, cols = ids.shape
+    clashes = np.zeros(ids.shape, dtype=bool)
+    # Each pair of neighbours is compared once: cell (r, c) against
+    # (r + dr, c + dc) to its right, below, below right and below left
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        cell = (slice(0, rows - dr), slice(max(0, -dc), cols - max(0, dc)))
+        neighbour = (slice(dr, rows), slice(max(0, dc), cols + min(0, dc)))
+        same = ids[cell] == ids[neighbour]
+        if (dr, dc) == (0, 1) and same.size:
+            same[0, 0] = False
+        clashes[cell] |= same
+        clashes[neighbour] |= same
+    return clashes
+
+
+class LazyRows(Sequence):
+    """Read-only sequence of rows, each computed by row_fn(row) when accessed."""
+
+    def __init__(self, row_fn, length):
+        self._row_fn = row_fn
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self._length))]
+        if row < 0:
+            row += self._length
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        return self._row_fn(row)
@@ -0,0 +1,165 @@
+import os
+import math
+import decimal
+import argparse
+from decimal import Decimal
+
+# Chudnovsky series constants
+CHUDNOVSKY_C3_OVER_24 = 640320 ** 3 // 24
+CHUDNOVSKY_A = 13591409
+CHUDNOVSKY_B = 545140134
+DIGITS_PER_TERM = math.log10(CHUDNOVSKY_C3_OVER_24 / 72)  # ~14.18 digits per term
+
+# Extra digits carried through the final division and dropped afterwards
+GUARD_DIGITS = 10
+
+CHECKPOINT_VERSION = "chudnovsky-v1"
+
+# Exact integer arithmetic on Decimals: libmpdec multiplies large operands
+# with a number-theoretic transform, which beats CPython's Karatsuba ints and
+# converts to a decimal string in linear time.
+_EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+
+def _binary_split(a, b):
+    """
+    Binary splitting of the Chudnovsky series over terms [a, b).
+    Returns the (P, Q, T) triple as exact Decimals.
+    """
+    if b - a == 1:
+        if a == 0:
+            p = q = Decimal(1)
+        else:
+            p = Decimal((6 * a - 5) * (2 * a - 1) * (6 * a - 1))
+            q = Decimal(a * a * a) * Decimal(CHUDNOVSKY_C3_OVER_24)
+        t = p * Decimal(CHUDNOVSKY_A + CHUDNOVSKY_B * a)
+        if a & 1:
+            t = -t
+        return p, q, t
+
+    m = (a + b) // 2
+    p_am, q_am, t_am = _binary_split(a, m)
+    p_mb, q_mb, t_mb = _binary_split(m, b)
+    return p_am * p_mb, q_am * q_mb, q_mb * t_am + p_am * t_mb
+
+
+def _sqrt(value, prec):
+    """
+    Square root by Newton iteration with doubling precision; much faster than
+    Context.sqrt at hundreds of thousands of digits.
+    """
+    x = Decimal(repr(math.sqrt(value)))
+    p = 15
+    while p < prec:
+        p = min(2 * p, prec)
+        ctx = decimal.Context(prec=p + GUARD_DIGITS, Emax=decimal.MAX_EMAX)
+        x = ctx.multiply(Decimal("0.5"), ctx.add(x, ctx.divide(Decimal(value), x)))
+    return x
+
+
+class ChudnovskySeries:
+    """
+    Partial sums of the Chudnovsky series that can be extended and saved.
+
+    The (P, Q, T) triple of terms [0, terms) is kept so that extending to
+    more terms only evaluates the new ones and merges them, instead of
+    recomputing from scratch when a larger digit count is requested.
+    """
+
+    def __init__(self, checkpoint_path=None):
+        self.checkpoint_path = checkpoint_path
+        self.terms = 0
+        self.p = self.q = self.t = None
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            self.load(checkpoint_path)
+
+    def extend(self, terms):
+        """Make sure the series covers at least the given number of terms."""
+        if terms <= self.terms:
+            return False
+        with decimal.localcontext(_EXACT):
+            p, q, t = _binary_split(self.terms, terms)
+            if self.terms:
+                # Merge [0, old) with [old, new)
+                p, q, t = self.p * p, self.q * q, q * self.t + self.p * t
+        self.p, self.q, self.t = p, q, t
+        self.terms = terms
+        return True
+
+    def digits(self, num_digits):
+        """
+        Return "3" followed by num_digits decimals of pi, extending the series
+        (and saving the checkpoint) if it is too short.
+        """
+        if self.extend(int(num_digits / DIGITS_PER_TERM) + 2) and self.checkpoint_path:
+            self.save(self.checkpoint_path)
+
+        prec = num_digits + GUARD_DIGITS
+        ctx = decimal.Context(prec=prec, Emax=decimal.MAX_EMAX)
+        pi = ctx.divide(ctx.multiply(ctx.multiply(self.q, Decimal(426880)), _sqrt(10005, prec)), self.t)
+        pi_str = str(pi)
+        return pi_str[0] + pi_str[2:num_digits + 2]
+
+    def save(self, path):
+        """Write the series state atomically, so an interrupted save is harmless."""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="ascii") as f:
+            f.write(f"{CHECKPOINT_VERSION}\n{self.terms}\n{self.p}\n{self.q}\n{self.t}\n")
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        with open(path, "r", encoding="ascii") as f:
+            version, terms, p, q, t = f.read().split("\n")[:5]
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint format in {path}: {version!r}")
+        self.terms = int(terms)
+        self.p, self.q, self.t = Decimal(p), Decimal(q), Decimal(t)
+
+
+def iter_pi_digits(n=None, chunk_size=65536, checkpoint_path=None):
+    """
+    Yield the characters of "3.14159..." in chunks of at most chunk_size.
+
+    Parameters:
+    -----------
+    n : int or None
+        Number of characters after the leading "3" to produce, matching
+        get_pi_digits(n). If None, digits are produced indefinitely: the
+        precision doubles each round and only the new digits are yielded.
+    chunk_size : int
+        Maximum length of each yielded string
+    checkpoint_path : str or None
+        File used to persist the series between runs, so a later, larger
+        request resumes from the saved terms
+    """
+    if n is not None and n < 2:
+        yield "3."[:n + 1]
+        return
+
+    series = ChudnovskySeries(checkpoint_path)
+
+    yield "3."
+    produced = 0  # Decimal digits already yielded
+    target = n - 1 if n is not None else 1024
+    while target > produced:
+        decimals = series.digits(target)[1:]
+        for start in range(produced, target, chunk_size):
+            yield decimals[start:min(start + chunk_size, target)]
+        produced = target
+        if n is None:
+            target *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute digits of pi with the Chudnovsky series.")
+    parser.add_argument("--digits", type=int, default=100000, help="number of decimal digits to compute")
+    parser.add_argument("--checkpoint", default=None, help="series checkpoint file to resume from and update")
+    args = parser.parse_args()
+
+    for chunk in iter_pi_digits(args.digits + 1, checkpoint_path=args.checkpoint):
+        print(chunk, end="")
+    print()
+
+
+if __name__ == "__main__":
+    main()
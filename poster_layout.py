@@ -0,0 +1,98 @@
+"""
+Page geometry of the pi poster for the native (non-LaTeX) renderers.
+
+Uses the same page size, margins and font size as the LaTeX poster
+(calculate_exact_font_size), with the grid centred below the title. A
+layout can also split the rows over several pages, or use a fixed cell
+size with the page grown to fit the grid for large-format prints.
+"""
+from main import (
+    A4_WIDTH_PT, A4_HEIGHT_PT, TOP_MARGIN_PT, BOTTOM_MARGIN_PT, TITLE_SPACE_PT,
+    FOOTER_SPACE_PT, LEFT_RIGHT_MARGIN_PT, calculate_exact_font_size,
+)
+
+# \Huge and \tiny at the poster's 12pt base size
+TITLE_FONT_PT = 24.88
+FOOTER_FONT_PT = 6.0
+
+HIGHLIGHT_RGB = (231, 76, 60)
+TEXT_RGB = (0, 0, 0)
+TITLE_RGB = (0, 0, 0)
+
+
+class PosterLayout:
+    """
+    Parameters:
+    -----------
+    rows, cols : int
+        Dimensions of the grid
+    left_right_margin_pt : float
+        Left and right page margin
+    rows_per_page : int or None
+        Split the grid over pages of this many rows (default: one page)
+    cell_size : float or None
+        Cell size in points for large-format output; the page is sized to
+        fit the grid instead of being A4
+    paper_size : (float, float) or None
+        Page width and height in points when not A4 (e.g. an A0 sheet); the
+        grid is fitted to it as to an A4 page
+    """
+
+    def __init__(self, rows, cols, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, rows_per_page=None, cell_size=None,
+                 paper_size=None):
+        self.rows = rows
+        self.cols = cols
+        self.margin = left_right_margin_pt
+        self.rows_per_page = min(rows_per_page or rows, rows)
+        page_rows = self.rows_per_page
+
+        # Same font size to cell size ratio as the LaTeX poster
+        font_size, _ = calculate_exact_font_size(page_rows, cols, left_right_margin_pt)
+        available_width = A4_WIDTH_PT - 2 * left_right_margin_pt
+        available_height = A4_HEIGHT_PT - TOP_MARGIN_PT - BOTTOM_MARGIN_PT - TITLE_SPACE_PT - FOOTER_SPACE_PT
+        a4_cell = min(available_width / cols, available_height / page_rows)
+
+        if cell_size is None and paper_size is not None:
+            self.page_width, self.page_height = paper_size
+            reserved_height = TOP_MARGIN_PT + BOTTOM_MARGIN_PT + TITLE_SPACE_PT + FOOTER_SPACE_PT
+            self.cell = min((self.page_width - 2 * left_right_margin_pt) / cols,
+                            (self.page_height - reserved_height) / page_rows)
+            self.font_size = font_size * self.cell / a4_cell
+        elif cell_size is None:
+            self.cell = a4_cell
+            self.font_size = font_size
+            self.page_width = A4_WIDTH_PT
+            self.page_height = A4_HEIGHT_PT
+        else:
+            self.cell = cell_size
+            self.font_size = font_size * cell_size / a4_cell
+            self.page_width = cols * cell_size + 2 * left_right_margin_pt
+            self.page_height = (TOP_MARGIN_PT + TITLE_SPACE_PT + page_rows * cell_size
+                                + FOOTER_SPACE_PT + BOTTOM_MARGIN_PT)
+
+        self.grid_left = (self.page_width - cols * self.cell) / 2
+        self.grid_top = TOP_MARGIN_PT + TITLE_SPACE_PT
+        self.title_baseline = TOP_MARGIN_PT + TITLE_FONT_PT * 0.75
+        self.footer_baseline = self.page_height - BOTTOM_MARGIN_PT - FOOTER_FONT_PT
+
+    @property
+    def num_pages(self):
+        return -(-self.rows // self.rows_per_page)
+
+    def page_rows(self, page):
+        """(first row, end row) shown on a page."""
+        start = page * self.rows_per_page
+        return start, min(start + self.rows_per_page, self.rows)
+
+    def cell_center(self, row, col):
+        """Centre of a cell on its page, in points from the top-left corner."""
+        page_row = row % self.rows_per_page
+        return (self.grid_left + (col + 0.5) * self.cell,
+                self.grid_top + (page_row + 0.5) * self.cell)
+
+    def footer_text(self, page, used_scripts):
+        text = (f"This poster displays the first {self.rows * self.cols} digits of π "
+                f"using {used_scripts} different Indian numeral scripts.")
+        if self.num_pages > 1:
+            text += f" Page {page + 1} of {self.num_pages}."
+        return text
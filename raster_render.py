@@ -0,0 +1,307 @@
+"""
+Raster (PNG/WebP) rendering of the pi poster with Pillow.
+
+Every (script, digit, colour) glyph is rasterized once per cell size and
+kept in a tile cache bounded by bytes; a page is drawn by stacking the tiles
+of the glyphs it uses into an atlas and gathering from it with NumPy. For very large outputs, iter_bands
+yields the page as horizontal strips and write_png streams them to a PNG
+file, so the full image is never held in memory.
+
+Pillow is imported by the functions that draw, not with the module, so
+importing this module (as the server does) stays cheap.
+"""
+import io
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+import metrics
+from numeral_scripts import NUMERAL_SCRIPTS, SCRIPT_NAMES, GLYPHS, script_font
+from font_files import resolve_font_file
+from poster_layout import (
+    PosterLayout, TITLE_FONT_PT, FOOTER_FONT_PT, HIGHLIGHT_RGB, TEXT_RGB, TITLE_RGB,
+)
+from pi_grid import DECIMAL_POINT
+from main import LEFT_RIGHT_MARGIN_PT
+
+DEFAULT_TITLE = "π in Indian Scripts"
+DEFAULT_DPI = 150
+MAIN_FONT = "Noto Sans"
+
+IMAGE_FORMATS = {"png": ("PNG", "image/png"), "webp": ("WEBP", "image/webp")}
+
+WHITE = np.array([255, 255, 255], dtype=np.float32)
+
+# Glyphs are numbered script id * GLYPHS_PER_SCRIPT + digit value
+GLYPHS_PER_SCRIPT = DECIMAL_POINT + 1
+NUM_GLYPHS = len(SCRIPT_NAMES) * GLYPHS_PER_SCRIPT
+
+# Memory for glyph tiles kept between renders, and the largest atlas one
+# render may stack (small grids at high dpi have very large cells)
+TILE_CACHE_BYTES = 64 * 1024 * 1024
+MAX_ATLAS_BYTES = 128 * 1024 * 1024
+
+
+class AtlasTooLarge(ValueError):
+    """The glyphs of a page at this cell size would not fit in MAX_ATLAS_BYTES."""
+
+
+@lru_cache(maxsize=64)
+def _font(font_name, size_px, bold=False, code_points=()):
+    from PIL import ImageFont
+    path = resolve_font_file(font_name, bold, code_points)
+    if path is None:
+        return ImageFont.load_default(size_px)
+    return ImageFont.truetype(path, size_px)
+
+
+def _script_font(script_id, size_px):
+    script = SCRIPT_NAMES[script_id]
+    start = NUMERAL_SCRIPTS[script]
+    return _font(script_font(script), size_px, False, tuple(range(start, start + 10)))
+
+
+class TileCache:
+    """Least recently used glyph tiles, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes=TILE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            tiles = self._tiles.get(key)
+            if tiles is not None:
+                self._tiles.move_to_end(key)
+                return tiles
+        tiles = build()
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = tiles
+                self.nbytes += tiles.nbytes
+            while self.nbytes > self.max_bytes and len(self._tiles) > 1:
+                _, old = self._tiles.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return tiles
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self.nbytes = 0
+
+
+tile_cache = TileCache()
+
+
+def _draw_glyph(glyph, cell_px, font_px):
+    from PIL import Image, ImageDraw
+    script_id, digit = divmod(glyph, GLYPHS_PER_SCRIPT)
+    if digit == DECIMAL_POINT:
+        font = _font(MAIN_FONT, font_px, False, (ord("."),))
+    else:
+        font = _script_font(script_id, font_px)
+    coverage = Image.new("L", (cell_px, cell_px), 0)
+    ImageDraw.Draw(coverage).text((cell_px / 2, cell_px / 2), GLYPHS[script_id, digit], font=font, fill=255,
+                                  anchor="mm")
+    alpha = np.asarray(coverage, dtype=np.float32)[..., None] / 255
+    colors = np.array([TEXT_RGB, HIGHLIGHT_RGB], dtype=np.float32)
+    tiles = np.empty((2, cell_px, cell_px, 3), dtype=np.uint8)
+    for highlighted, color in enumerate(colors):
+        tiles[highlighted] = np.rint(WHITE * (1 - alpha) + color * alpha)
+    tiles.setflags(write=False)
+    return tiles
+
+
+def glyph_tiles(glyph, cell_px, font_px):
+    """
+    RGB tiles of one glyph (numbered script id * GLYPHS_PER_SCRIPT + digit),
+    plain and highlighted, each cell_px square with the glyph centred on
+    white. Shape (2, cell_px, cell_px, 3), uint8, cached in tile_cache.
+    """
+    return tile_cache.get((glyph, cell_px, font_px), lambda: _draw_glyph(glyph, cell_px, font_px))
+
+
+def atlas_nbytes(cell_px, num_glyphs):
+    return num_glyphs * 2 * cell_px * cell_px * 3
+
+
+def used_glyphs(pi_grid, start=0, end=None, band_rows=1024):
+    """Sorted numbers of the glyphs in grid rows start..end."""
+    end = pi_grid.rows if end is None else end
+    seen = np.zeros(NUM_GLYPHS, dtype=bool)
+    for band_start in range(start, end, band_rows):
+        band = slice(band_start, min(band_start + band_rows, end))
+        seen[pi_grid.script_ids[band].astype(np.intp) * GLYPHS_PER_SCRIPT + pi_grid.digits[band]] = True
+    return np.flatnonzero(seen)
+
+
+def glyph_atlas(cell_px, font_px, glyphs):
+    """
+    The tiles of the given glyphs stacked for a gather, as (atlas, index):
+    atlas has shape (len(glyphs), 2, cell_px, cell_px, 3) and index maps a
+    glyph number to its row in atlas. Raises AtlasTooLarge past
+    MAX_ATLAS_BYTES.
+    """
+    if atlas_nbytes(cell_px, len(glyphs)) > MAX_ATLAS_BYTES:
+        raise AtlasTooLarge(f"{len(glyphs)} glyphs of {cell_px} pixels would take "
+                            f"{atlas_nbytes(cell_px, len(glyphs)) >> 20} MiB")
+    atlas = np.empty((len(glyphs), 2, cell_px, cell_px, 3), dtype=np.uint8)
+    for i, glyph in enumerate(glyphs):
+        atlas[i] = glyph_tiles(int(glyph), cell_px, font_px)
+    index = np.zeros(NUM_GLYPHS, dtype=np.intp)
+    index[glyphs] = np.arange(len(glyphs))
+    return atlas, index
+
+
+def warm_glyphs(cell_px, font_px):
+    """Draw every glyph at this size into tile_cache, if they all fit in it."""
+    if atlas_nbytes(cell_px, NUM_GLYPHS) > tile_cache.max_bytes:
+        return False
+    for glyph in range(NUM_GLYPHS):
+        glyph_tiles(glyph, cell_px, font_px)
+    return True
+
+
+class RasterLayout:
+    """PosterLayout scaled to pixels, with whole-pixel cells."""
+
+    def __init__(self, layout, dpi=DEFAULT_DPI):
+        self.layout = layout
+        self.scale = dpi / 72
+        self.cell_px = max(1, round(layout.cell * self.scale))
+        self.font_px = max(1, round(layout.font_size * self.scale))
+        self.width = max(round(layout.page_width * self.scale), layout.cols * self.cell_px)
+        self.grid_left = (self.width - layout.cols * self.cell_px) // 2
+        self.grid_top = round(layout.grid_top * self.scale)
+        grid_bottom = self.grid_top + layout.rows_per_page * self.cell_px
+        self.height = max(round(layout.page_height * self.scale), grid_bottom + round(FOOTER_FONT_PT * 2 * self.scale))
+
+
+def _text_band(width, height, text, font, y, color):
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (width, max(height, 1)), "white")
+    if text:
+        ImageDraw.Draw(image).text((width / 2, y), text, font=font, fill=color, anchor="ms")
+    return np.asarray(image)[:height]
+
+
+def iter_bands(pi_grid, title=DEFAULT_TITLE, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, dpi=DEFAULT_DPI,
+               rows_per_page=None, cell_size=None, page=0, band_rows=64):
+    """
+    Iterator over one page of the poster as (height, width, 3) uint8 strips
+    from top to bottom, each holding at most band_rows rows of cells. Only
+    one strip is in memory at a time. The atlas is built before returning,
+    so AtlasTooLarge is raised here rather than midway through a file.
+    """
+    layout = PosterLayout(pi_grid.rows, pi_grid.cols, left_right_margin_pt, rows_per_page, cell_size)
+    raster = RasterLayout(layout, dpi)
+    start, end = layout.page_rows(page)
+    atlas, index = glyph_atlas(raster.cell_px, raster.font_px, used_glyphs(pi_grid, start, end))
+    return _bands(pi_grid, title, page, layout, raster, atlas, index, start, end, band_rows)
+
+
+def _bands(pi_grid, title, page, layout, raster, atlas, index, start, end, band_rows):
+    cell_px, width = raster.cell_px, raster.width
+
+    title_font = _font(MAIN_FONT, max(1, round(TITLE_FONT_PT * raster.scale)), True, tuple(map(ord, title)))
+    yield _text_band(width, raster.grid_top, title, title_font, layout.title_baseline * raster.scale, TITLE_RGB)
+
+    left = np.full((cell_px, raster.grid_left, 3), 255, dtype=np.uint8)
+    right = np.full((cell_px, width - raster.grid_left - layout.cols * cell_px, 3), 255, dtype=np.uint8)
+    for band_start in range(start, end, band_rows):
+        band_end = min(band_start + band_rows, end)
+        script_ids = pi_grid.script_ids[band_start:band_end]
+        digits = pi_grid.digits[band_start:band_end]
+        mask = pi_grid.mask_rows(band_start, band_end)
+        # (rows, cols, cell, cell, 3) -> (rows * cell, cols * cell, 3)
+        tiles = atlas[index[script_ids.astype(np.intp) * GLYPHS_PER_SCRIPT + digits], mask.astype(np.intp)]
+        n = band_end - band_start
+        grid = tiles.transpose(0, 2, 1, 3, 4).reshape(n * cell_px, layout.cols * cell_px, 3)
+        yield np.concatenate([np.tile(left, (n, 1, 1)), grid, np.tile(right, (n, 1, 1))], axis=1)
+
+    footer = layout.footer_text(page, pi_grid.total_scripts_used)
+    grid_bottom = raster.grid_top + (end - start) * cell_px
+    footer_font = _font(MAIN_FONT, max(1, round(FOOTER_FONT_PT * raster.scale)), False, tuple(map(ord, footer)))
+    footer_y = max(layout.footer_baseline * raster.scale, grid_bottom + FOOTER_FONT_PT * raster.scale) - grid_bottom
+    yield _text_band(width, raster.height - grid_bottom, footer, footer_font, footer_y, TEXT_RGB)
+
+
+def render_image(pi_grid, title=DEFAULT_TITLE, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, dpi=DEFAULT_DPI,
+                 rows_per_page=None, cell_size=None, page=0):
+    """One page of the poster as a Pillow RGB image (see iter_bands)."""
+    from PIL import Image
+    bands = list(iter_bands(pi_grid, title, left_right_margin_pt, dpi, rows_per_page, cell_size, page))
+    return Image.fromarray(np.concatenate(bands, axis=0), "RGB")
+
+
+@metrics.timed("render_raster")
+def render_raster(pi_grid, fmt="png", title=DEFAULT_TITLE, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT,
+                  dpi=DEFAULT_DPI, rows_per_page=None, cell_size=None, page=0):
+    """
+    Encode one page of the poster as PNG or WebP.
+
+    Parameters:
+    -----------
+    pi_grid : PiGrid
+        The grid to draw
+    fmt : str
+        "png" or "webp"
+    dpi : int
+        Resolution; an A4 page at 300 dpi is 2488x3508 pixels
+    rows_per_page, cell_size, page :
+        Multi-page and large-format options (see PosterLayout)
+    """
+    image = render_image(pi_grid, title, left_right_margin_pt, dpi, rows_per_page, cell_size, page)
+    out = io.BytesIO()
+    if fmt == "webp":
+        image.save(out, format="WEBP", lossless=True, method=0)
+    else:
+        image.save(out, format="PNG", compress_level=1)
+    return out.getvalue()
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def write_png(f, bands, width, height, level=1):
+    """
+    Stream RGB strips (as from iter_bands) to a PNG file object without
+    assembling the image.
+    """
+    f.write(b"\x89PNG\r\n\x1a\n")
+    f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+    compressor = zlib.compressobj(level)
+    written = 0
+    for band in bands:
+        rows = band.shape[0]
+        # Filter type 0 (None) byte in front of every scanline
+        scanlines = np.zeros((rows, width * 3 + 1), dtype=np.uint8)
+        scanlines[:, 1:] = band.reshape(rows, width * 3)
+        data = compressor.compress(scanlines.tobytes())
+        if data:
+            f.write(_png_chunk(b"IDAT", data))
+        written += rows
+    f.write(_png_chunk(b"IDAT", compressor.flush()))
+    f.write(_png_chunk(b"IEND", b""))
+    if written != height:
+        raise ValueError(f"Wrote {written} rows for a {height} pixel high image")
+
+
+def render_png_tiled(pi_grid, f, title=DEFAULT_TITLE, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT, dpi=DEFAULT_DPI,
+                     rows_per_page=None, cell_size=None, page=0, band_rows=64):
+    """
+    Write one page as PNG to the file object f strip by strip, for
+    outputs too large to hold in memory (e.g. gigapixel large-format prints).
+    """
+    layout = PosterLayout(pi_grid.rows, pi_grid.cols, left_right_margin_pt, rows_per_page, cell_size)
+    raster = RasterLayout(layout, dpi)
+    bands = iter_bands(pi_grid, title, left_right_margin_pt, dpi, rows_per_page, cell_size, page, band_rows)
+    write_png(f, bands, raster.width, raster.height)
+    return raster.width, raster.height
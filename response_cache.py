@@ -0,0 +1,191 @@
+"""
+Content-addressed cache for deterministic responses.
+
+Entries are keyed by a hash of everything that determines the response
+(request parameters plus ALGORITHM_VERSION), so a key doubles as an ETag:
+the same key always means the same bytes.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Bump whenever grid generation, serialization or LaTeX output changes, so
+# old cache entries and client ETags stop matching.
+ALGORITHM_VERSION = "3"
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def cache_key(kind, **params):
+    """Stable hash of a response kind, its parameters and ALGORITHM_VERSION."""
+    payload = json.dumps([kind, ALGORITHM_VERSION, params], sort_keys=True, separators=(",", ":"),
+                         ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of response bodies, bounded by total size, with an
+    optional on-disk second tier (also size-bounded) that survives restarts
+    and is shared by worker processes.
+
+    Each entry is (body bytes, mimetype, extra headers dict).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+        # Disk files in least-recently-used order, with their sizes
+        self._disk_index = OrderedDict()
+        self._disk_size = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            files = []
+            for name in os.listdir(disk_dir):
+                path = os.path.join(disk_dir, name)
+                if name.endswith(".entry") and os.path.isfile(path):
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, name[:-len(".entry")], stat.st_size))
+            for _, key, size in sorted(files):
+                self._disk_index[key] = size
+                self._disk_size += size
+
+    def get(self, key):
+        """Return the cached entry for key, or None (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, entry)
+        return entry
+
+    def put(self, key, body, mimetype, headers=None):
+        entry = (bytes(body), mimetype, dict(headers or {}))
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+        return entry
+
+    def _store(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old[0])
+        self._entries[key] = entry
+        self._size += size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted[0])
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.entry")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                header = json.loads(f.readline().decode("utf-8"))
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        # Touch so eviction order follows use across processes
+        try:
+            os.utime(self._disk_path(key))
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+        return body, header["mimetype"], header["headers"]
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        body, mimetype, headers = entry
+        if len(body) > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps({"mimetype": mimetype, "headers": headers}).encode("utf-8") + b"\n")
+            f.write(body)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._disk_size -= self._disk_index.pop(key, 0)
+            self._disk_index[key] = size
+            self._disk_size += size
+            stale = []
+            while self._disk_size > self.disk_max_bytes and len(self._disk_index) > 1:
+                old_key, old_size = self._disk_index.popitem(last=False)
+                self._disk_size -= old_size
+                self.evictions += 1
+                stale.append(old_key)
+        for old_key in stale:
+            try:
+                os.remove(self._disk_path(old_key))
+            except OSError:
+                pass
+
+    def record_not_modified(self):
+        """Count a request answered with 304 from its ETag alone."""
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_size,
+            }
+
+
+def cache_from_env():
+    """ResponseCache configured by PI_CACHE_MAX_BYTES and PI_CACHE_DIR."""
+    return ResponseCache(
+        max_bytes=int(os.environ.get("PI_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        disk_dir=os.environ.get("PI_CACHE_DIR") or None,
+        disk_max_bytes=int(os.environ.get("PI_CACHE_DISK_MAX_BYTES", DEFAULT_DISK_MAX_BYTES)),
+    )
@@ -0,0 +1,256 @@
+"""
+Production entrypoint for the web server: a pre-fork server of threaded
+WSGI workers, replacing app.run(debug=True) in server.py.
+
+The parent process loads the shared read-only state (digits, fonts, the pi
+masks of every grid size, the default glyph tiles and the LaTeX format),
+opens the listening socket and then forks the workers, so they share that
+state copy-on-write and accept connections from the same socket. A worker
+that dies is replaced.
+
+On SIGTERM or SIGINT every worker stops accepting, lets the requests it is
+serving finish (PDF compiles included) for up to the grace period, cancels
+what is left and exits. Request bodies are capped by PI_MAX_REQUEST_BYTES
+(see server.py), and idle or stalled client connections are dropped after
+the client timeout.
+
+State kept in memory is per worker. /generate_pdf therefore answers with the
+PDF itself instead of a job to poll (PI_PDF_SYNC), the response cache is
+only shared through its disk tier (PI_CACHE_DIR), and /metrics and
+/cache_stats describe the worker that answered the request.
+
+Options can also be set in the environment: PI_HOST, PI_PORT, PI_WORKERS,
+PI_SHUTDOWN_GRACE and PI_CLIENT_TIMEOUT.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+    PI_WORKERS=4 PI_PORT=8000 python serve.py
+
+server:app is a plain WSGI app, so an external server (e.g. gunicorn with
+--preload) can run it instead.
+"""
+import os
+import gc
+import sys
+import time
+import socket
+import signal
+import logging
+import argparse
+import threading
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+from werkzeug.wsgi import ClosingIterator
+
+import batch
+import server
+import latex_format
+import raster_render
+from main import calculate_grid_dimensions, MIN_DIGITS, MAX_DIGITS
+from shape_masks import shape_mask
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5000
+DEFAULT_GRACE = 30.0
+DEFAULT_CLIENT_TIMEOUT = 60.0
+
+# A worker that exits sooner than this after starting is restarted only
+# after this delay, so a worker that cannot start does not spin
+RESTART_DELAY = 1.0
+
+
+class InFlight:
+    """WSGI middleware counting the requests being served (until their body is sent)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._changed = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        with self._changed:
+            self.count += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), self._done)
+        except BaseException:
+            self._done()
+            raise
+
+    def _done(self):
+        with self._changed:
+            self.count -= 1
+            self._changed.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until no request is being served; returns False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.count == 0, timeout)
+
+
+def preload(sample_latex=server.sample_latex):
+    """
+    Load what every worker needs into this process before forking: the
+    digits and font files, the pi mask of every grid size the web page
+    offers, the glyph tiles of the default poster, and the LaTeX fonts and
+    preamble format (built once, on disk, instead of by every worker).
+    """
+    batch.warm_up([{"num_digits": 200, "dpi": raster_render.DEFAULT_DPI, "formats": ["png"]}])
+    for num_digits in range(MIN_DIGITS, MAX_DIGITS + 1):
+        shape_mask(*calculate_grid_dimensions(num_digits))
+    latex_format.warm_up(sample_latex)
+
+
+def run_worker(sock, host, grace=DEFAULT_GRACE, client_timeout=DEFAULT_CLIENT_TIMEOUT, app=server.app,
+               pdf_queue=server.pdf_queue):
+    """
+    Serve app on the listening socket sock until SIGTERM or SIGINT, then
+    shut down gracefully (see the module docstring). Returns the exit code.
+    """
+    in_flight = InFlight(app)
+    handler = type("RequestHandler", (WSGIRequestHandler,), {"timeout": client_timeout})
+    httpd = make_server(host, sock.getsockname()[1], in_flight, threaded=True, request_handler=handler,
+                        fd=sock.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever, which runs in this thread
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    httpd.serve_forever()
+    httpd.server_close()
+    sock.close()
+
+    deadline = time.monotonic() + grace
+    logger.info("Stopping: %d requests in flight, %d PDF compiles pending", in_flight.count, pdf_queue.depth())
+    if not in_flight.wait(grace):
+        logger.warning("%d requests still running after %gs", in_flight.count, grace)
+    killed = pdf_queue.close(max(0.0, deadline - time.monotonic()))
+    if killed:
+        logger.warning("Killed %d PDF compiles", killed)
+    return 0
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, grace=DEFAULT_GRACE,
+          client_timeout=DEFAULT_CLIENT_TIMEOUT, preload_state=True):
+    """
+    Run the server until it is stopped by a signal.
+
+    Parameters:
+    -----------
+    host, port : str, int
+        Address to listen on; port 0 picks a free port (it is logged)
+    workers : int or None
+        Worker processes (default: one per core); 1, or a platform without
+        fork, serves from this process
+    grace : float
+        Seconds in-flight requests and PDF compiles get at shutdown
+    client_timeout : float
+        Seconds a client connection may stay idle or stalled
+    preload_state : bool
+        Load the shared state (see preload) before starting the workers
+    """
+    workers = workers or os.cpu_count() or 1
+    if preload_state:
+        start = time.perf_counter()
+        preload()
+        logger.info("Preloaded shared state in %.2fs", time.perf_counter() - start)
+
+    sock = socket.create_server((host, port), family=socket.AF_INET6 if ":" in host else socket.AF_INET,
+                                backlog=128)
+    port = sock.getsockname()[1]
+    if workers == 1 or not hasattr(os, "fork"):
+        logger.info("Listening on http://%s:%d", host, port)
+        return run_worker(sock, host, grace, client_timeout)
+
+    # Every worker has its own PDF queue, response cache and metrics, and a
+    # request reaches any of them: PDF jobs cannot be polled, so they are
+    # compiled within the request
+    server.app.config["PDF_SYNC"] = True
+    if threading.active_count() > 1:
+        logger.warning("Forking with %d threads running", threading.active_count())
+    # Keep the preloaded objects out of the collector, whose bookkeeping
+    # would otherwise write to (and so copy) their pages in every worker
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # Until run_worker installs its own handlers, a signal must not
+            # make this worker stop its siblings
+            children.clear()
+            code = 1
+            try:
+                code = run_worker(sock, host, grace, client_timeout)
+            except Exception:
+                logger.exception("Worker failed")
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info("Listening on http://%s:%d with %d workers", host, port, workers)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        logger.warning("Worker %d exited with status %d; starting another", pid, status)
+        if time.monotonic() - started < RESTART_DELAY:
+            time.sleep(RESTART_DELAY)
+        if not stopping:
+            spawn()
+    sock.close()
+    logger.info("Stopped")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the pi poster web server with several worker processes.")
+    parser.add_argument("--host", default=os.environ.get("PI_HOST", DEFAULT_HOST),
+                        help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PI_PORT", DEFAULT_PORT)),
+                        help=f"Port to listen on, 0 for any free port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("PI_WORKERS", 0)) or None,
+                        help="Worker processes (default: one per core)")
+    parser.add_argument("--grace", type=float, default=float(os.environ.get("PI_SHUTDOWN_GRACE", DEFAULT_GRACE)),
+                        help=f"Seconds to finish in-flight requests when stopping (default: {DEFAULT_GRACE:g})")
+    parser.add_argument("--client-timeout", type=float,
+                        default=float(os.environ.get("PI_CLIENT_TIMEOUT", DEFAULT_CLIENT_TIMEOUT)),
+                        help=f"Seconds before an idle client connection is dropped (default: {DEFAULT_CLIENT_TIMEOUT:g})")
+    parser.add_argument("--max-request-bytes", type=int,
+                        help="Largest request body (default: PI_MAX_REQUEST_BYTES or 16 MB)")
+    parser.add_argument("--no-preload", action="store_true", help="Let every worker load its own state")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.environ.get("PI_LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s")
+    if args.max_request_bytes:
+        server.app.config["MAX_CONTENT_LENGTH"] = args.max_request_bytes
+    return serve(args.host, args.port, args.workers, args.grace, args.client_timeout, not args.no_preload)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,151 @@
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, request, jsonify, render_template, Response, g, abort
 import os
-import json
-import subprocess
-from main import create_pi_grid, generate_latex, generate_json_data, calculate_grid_dimensions, LEFT_RIGHT_MARGIN_PT
+import time
+import functools
+import logging
+import tempfile
+import threading
+from main import (generate_grid_latex, iter_grid_latex, build_digit_grid, build_pi_tile, resolve_seed,
+                  LEFT_RIGHT_MARGIN_PT, MIN_DIGITS, MAX_DIGITS)
+from pi_grid import PiGrid
+from numeral_scripts import SCRIPT_IDS
+import wire_format
+import digit_store
+from response_cache import cache_key, cache_from_env, ALGORITHM_VERSION
+import pdf_jobs
+import metrics
+import batch
+import latex_format
+import vector_render
+import raster_render
+from poster_layout import PosterLayout
+from book_layout import BookLayout, DEFAULT_MIN_FONT_PT
 
 app = Flask(__name__, static_folder=".", static_url_path="")
 
+logger = logging.getLogger(__name__)
+
+# Cache for deterministic responses (configured by PI_CACHE_* environment variables)
+response_cache = cache_from_env()
+
+# Limits for raster images rendered in a request (larger ones: main.py --image)
+MAX_DPI = 600
+MAX_IMAGE_PIXELS = 64 * 1024 * 1024
+
+PDF_HEADERS = {'Content-Disposition': 'attachment; filename=pi_visualization.pdf'}
+
+# Largest book served by /generate_book (larger ones: main.py --book)
+MAX_BOOK_DIGITS = 1000000
+
+# Largest grid /generate_tile serves tiles of, and the largest tile
+MAX_TILE_GRID_DIGITS = 10000000
+MAX_TILE_CELLS = 65536
+
+# Without a digit store, tiles may only read this far into pi ("3.14...",
+# in characters): computing that many digits takes under a second
+MAX_COMPUTED_TILE_CHARS = 100000
+
+# Most posters in one /generate_batch request (more: batch.py)
+MAX_BATCH_JOBS = 500
+
+# Worker processes for /generate_batch (default: one per core; 1 renders in the request thread)
+BATCH_WORKERS_ENV = 'PI_BATCH_WORKERS'
+
+# /generate_latex responses for uploaded grids of at least this many cells
+# are streamed row by row as they are generated, and not cached (generated
+# grids are at most MAX_DIGITS cells)
+STREAM_MIN_CELLS = 50000
+
+# Set to 1 to send a Server-Timing header with the stage timings of each request
+SERVER_TIMING_ENV = 'PI_SERVER_TIMING'
+
+# Largest request body accepted; larger ones get a 413 before they are read
+MAX_REQUEST_BYTES_ENV = 'PI_MAX_REQUEST_BYTES'
+DEFAULT_MAX_REQUEST_BYTES = 16 * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get(MAX_REQUEST_BYTES_ENV, DEFAULT_MAX_REQUEST_BYTES))
+
+# Set to 1 (serve.py does with several workers) to make /generate_pdf always
+# wait for the PDF: a job only exists in the process that queued it, so it
+# cannot be polled through a socket shared by several worker processes
+PDF_SYNC_ENV = 'PI_PDF_SYNC'
+app.config['PDF_SYNC'] = os.environ.get(PDF_SYNC_ENV) == '1'
+
+REQUEST_SECONDS = metrics.histogram('pi_request_seconds', 'Time to build each response (to the first byte when streamed).',
+                                    ('endpoint', 'method', 'status'))
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+    g.profile = metrics.start_profile()
+
+@app.before_request
+def limit_request_body():
+    # Werkzeug 2.0 only applies MAX_CONTENT_LENGTH to form data, not to the
+    # JSON bodies the endpoints read
+    limit = app.config['MAX_CONTENT_LENGTH']
+    if limit is not None and (request.content_length or 0) > limit:
+        abort(413)
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    endpoint = request.endpoint or 'unknown'
+    REQUEST_SECONDS.observe(elapsed, endpoint, request.method, str(response.status_code))
+    metrics.stop_profile(g.pop('profile', None), endpoint)
+    if os.environ.get(SERVER_TIMING_ENV) == '1':
+        response.headers['Server-Timing'] = metrics.server_timing(metrics.request_timings(), elapsed)
+    return response
+
+@app.errorhandler(413)
+def request_too_large(e):
+    limit = app.config['MAX_CONTENT_LENGTH']
+    return jsonify({'error': f'Request body larger than {limit} bytes (set {MAX_REQUEST_BYTES_ENV} to raise)'}), 413
+
+def cache_pdf(job):
+    response_cache.put(job.key, job.result, 'application/pdf', PDF_HEADERS)
+
+# Background xelatex workers (configured by PI_PDF_* environment variables)
+pdf_queue = pdf_jobs.queue_from_env(on_done=cache_pdf)
+
+def cached_response(key, build, cache=True):
+    """
+    Serve the response identified by a content-addressed key.
+
+    The key is also the ETag, so a matching If-None-Match gets a 304 without
+    any work. Otherwise the cached bytes are served, or build() is called
+    and its response cached if it succeeded. With cache=False (streamed
+    responses) the response is returned as built, with just the ETag.
+    build may return anything a view can, e.g. a (json, status) error tuple.
+    """
+    if request.if_none_match.contains(key):
+        response_cache.record_not_modified()
+        response = Response(status=304)
+        response.set_etag(key)
+        return response
+    
+    if not cache:
+        response = app.make_response(build())
+        if response.status_code == 200:
+            response.set_etag(key)
+        return response
+    
+    entry = response_cache.get(key)
+    if entry is None:
+        response = app.make_response(build())
+        if response.status_code != 200:
+            return response
+        headers = {}
+        if 'Content-Disposition' in response.headers:
+            headers['Content-Disposition'] = response.headers['Content-Disposition']
+        entry = response_cache.put(key, response.get_data(), response.mimetype, headers)
+    
+    body, mimetype, headers = entry
+    response = Response(body, mimetype=mimetype, headers=headers)
+    response.set_etag(key)
+    response.vary.add('Accept')
+    return response
+
 @app.route('/')
 def index():
     return app.send_static_file('index.html')
@@ -14,185 +154,553 @@ def index():
 def generate_pi_data():
     """
     Generate Pi data based on the request parameters.
+
+    The response format is chosen with ?format=legacy|compact|binary|msgpack
+    or the Accept header (see wire_format.py); the default is the legacy
+    per-cell JSON.
     """
+    try:
+        response_format = wire_format.negotiate_format(request.args.get('format'), request.headers.get('Accept'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     data = request.json
-    num_digits = data.get('num_digits', 200)
     seed = data.get('seed')
-    sampling_strategy = "random"  # Always use random strategy
-    script_weights = None
+    try:
+        # The grid is clamped to this range, so the reported count is too
+        num_digits = max(MIN_DIGITS, min(MAX_DIGITS, int(data.get('num_digits', 200))))
+        sampling_strategy, script_weights = sampling_options(data)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
     
-    print("In generate pi data before", seed)
-
     # Convert seed to integer if it's not None
     if seed is not None:
         try:
             seed = int(seed)
-            print(f"Using provided seed: {seed}")
         except (ValueError, TypeError):
             # If conversion fails, leave as None for random seed
             seed = None
-            print("Invalid seed format, using random seed")
-    else:
-        print("No seed provided, using random seed")
-    print("In generate pi data", seed)
+            logger.info("Invalid seed format, using random seed")
+    logger.debug("generate_pi_data: %s digits, seed %s, format %s", num_digits, seed, response_format)
+
+    def build():
+        if response_format != 'legacy':
+            pi_grid = build_digit_grid(num_digits, seed, sampling_strategy, script_weights)
+            with metrics.timed('serialize'):
+                body, mimetype = wire_format.encode(pi_grid, response_format, num_digits)
+            response = Response(body, mimetype=mimetype)
+            response.vary.add('Accept')
+            return response
+        
+        # Generate the data object (as pi_grid_data)
+        pi_grid = build_digit_grid(num_digits, seed, sampling_strategy, script_weights)
+        with metrics.timed('serialize'):
+            response = jsonify(pi_grid.to_dict(num_digits))
+        response.vary.add('Accept')
+        return response
+    
+    # Without a seed the grid is random, so there is nothing to cache
+    if seed is None:
+        return build()
+    
+    key = cache_key('pi_data', num_digits=num_digits, seed=seed, sampling_strategy=sampling_strategy,
+                    script_weights=script_weights, format=response_format)
+    return cached_response(key, build)
+
+SAMPLING_STRATEGIES = ('random', 'least_used', 'weighted')
+
+def sampling_options(data):
+    """
+    (sampling_strategy, script_weights) of a request: "sampling_strategy"
+    (default random) and, for weighted, "script_weights" mapping script
+    names to non-negative weights (scripts left out weigh 1). Raises
+    ValueError if either is invalid.
+    """
+    sampling_strategy = data.get('sampling_strategy') or 'random'
+    if sampling_strategy not in SAMPLING_STRATEGIES:
+        raise ValueError(f'Unknown sampling strategy: {sampling_strategy}')
+    weights = data.get('script_weights')
+    if sampling_strategy != 'weighted' or weights is None:
+        return sampling_strategy, None
+    if not isinstance(weights, dict):
+        raise ValueError('script_weights must map script names to weights')
+    unknown = [script for script in weights if script not in SCRIPT_IDS]
+    if unknown:
+        raise ValueError(f'Unknown scripts in script_weights: {", ".join(unknown)}')
+    try:
+        script_weights = {script: float(weight) for script, weight in weights.items()}
+    except (ValueError, TypeError):
+        raise ValueError('Script weights must be numbers') from None
+    if not all(0 <= weight < float('inf') for weight in script_weights.values()):
+        raise ValueError('Script weights must be finite and non-negative')
+    return sampling_strategy, script_weights
+
+class StaleReference(ValueError):
+    """A grid reference made with another ALGORITHM_VERSION, which would now give a different grid."""
+
+@functools.lru_cache(maxsize=64)
+def reference_grid(num_digits, seed, sampling_strategy, weight_items=None):
+    """
+    The grid /generate_pi_data serves for these parameters (with the script
+    weights as sorted (script, weight) pairs), kept so that the LaTeX, PDF
+    and images of one poster only generate it once. Callers must not
+    modify it.
+    """
+    script_weights = dict(weight_items) if weight_items is not None else None
+    return build_digit_grid(num_digits, seed, sampling_strategy, script_weights)
 
-    # Generate JSON data with the random sampling strategy
-    json_data = generate_json_data(
-        num_digits, 
-        seed, 
-        sampling_strategy, 
-        script_weights
-    )
+def requested_grid(data):
+    """
+    The grid a rendering request is for, as (cache key parameters, function
+    returning the PiGrid).
+
+    The request either refers to a grid by "num_digits", "seed" and
+    optionally "sampling_strategy", "script_weights" and
+    "algorithm_version" (as sent to and by /generate_pi_data), which is
+    regenerated here, or uploads the whole data
+    object as "data", which is validated by PiGrid.from_data. Raises
+    ValueError for an invalid request and StaleReference for a reference
+    from another algorithm version. Referenced grids are only generated
+    when the function is called, i.e. not at all on a cache hit.
+    """
+    pi_data = data.get('data')
+    if pi_data:
+        with metrics.timed('parse'):
+            pi_grid = PiGrid.from_data(pi_data)
+        return {'grid': pi_data['grid']}, lambda: pi_grid
     
-    # Parse the JSON string back to a dictionary
-    result = json.loads(json_data)
+    if data.get('seed') is None:
+        raise ValueError('No data provided')
+    version = data.get('algorithm_version')
+    if version is not None and str(version) != ALGORITHM_VERSION:
+        raise StaleReference(f'Grid was generated by algorithm version {version}, '
+                             f'this server has version {ALGORITHM_VERSION}; regenerate it')
+    try:
+        num_digits = max(MIN_DIGITS, min(MAX_DIGITS, int(data.get('num_digits', 200))))
+        seed = int(data['seed'])
+    except (ValueError, TypeError):
+        raise ValueError('Invalid num_digits or seed') from None
+    sampling_strategy, script_weights = sampling_options(data)
     
-    return jsonify(result)
+    params = {'num_digits': num_digits, 'seed': seed, 'sampling_strategy': sampling_strategy,
+              'script_weights': script_weights}
+    weight_items = tuple(sorted(script_weights.items())) if script_weights is not None else None
+    return params, functools.partial(reference_grid, num_digits, seed, sampling_strategy, weight_items)
+
+def grid_error(error):
+    """Error response for a ValueError raised by requested_grid."""
+    status = 409 if isinstance(error, StaleReference) else 400
+    return jsonify({'error': str(error)}), status
 
 @app.route('/generate_latex', methods=['POST'])
 def generate_latex_endpoint():
     """
-    Generate LaTeX code based on the request parameters.
+    Generate LaTeX code based on the request parameters: a grid reference
+    or the uploaded grid (see requested_grid), "title" and "group_by_script".
     """
     data = request.json
-    pi_data = data.get('data')
     title = data.get('title', 'π in Indian Scripts')
     
-    if not pi_data:
-        return jsonify({'error': 'No data provided'}), 400
+    # Put each script's cells in one TikZ scope instead of per-cell font macros
+    group_by_script = bool(data.get('group_by_script', False))
     
-    # Extract grid data
-    grid_digits = []
-    grid_scripts = []
-    
-    # Create pi mask from highlight data
-    rows = pi_data['rows']
-    cols = pi_data['cols']
-    pi_mask = [[False for _ in range(cols)] for _ in range(rows)]
-    
-    for row_idx, row_data in enumerate(pi_data['grid']):
-        digit_row = []
-        script_row = []
-        for col_idx, cell in enumerate(row_data):
-            digit_row.append(cell['digit'])
-            script_row.append(cell['script'])
-            # Set pi mask from highlight data
-            if 'highlight' in cell:
-                pi_mask[row_idx][col_idx] = cell['highlight']
-        grid_digits.append(digit_row)
-        grid_scripts.append(script_row)
+    try:
+        grid_params, load_grid = requested_grid(data)
+    except ValueError as e:
+        return grid_error(e)
     
-    # Generate fresh LaTeX code each time to ensure we use current margin settings
-    latex_code = generate_latex(grid_digits, grid_scripts, rows, cols, title, pi_mask, LEFT_RIGHT_MARGIN_PT)
+    # Only uploads can be this large (references are at most MAX_DIGITS cells)
+    stream = 'grid' in grid_params and len(grid_params['grid']) * len(grid_params['grid'][0]) >= STREAM_MIN_CELLS
     
-    # Save to file
-    with open('pi_visualization.tex', 'w', encoding='utf-8') as f:
-        f.write(latex_code)
+    def build():
+        pi_grid = load_grid()
+        
+        if stream:
+            chunks = iter_grid_latex(pi_grid, title, LEFT_RIGHT_MARGIN_PT, group_by_script=group_by_script)
+            chunks = metrics.timed_iter('latex', chunks)
+            return Response(write_through(chunks, 'pi_visualization.tex'), mimetype='text/html')
+        
+        # Generate fresh LaTeX code each time to ensure we use current margin settings
+        latex_code = generate_grid_latex(pi_grid, title, LEFT_RIGHT_MARGIN_PT, group_by_script=group_by_script)
+        
+        # Save to file
+        with open('pi_visualization.tex', 'w', encoding='utf-8') as f:
+            f.write(latex_code)
+        
+        return Response(latex_code, mimetype='text/html')
     
-    return latex_code
+    key = cache_key('latex', **grid_params, title=title, margin=LEFT_RIGHT_MARGIN_PT,
+                    group_by_script=group_by_script)
+    return cached_response(key, build, cache=not stream)
+
+def write_through(chunks, path):
+    """
+    Yield the chunks while writing them to path. The file is replaced only
+    once the whole document has been written, so an interrupted stream
+    leaves the previous file in place.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 @app.route('/generate_pdf', methods=['POST'])
 def generate_pdf():
     """
     Generate PDF from LaTeX code.
+
+    With "renderer": "vector" the PDF is drawn directly by vector_render
+    (no LaTeX) and returned at once. Otherwise a PDF that is already
+    cached is returned directly. Otherwise the compile is queued and a 202
+    with the job id and status/result URLs is returned (or, with ?wait=1 or
+    PI_PDF_SYNC=1, the request blocks until the PDF is ready). A full queue
+    answers 503 with Retry-After.
     """
     data = request.json
-    pi_data = data.get('data')
     title = data.get('title', 'π in Indian Scripts')
     
-    if not pi_data:
-        return jsonify({'error': 'No data provided'}), 400
-    
-    # First generate LaTeX
-    grid_digits = []
-    grid_scripts = []
-    
-    # Create pi mask from highlight data
-    rows = pi_data['rows']
-    cols = pi_data['cols']
-    pi_mask = [[False for _ in range(cols)] for _ in range(rows)]
-    
-    for row_idx, row_data in enumerate(pi_data['grid']):
-        digit_row = []
-        script_row = []
-        for col_idx, cell in enumerate(row_data):
-            digit_row.append(cell['digit'])
-            script_row.append(cell['script'])
-            # Set pi mask from highlight data
-            if 'highlight' in cell:
-                pi_mask[row_idx][col_idx] = cell['highlight']
-        grid_digits.append(digit_row)
-        grid_scripts.append(script_row)
-    
-    # Generate fresh LaTeX code each time to ensure we use current margin settings
-    latex_code = generate_latex(grid_digits, grid_scripts, rows, cols, title, pi_mask, LEFT_RIGHT_MARGIN_PT)
-    
-    # Save to file
-    with open('pi_visualization.tex', 'w', encoding='utf-8') as f:
-        f.write(latex_code)
-    
-    # Compile LaTeX to PDF
     try:
-        # Run xelatex twice to ensure references are correct
-        subprocess.run(['xelatex', '-interaction=nonstopmode', 'pi_visualization.tex'], check=True)
-        subprocess.run(['xelatex', '-interaction=nonstopmode', 'pi_visualization.tex'], check=True)
+        grid_params, load_grid = requested_grid(data)
+    except ValueError as e:
+        return grid_error(e)
+    
+    if data.get('renderer') == 'vector':
+        return poster_response(grid_params, load_grid, title, data, 'pdf')
+    
+    group_by_script = bool(data.get('group_by_script', False))
+    
+    def build():
+        pi_grid = load_grid()
+        
+        # Generate fresh LaTeX code each time to ensure we use current margin settings
+        latex_code = generate_grid_latex(pi_grid, title, LEFT_RIGHT_MARGIN_PT, group_by_script=group_by_script)
         
-        # Check if PDF was created
-        if os.path.exists('pi_visualization.pdf'):
-            return send_file('pi_visualization.pdf', as_attachment=True)
-        else:
-            return jsonify({'error': 'Failed to generate PDF'}), 500
+        try:
+            job = pdf_queue.submit(key, latex_code)
+        except pdf_jobs.QueueFull as e:
+            response = jsonify({'error': str(e)})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        
+        if app.config['PDF_SYNC']:
+            # The job's own deadline bounds the compile; it may first wait in the queue
+            pdf_queue.wait(job)
+            return job_result_response(job)
+        if request.args.get('wait'):
+            pdf_queue.wait(job, pdf_queue.timeout)
+            return job_result_response(job)
+        
+        response = jsonify(job_status(job))
+        response.status_code = 202
+        response.headers['Location'] = f'/pdf_jobs/{job.id}'
+        return response
+    
+    key = cache_key('pdf', **grid_params, title=title, margin=LEFT_RIGHT_MARGIN_PT,
+                    group_by_script=group_by_script)
+    return cached_response(key, build)
+
+def job_status(job):
+    status = job.to_dict()
+    status['status_url'] = f'/pdf_jobs/{job.id}'
+    status['result_url'] = f'/pdf_jobs/{job.id}/result'
+    status['queue_depth'] = pdf_queue.depth()
+    return status
+
+@app.route('/pdf_jobs/<job_id>', methods=['GET'])
+def pdf_job_status(job_id):
+    """
+    Status of a PDF job: queued, running, done, failed or cancelled.
+    """
+    job = pdf_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/pdf_jobs/<job_id>', methods=['DELETE'])
+def cancel_pdf_job(job_id):
+    """
+    Cancel a queued or running PDF job.
+    """
+    job = pdf_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/pdf_jobs/<job_id>/result', methods=['GET'])
+def pdf_job_result(job_id):
+    """
+    The PDF of a finished job (202 with the status while it is still running).
+    """
+    job = pdf_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return job_result_response(job)
+
+def job_result_response(job):
+    """
+    Response for a job: its PDF, its error (500 failed, 410 cancelled) or,
+    while it is not finished, a 202 with its status.
+    """
+    if job.status == pdf_jobs.DONE:
+        response = Response(job.result, mimetype='application/pdf', headers=PDF_HEADERS)
+        response.set_etag(job.key)
+        return response
+    if job.status == pdf_jobs.FAILED:
+        response = jsonify({'error': job.error})
+        response.status_code = 500
+    elif job.status == pdf_jobs.CANCELLED:
+        response = jsonify({'error': 'Job was cancelled'})
+        response.status_code = 410
+    else:
+        response = jsonify(job_status(job))
+        response.status_code = 202
+    return response
+
+def poster_response(grid_params, load_grid, title, options, fmt):
+    """
+    Cached PDF, SVG, PNG or WebP from the native renderers, for a grid from
+    requested_grid. options may set
+    rows_per_page (multi-page), cell_size in points (large format), page,
+    and dpi for raster formats.
+    """
+    try:
+        rows_per_page = int(options['rows_per_page']) if options.get('rows_per_page') else None
+        cell_size = float(options['cell_size']) if options.get('cell_size') else None
+        page = int(options.get('page', 0))
+        dpi = int(options.get('dpi', raster_render.DEFAULT_DPI))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid rows_per_page, cell_size, page or dpi'}), 400
+    if ((rows_per_page is not None and rows_per_page < 1) or (cell_size is not None and cell_size <= 0)
+            or page < 0 or not 1 <= dpi <= MAX_DPI):
+        return jsonify({'error': 'Invalid rows_per_page, cell_size, page or dpi'}), 400
+    
+    def build():
+        pi_grid = load_grid()
+        layout = PosterLayout(pi_grid.rows, pi_grid.cols, LEFT_RIGHT_MARGIN_PT, rows_per_page, cell_size)
+        if fmt != 'pdf' and page >= layout.num_pages:
+            return jsonify({'error': f'page must be below {layout.num_pages}'}), 400
+        if fmt == 'svg':
+            svg = vector_render.render_svg(pi_grid, title, LEFT_RIGHT_MARGIN_PT, rows_per_page, cell_size, page)
+            return Response(svg, mimetype='image/svg+xml')
+        if fmt in raster_render.IMAGE_FORMATS:
+            raster = raster_render.RasterLayout(layout, dpi)
+            if raster.width * raster.height > MAX_IMAGE_PIXELS:
+                return jsonify({'error': 'Image too large; lower dpi or cell_size, or use the CLI'}), 400
+            try:
+                image = raster_render.render_raster(pi_grid, fmt, title, LEFT_RIGHT_MARGIN_PT, dpi,
+                                                    rows_per_page, cell_size, page)
+            except raster_render.AtlasTooLarge:
+                return jsonify({'error': 'Cells too large; lower dpi or cell_size, or use the CLI'}), 400
+            return Response(image, mimetype=raster_render.IMAGE_FORMATS[fmt][1])
+        pdf = vector_render.render_pdf(pi_grid, title, LEFT_RIGHT_MARGIN_PT, rows_per_page, cell_size)
+        return Response(pdf, mimetype='application/pdf', headers=PDF_HEADERS)
+    
+    key = cache_key(f'poster-{fmt}', **grid_params, title=title, margin=LEFT_RIGHT_MARGIN_PT,
+                    rows_per_page=rows_per_page, cell_size=cell_size, page=page,
+                    dpi=dpi if fmt in raster_render.IMAGE_FORMATS else None)
+    return cached_response(key, build)
+
+@app.route('/generate_png', methods=['POST'])
+def generate_png():
+    """
+    Generate a PNG (or, with "format": "webp" or ?format=webp, WebP) poster
+    with the raster renderer. Takes the same fields as /generate_svg, plus
+    "dpi" (default 150).
+    """
+    data = request.json
+    title = data.get('title', 'π in Indian Scripts')
+    fmt = (request.args.get('format') or data.get('format') or 'png').lower()
+    
+    if fmt not in raster_render.IMAGE_FORMATS:
+        return jsonify({'error': f'Unknown image format: {fmt}'}), 400
+    try:
+        grid_params, load_grid = requested_grid(data)
+    except ValueError as e:
+        return grid_error(e)
+    
+    return poster_response(grid_params, load_grid, title, data, fmt)
+
+@app.route('/generate_svg', methods=['POST'])
+def generate_svg():
+    """
+    Generate an SVG poster directly (no LaTeX). Takes the same fields as
+    /generate_pdf with the vector renderer, plus "page" for multi-page layouts.
+    """
+    data = request.json
+    title = data.get('title', 'π in Indian Scripts')
+    
+    try:
+        grid_params, load_grid = requested_grid(data)
+    except ValueError as e:
+        return grid_error(e)
+    
+    return poster_response(grid_params, load_grid, title, data, 'svg')
+
+@app.route('/generate_book', methods=['POST'])
+def generate_book():
+    """
+    Generate a multi-page PDF book of any number of digits (up to
+    MAX_BOOK_DIGITS) with the vector renderer. Takes "num_digits", "seed",
+    "min_font_pt" (smallest digit size, default 6), "paper" (A4 to A0) and
+    "title". Pages are generated and sent one at a time; the seed used is
+    returned in the X-Pi-Seed header.
+    """
+    data = request.json or {}
+    title = data.get('title', 'π in Indian Scripts')
+    try:
+        num_digits = int(data.get('num_digits', 200))
+        min_font_pt = float(data.get('min_font_pt', DEFAULT_MIN_FONT_PT))
+        seed = int(data['seed']) if data.get('seed') is not None else None
+        book = BookLayout(num_digits, min_font_pt, data.get('paper', 'A4'), LEFT_RIGHT_MARGIN_PT)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid book options: {e}'}), 400
+    if num_digits > MAX_BOOK_DIGITS:
+        return jsonify({'error': f'At most {MAX_BOOK_DIGITS} digits; use main.py --book for more'}), 400
+    
+    seed = resolve_seed(seed)
+    
+    def build():
+        headers = {'Content-Disposition': 'attachment; filename=pi_book.pdf', 'X-Pi-Seed': str(seed),
+                   'X-Pi-Pages': str(book.num_pages)}
+        chunks = metrics.timed_iter('book_pdf', vector_render.iter_book_pdf(book, seed, title))
+        return Response(chunks, mimetype='application/pdf', headers=headers)
     
-    except subprocess.CalledProcessError as e:
-        return jsonify({'error': f'LaTeX compilation failed: {str(e)}'}), 500
-    except Exception as e:
-        return jsonify({'error': f'Error generating PDF: {str(e)}'}), 500
+    key = cache_key('book', layout=book.to_dict(), seed=seed, title=title, margin=LEFT_RIGHT_MARGIN_PT)
+    return cached_response(key, build, cache=False)
+
+@app.route('/generate_tile', methods=['POST'])
+def generate_tile():
+    """
+    One rectangular tile of a counter-engine grid for "num_digits" digits,
+    in the compact format of /generate_pi_data plus its position ("top",
+    "left") and the size of the whole grid ("grid_rows", "grid_cols"). The
+    grid has the rows and columns of the book (see BookLayout) for
+    "min_font_pt" and "paper", but its scripts come from the counter engine,
+    not the band engine of the book's pages. Takes "seed" (required), "top",
+    "left", "height" and "width". Each tile is generated on its own, and
+    tiles fetched separately, e.g. by a zoomable view, fit together without
+    adjacent cells in the same script.
+
+    Tiles reading past MAX_COMPUTED_TILE_CHARS characters of pi need a digit
+    store that covers them; otherwise they get a 503 instead of computing
+    every digit before them within the request.
+    """
+    data = request.json or {}
+    try:
+        num_digits = int(data.get('num_digits', 200))
+        seed = int(data['seed'])
+        top, left = int(data.get('top', 0)), int(data.get('left', 0))
+        height, width = int(data['height']), int(data['width'])
+        book = BookLayout(num_digits, float(data.get('min_font_pt', DEFAULT_MIN_FONT_PT)),
+                          data.get('paper', 'A4'), LEFT_RIGHT_MARGIN_PT)
+    except (KeyError, ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid tile options: {e!r}'}), 400
+    if num_digits > MAX_TILE_GRID_DIGITS:
+        return jsonify({'error': f'At most {MAX_TILE_GRID_DIGITS} digits'}), 400
+    if height < 1 or width < 1 or height * width > MAX_TILE_CELLS:
+        return jsonify({'error': f'Tiles must have between 1 and {MAX_TILE_CELLS} cells'}), 400
+    if top < 0 or left < 0 or top + height > book.rows or left + width > book.cols:
+        return jsonify({'error': f'Tile does not fit in the {book.rows}x{book.cols} grid'}), 400
+    store = digit_store.get_store()
+    tile_end = (top + height - 1) * book.cols + left + width
+    if tile_end > max(MAX_COMPUTED_TILE_CHARS, len(store) if store is not None else 0):
+        return jsonify({'error': f'Tiles past character {MAX_COMPUTED_TILE_CHARS} of pi need a digit store '
+                                 f'of at least {tile_end} characters (python digit_store.py --digits {tile_end})'}), 503
+    
+    def build():
+        tile = build_pi_tile(book.rows, book.cols, top, left, height, width, seed)
+        with metrics.timed('serialize'):
+            tile_data = wire_format.compact_data(tile, height * width)
+            tile_data.update(top=top, left=left, grid_rows=book.rows, grid_cols=book.cols)
+            return jsonify(tile_data)
+    
+    key = cache_key('tile', layout=book.to_dict(), seed=seed, top=top, left=left, height=height, width=width)
+    return cached_response(key, build)
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def batch_pool():
+    """The process pool shared by /generate_batch requests, started on first use."""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            workers = int(os.environ.get(BATCH_WORKERS_ENV, 0)) or None
+            _batch_pool = batch.make_pool(workers)
+        return _batch_pool
+
+@app.route('/generate_batch', methods=['POST'])
+def generate_batch():
+    """
+    Render many posters from a manifest (see batch.py: "defaults", "seeds"
+    and "jobs", each with seed, num_digits, title, formats, dpi, shape and
+    name) and stream them back as a zip, one poster at a time as they
+    finish, ending with batch_report.json (posters that failed are listed
+    there instead of failing the request).
+    """
+    try:
+        jobs = batch.expand_manifest(request.json or {})
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'error': f'Invalid manifest: {e}'}), 400
+    if not jobs:
+        return jsonify({'error': 'The manifest has no jobs'}), 400
+    if len(jobs) > MAX_BATCH_JOBS:
+        return jsonify({'error': f'At most {MAX_BATCH_JOBS} posters per request; use batch.py for more'}), 400
+    if any(not 1 <= job['dpi'] <= MAX_DPI for job in jobs):
+        return jsonify({'error': f'dpi must be between 1 and {MAX_DPI}'}), 400
+    
+    in_process = os.environ.get(BATCH_WORKERS_ENV) == '1'
+    chunks = batch.iter_zip(jobs, workers=1 if in_process else None, pool=None if in_process else batch_pool())
+    headers = {'Content-Disposition': 'attachment; filename=pi_posters.zip', 'X-Pi-Batch-Jobs': str(len(jobs))}
+    return Response(metrics.timed_iter('batch', chunks), mimetype='application/zip', headers=headers)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Stage and request latency histograms, cache counters and the PDF queue
+    depth in the Prometheus text format.
+    """
+    stats = response_cache.stats()
+    lines = []
+    for name, kind, help_text, value in [
+        ('pi_cache_hits_total', 'counter', 'Responses served from the cache.', stats['hits']),
+        ('pi_cache_misses_total', 'counter', 'Responses built because they were not cached.', stats['misses']),
+        ('pi_cache_not_modified_total', 'counter', 'Requests answered 304 Not Modified.', stats['not_modified']),
+        ('pi_cache_bytes', 'gauge', 'Bytes held in the in-memory cache.', stats['bytes']),
+        ('pi_pdf_jobs_pending', 'gauge', 'Queued plus running PDF compiles.', pdf_queue.depth()),
+    ]:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+    body = metrics.render_prometheus() + '\n'.join(lines) + '\n'
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache_stats')
+def cache_stats():
+    """
+    Hit/miss counters and sizes of the response cache.
+    """
+    return jsonify(response_cache.stats())
+
+def sample_latex():
+    """LaTeX of a default 200-digit poster, to warm up the LaTeX format with."""
+    return generate_grid_latex(build_digit_grid(200, 1), left_right_margin_pt=LEFT_RIGHT_MARGIN_PT)
 
 if __name__ == '__main__':
-    # Generate initial data with default number of digits
-    num_digits = 200
-    seed = None
-    sampling_strategy = 'random'  # Default to random
-    print(seed, "In main")
-    
-    # Generate JSON data
-    json_data = generate_json_data(num_digits, seed, sampling_strategy)
-    
-    # Save to file
-    with open('pi_data.json', 'w', encoding='utf-8') as f:
-        f.write(json_data)
-    
-    # Parse the JSON string back to a dictionary
-    pi_data = json.loads(json_data)
-    
-    # Extract grid data
-    grid_digits = []
-    grid_scripts = []
-    
-    # Create pi mask from highlight data
-    rows = pi_data['rows']
-    cols = pi_data['cols']
-    pi_mask = [[False for _ in range(cols)] for _ in range(rows)]
-    
-    for row_idx, row_data in enumerate(pi_data['grid']):
-        digit_row = []
-        script_row = []
-        for col_idx, cell in enumerate(row_data):
-            digit_row.append(cell['digit'])
-            script_row.append(cell['script'])
-            # Set pi mask from highlight data
-            if 'highlight' in cell:
-                pi_mask[row_idx][col_idx] = cell['highlight']
-        grid_digits.append(digit_row)
-        grid_scripts.append(script_row)
-    
-    # Generate fresh LaTeX code to ensure we use current margin settings
-    print("I am in the server", LEFT_RIGHT_MARGIN_PT)
-    latex_code = generate_latex(grid_digits, grid_scripts, rows, cols, pi_mask=pi_mask, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT)
-    
-    # Save to file
-    with open('pi_visualization.tex', 'w', encoding='utf-8') as f:
-        f.write(latex_code)
-    
-    print("Initial data generated. Starting server...")
+    # PI_LOG_LEVEL=DEBUG shows the per-request details
+    logging.basicConfig(level=os.environ.get('PI_LOG_LEVEL', 'INFO').upper(),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    
+    # Nothing is generated before serving: the static pi_data.json is the
+    # page's fallback, and the fonts and the preamble format are prepared
+    # in the background from a default poster built on that thread
+    latex_format.start_warm_up(sample_latex)
+    
+    # Development server with the reloader; serve.py runs it in production
+    logger.info("Starting server...")
     app.run(debug=True) 
\ No newline at end of file
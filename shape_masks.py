@@ -0,0 +1,120 @@
+"""
+Highlight masks (the red π on the poster) computed with NumPy.
+
+Each shape is a function of (rows, cols, start, end) returning the mask of
+grid rows start..end, so paginated renders can ask for one page's rows
+without building the whole mask. Results are memoized in bounded LRU caches
+and returned read-only.
+
+The "pi" shape is the three rectangles generate_pi_shape_mask used to draw
+with Pillow, computed with the same rasterization rule (a rectangle covers
+the cells from int(x0) to int(x1) inclusive, clipped to the grid), so the
+masks are identical. "circle" and shapes registered from bitmaps with
+register_bitmap go through the same API.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# Most masks kept per cache (whole masks and row ranges are cached separately);
+# 64 holds the pi mask of every grid size the web page offers
+MASK_CACHE_SIZE = 64
+
+_shapes = {}
+
+
+def _span(lo, hi, count):
+    """Slice of the cells int(lo)..int(hi) inclusive, clipped to 0..count."""
+    return slice(min(max(0, int(lo)), count), max(0, min(count, int(hi) + 1)))
+
+
+def _pi_shape(rows, cols, start, end):
+    # Same arithmetic as the original Pillow drawing, so the floats match
+    width = cols * 0.7
+    height = rows * 0.7
+    x_offset = (cols - width) / 2
+    y_offset = (rows - height) / 2
+    line_height = height * 0.2
+    left_x = x_offset + width * 0.25
+    right_x = x_offset + width * 0.75
+    rects = [
+        (x_offset, y_offset, x_offset + width, y_offset + line_height),  # Horizontal line
+        (left_x - width * 0.1, y_offset, left_x + width * 0.1, y_offset + height),  # Left leg
+        (right_x - width * 0.1, y_offset, right_x + width * 0.1, y_offset + height),  # Right leg
+    ]
+    mask = np.zeros((end - start, cols), dtype=bool)
+    for x0, y0, x1, y1 in rects:
+        row_span = _span(y0, y1, rows)
+        first, last = max(row_span.start, start), min(row_span.stop, end)
+        if first < last:
+            mask[first - start:last - start, _span(x0, x1, cols)] = True
+    return mask
+
+
+def _circle_shape(rows, cols, start, end):
+    # Cells whose centre lies within a disc spanning 70% of the shorter side
+    radius = 0.35 * min(rows, cols)
+    r = np.arange(start, end)[:, None] + 0.5 - rows / 2
+    c = np.arange(cols)[None, :] + 0.5 - cols / 2
+    return r * r + c * c <= radius * radius
+
+
+def register_shape(name, shape_fn):
+    """
+    Add a shape: shape_fn(rows, cols, start, end) returns the (end - start,
+    cols) boolean mask of rows start..end.
+    """
+    _shapes[name] = shape_fn
+    shape_mask.cache_clear()
+    shape_mask_rows.cache_clear()
+
+
+def register_bitmap(name, bitmap):
+    """
+    Add a shape from a 2D boolean bitmap (e.g. a logo), stretched to any
+    grid size by nearest-neighbour sampling.
+    """
+    bitmap = np.array(bitmap, dtype=bool)
+    if bitmap.ndim != 2 or not bitmap.size:
+        raise ValueError("bitmap must be a non-empty 2D array")
+    bitmap.setflags(write=False)
+    height, width = bitmap.shape
+
+    def bitmap_shape(rows, cols, start, end):
+        src_rows = np.arange(start, end) * height // rows
+        src_cols = np.arange(cols) * width // cols
+        return bitmap[src_rows[:, None], src_cols[None, :]]
+
+    register_shape(name, bitmap_shape)
+
+
+def shape_names():
+    return sorted(_shapes)
+
+
+def _compute(rows, cols, start, end, shape):
+    if shape not in _shapes:
+        raise ValueError(f"Unknown shape {shape!r}; choose from {', '.join(shape_names())}")
+    if not 0 <= start <= end <= rows:
+        raise ValueError(f"Row range {start}..{end} outside a grid of {rows} rows")
+    mask = np.ascontiguousarray(_shapes[shape](rows, cols, start, end), dtype=bool)
+    mask.setflags(write=False)
+    return mask
+
+
+@lru_cache(maxsize=MASK_CACHE_SIZE)
+def shape_mask(rows, cols, shape="pi"):
+    """Read-only (rows, cols) boolean mask of a shape."""
+    return _compute(rows, cols, 0, rows, shape)
+
+
+@lru_cache(maxsize=MASK_CACHE_SIZE * 4)
+def shape_mask_rows(rows, cols, start, end, shape="pi"):
+    """
+    Rows start..end of shape_mask(rows, cols, shape), computed on their own.
+    """
+    return _compute(rows, cols, start, end, shape)
+
+
+register_shape("pi", _pi_shape)
+register_shape("circle", _circle_shape)
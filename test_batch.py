@@ -0,0 +1,53 @@
+import io
+import os
+import json
+import zipfile
+
+import pytest
+
+import batch
+import server
+
+
+def test_expand_manifest_and_validation():
+    jobs = batch.expand_manifest({"defaults": {"formats": "pdf,png", "num_digits": 100},
+                                  "seeds": [1, 2], "jobs": [{"seed": 7, "title": "Room 12", "name": "room12"}]})
+    assert [job["name"] for job in jobs] == ["pi_100_seed1", "pi_100_seed2", "room12"]
+    assert jobs[2]["formats"] == ["pdf", "png"] and jobs[2]["title"] == "Room 12"
+    assert batch.parse_seeds("1-3,9") == [1, 2, 3, 9]
+    for manifest in ({"jobs": [{"title": "no seed"}]}, {"seeds": [1], "defaults": {"formats": ["doc"]}},
+                     {"seeds": [1, 1]}, {"jobs": [{"seed": 1, "name": "../x"}]}, {"jobs": [{"seed": 1, "colour": 2}]}):
+        with pytest.raises(ValueError):
+            batch.expand_manifest(manifest)
+
+
+def test_directory_output_resumes_and_reports_failures(tmp_path, monkeypatch):
+    jobs = batch.expand_manifest({"defaults": {"formats": ["svg", "json"]}, "seeds": [1, 2, 3]})
+    report = batch.run_to_directory(jobs, tmp_path, workers=2)
+    assert sorted(report["done"]) == ["pi_200_seed1", "pi_200_seed2", "pi_200_seed3"]
+    data = json.loads((tmp_path / "pi_200_seed2.json").read_text(encoding="utf-8"))
+    assert data["seed"] == 2 and data["num_digits"] == 200
+
+    # A lost file is re-rendered; a failing job is reported without stopping the rest
+    os.remove(tmp_path / "pi_200_seed3.svg")
+    render_job = batch.render_job
+    monkeypatch.setattr(batch, "render_job", lambda job: render_job(job) if job["seed"] != 4 else 1 / 0)
+    more = batch.expand_manifest({"defaults": {"formats": ["svg", "json"]}, "seeds": [1, 2, 3, 4]})
+    report = batch.run_to_directory(more, tmp_path, workers=1)
+    assert report["skipped"] == ["pi_200_seed1", "pi_200_seed2"] and report["done"] == ["pi_200_seed3"]
+    assert "ZeroDivisionError" in report["failed"]["pi_200_seed4"]
+    assert json.loads((tmp_path / batch.REPORT_NAME).read_text())["failed"] == report["failed"]
+
+
+def test_generate_batch_streams_a_zip(monkeypatch):
+    monkeypatch.setenv(server.BATCH_WORKERS_ENV, "1")
+    client = server.app.test_client()
+    response = client.post("/generate_batch", json={"defaults": {"formats": ["pdf", "tex"]}, "seeds": [5, 6]})
+    assert response.status_code == 200 and response.mimetype == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    assert sorted(archive.namelist()) == ["batch_report.json", "pi_200_seed5.pdf", "pi_200_seed5.tex",
+                                          "pi_200_seed6.pdf", "pi_200_seed6.tex"]
+    assert archive.read("pi_200_seed5.pdf").startswith(b"%PDF")
+
+    assert client.post("/generate_batch", json={"seeds": [1], "defaults": {"formats": ["gif"]}}).status_code == 400
+    assert client.post("/generate_batch", json={"seeds": list(range(server.MAX_BATCH_JOBS + 1))}).status_code == 400
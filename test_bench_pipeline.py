@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+import bench_pipeline
+
+
+def test_pipeline_benchmark_runs_every_stage():
+    lines = []
+    results = bench_pipeline.run([10], repeat=1, report=lines.append)
+    assert len(lines) == len(results)
+    names = {key.rsplit("@", 1)[0] for key in results}
+    assert {"get_pi_digits", "generate_latex", "create_pi_grid[python,least_used]",
+            "endpoint /generate_latex", "endpoint /generate_book"} <= names
+    assert all(result["seconds"] > 0 and result["peak_bytes"] > 0 for result in results.values())
+    assert bench_pipeline.compare(results, results, tolerance=0.5) == []
+
+
+def test_compare_flags_slowdowns_and_budgets():
+    baseline = {"generate_latex@430": {"seconds": 0.010, "peak_bytes": 1 << 20}}
+    slower = {"generate_latex@430": {"seconds": 0.030, "peak_bytes": 1 << 20}}
+    bigger = {"generate_latex@430": {"seconds": 0.011, "peak_bytes": 8 << 20}}
+    noise = {"generate_latex@430": {"seconds": 0.011, "peak_bytes": (1 << 20) + 4096}}
+    assert len(bench_pipeline.compare(slower, baseline, 0.5)) == 1
+    assert len(bench_pipeline.compare(bigger, baseline, 0.5)) == 1
+    assert bench_pipeline.compare(noise, baseline, 0.5) == []
+
+    over_budget = {"endpoint /generate_latex@430": {"seconds": 5.0, "peak_bytes": 0}}
+    assert len(bench_pipeline.compare(over_budget, {}, 0.5)) == 1
+    assert bench_pipeline.stage_limit("create_pi_grid[python,random]") == 10 ** 4
+    assert bench_pipeline.stage_limit("create_pi_grid[fast,random]") is None
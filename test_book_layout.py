@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import grid_engine
+import vector_render
+from book_layout import BookLayout, book_page, iter_book_pages, _FIXED
+from main import get_pi_digits
+
+
+def test_layout_fits_one_page_or_paginates():
+    small = BookLayout(430)
+    assert small.num_pages == 1 and small.rows * small.cols >= 430
+
+    book = BookLayout(100000, min_font_pt=6)
+    assert book.num_pages > 1 and book.rows * book.cols >= 100000
+    assert book.font_size() >= 6
+    assert book.page_rows(book.num_pages - 1)[1] == book.rows
+    assert BookLayout(100000, min_font_pt=6, paper="A0").num_pages < book.num_pages
+    with pytest.raises(ValueError):
+        BookLayout(1000, paper="Letter")
+
+
+def test_pages_generated_one_at_a_time_match_the_whole_book():
+    book = BookLayout(6000, min_font_pt=12)
+    assert book.num_pages > 2
+    pages = [page_grid for _, page_grid in iter_book_pages(book, seed=8)]
+
+    script_ids = np.concatenate([page_grid.script_ids for page_grid in pages])
+    expected = grid_engine.assign_scripts_parallel(book.rows, book.cols, 16, _FIXED, 8,
+                                                   band_rows=book.rows_per_page, workers=1)
+    assert np.array_equal(script_ids, expected)
+    # No two neighbours share a script, across page breaks too
+    masks = grid_engine.neighbour_masks(script_ids, np.ones(script_ids.shape, dtype=bool))
+    clashes = ((masks >> script_ids.astype(np.uint32)) & 1).astype(bool)
+    clashes[0, :2] = False
+    assert not clashes.any()
+    # The pi shape continues over the pages
+    assert np.array_equal(np.concatenate([page_grid.mask for page_grid in pages]), book.pi_mask())
+
+    digits = np.concatenate([page_grid.digits for page_grid in pages]).ravel().tolist()
+    assert "".join("." if d == 10 else str(d) for d in digits) == get_pi_digits(len(digits) - 1)
+
+    page = book_page(book, 2, 8)
+    assert np.array_equal(page.script_ids, pages[2].script_ids)
+    assert np.array_equal(page.digits, pages[2].digits)
+
+
+def test_book_pdf_is_written_page_by_page():
+    book = BookLayout(3000, min_font_pt=12)
+    chunks = list(vector_render.iter_book_pdf(book, seed=2))
+    assert len(chunks) == book.num_pages + 2
+    pdf = b"".join(chunks)
+    assert pdf.startswith(b"%PDF-1.7") and pdf.rstrip().endswith(b"%%EOF")
+    assert pdf.count(b"/Type /Page ") == book.num_pages
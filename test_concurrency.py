@@ -0,0 +1,47 @@
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from main import build_pi_grid, generate_json_data, pi_grid_data
+
+SEEDS = [1, 2, 42, 999, 31415]
+
+
+def test_concurrent_seeded_requests_are_bit_identical():
+    expected = {seed: generate_json_data(120, seed) for seed in SEEDS}
+    jobs = [SEEDS[i % len(SEEDS)] for i in range(300)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda seed: generate_json_data(120, seed), jobs))
+
+    for seed, result in zip(jobs, results):
+        assert result == expected[seed]
+
+
+def test_concurrent_engines_do_not_share_state():
+    def grid(job):
+        seed, engine = job
+        pi_grid = build_pi_grid(12, 10, seed, engine=engine)
+        return pi_grid.script_ids.tobytes()
+
+    jobs = [(seed, engine) for seed in SEEDS for engine in ("python", "compat", "fast")] * 10
+    expected = {job: grid(job) for job in set(jobs)}
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(grid, jobs))
+
+    for job, result in zip(jobs, results):
+        assert result == expected[job]
+
+
+def test_global_random_state_is_untouched():
+    random.seed(7)
+    state = random.getstate()
+    build_pi_grid(10, 10, seed=3)
+    build_pi_grid(10, 10, seed=None, engine="compat")
+    assert random.getstate() == state
+
+
+def test_reported_seed_reproduces_the_grid():
+    data = pi_grid_data(100)
+    again = pi_grid_data(100, data["seed"])
+    assert json.dumps(again) == json.dumps(data)
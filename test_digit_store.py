@@ -0,0 +1,53 @@
+import digit_store
+from main import get_pi_digits
+
+
+def test_store_matches_mpmath(tmp_path, monkeypatch):
+    path = str(tmp_path / "pi_digits.dat")
+    digit_store.build_digit_store(2000, path)
+    monkeypatch.setenv(digit_store.STORE_PATH_ENV, path)
+    try:
+        store = digit_store.get_store()
+        assert store.num_decimals == 2000
+        assert store.pi_slice(12) == "3.1415926535"
+        assert store.pi_slice(5, 1) == ".1415"
+        assert store.decimals(6, 761) == "999999"  # Feynman point
+
+        from_store = get_pi_digits(1500, offset=300)
+        digit_store.close_store(path)
+        monkeypatch.setenv(digit_store.STORE_PATH_ENV, str(tmp_path / "missing.dat"))
+        assert get_pi_digits(1500, offset=300) == from_store
+    finally:
+        digit_store.close_store(path)
+
+
+def test_fallback_beyond_store(tmp_path, monkeypatch):
+    monkeypatch.setenv(digit_store.STORE_PATH_ENV, str(tmp_path / "missing.dat"))
+    pi = get_pi_digits(1200)
+    assert len(pi) == 1201
+    assert pi.startswith("3.14159")
+    # Computed past the embedded digits, and consistent with them
+    assert pi[:len(digit_store.EMBEDDED_PI)] == digit_store.EMBEDDED_PI
+    assert get_pi_digits(100, offset=1100) == pi[1100:]
+
+
+def test_deep_tiles_need_a_store(tmp_path, monkeypatch):
+    import server
+    monkeypatch.setattr(server, "MAX_COMPUTED_TILE_CHARS", 1500)
+    monkeypatch.setenv(digit_store.STORE_PATH_ENV, str(tmp_path / "missing.dat"))
+    client = server.app.test_client()
+    tile = {"num_digits": 5000, "seed": 3, "left": 0, "height": 2, "width": 4}
+    assert client.post("/generate_tile", json=dict(tile, top=0)).status_code == 200
+    response = client.post("/generate_tile", json=dict(tile, top=40))
+    assert response.status_code == 503
+    assert "digit_store.py" in response.get_json()["error"]
+
+    path = str(tmp_path / "pi_digits.dat")
+    digit_store.build_digit_store(6000, path)
+    monkeypatch.setenv(digit_store.STORE_PATH_ENV, path)
+    try:
+        response = client.post("/generate_tile", json=dict(tile, top=40))
+        assert response.status_code == 200
+        assert response.get_json()["top"] == 40
+    finally:
+        digit_store.close_store(path)
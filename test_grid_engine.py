@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+import grid_engine
+from main import create_pi_grid, SCRIPT_IDS
+
+
+def assert_no_adjacent_repeats(grid_scripts):
+    ids = np.array([[SCRIPT_IDS[s] for s in row] for row in grid_scripts])
+    masks = grid_engine.neighbour_masks(ids, np.ones(ids.shape, dtype=bool))
+    clashes = ((masks >> ids.astype(np.uint32)) & 1).astype(bool)
+    clashes[0, :2] = False  # "3" and "." are both Latin by design
+    assert not clashes.any()
+
+
+@pytest.mark.parametrize("strategy", ["random", "least_used", "weighted"])
+@pytest.mark.parametrize("rows, cols", [(3, 3), (23, 19), (40, 31)])
+def test_compat_engine_matches_python(strategy, rows, cols):
+    weights = {"Tamil": 3.0, "Latin": 0.5, "Urdu": 0.0} if strategy == "weighted" else None
+    for seed in (1, 31415):
+        expected = create_pi_grid(rows, cols, seed, strategy, weights)
+        actual = create_pi_grid(rows, cols, seed, strategy, weights, engine="compat")
+        assert actual[:4] == expected[:4]
+
+
+@pytest.mark.parametrize("strategy", ["random", "weighted"])
+def test_fast_engine_is_valid_and_deterministic(strategy):
+    weights = {"Tamil": 0.0, "Latin": 5.0} if strategy == "weighted" else None
+    grid_digits, grid_scripts, script_usage, _, _ = create_pi_grid(41, 29, 7, strategy, weights, engine="fast")
+    assert grid_digits[0][:2] == ["3", "."]
+    assert grid_scripts[0][:2] == ["Latin", "Latin"]
+    assert sum(script_usage.values()) == 41 * 29
+    assert_no_adjacent_repeats(grid_scripts)
+    assert create_pi_grid(41, 29, 7, strategy, weights, engine="fast")[1] == grid_scripts
+
+
+def test_parallel_engine_is_independent_of_worker_count():
+    fixed = {(0, 0): SCRIPT_IDS["Latin"], (0, 1): SCRIPT_IDS["Latin"]}
+    args = (97, 53, len(SCRIPT_IDS), fixed, 2024)
+    single = grid_engine.assign_scripts_parallel(*args, workers=1, band_rows=16)
+    pooled = grid_engine.assign_scripts_parallel(*args, workers=2, band_rows=16)
+    assert (single == pooled).all()
+
+    masks = grid_engine.neighbour_masks(single, np.ones(single.shape, dtype=bool))
+    clashes = ((masks >> single.astype(np.uint32)) & 1).astype(bool)
+    clashes[0, :2] = False
+    assert not clashes.any()
+
+
+@pytest.mark.parametrize("strategy", ["random", "weighted"])
+def test_counter_tiles_fit_together(strategy):
+    rows, cols = 37, 29
+    fixed = {(0, 0): SCRIPT_IDS["Latin"], (0, 1): SCRIPT_IDS["Latin"]}
+    weights = [1.0 + i % 4 for i in range(len(SCRIPT_IDS))] if strategy == "weighted" else None
+    whole = grid_engine.assign_scripts_counter(rows, cols, len(SCRIPT_IDS), fixed, 11, strategy, weights)
+
+    # Uneven tiles, including 1-cell-wide ones, each generated on its own
+    stitched = np.zeros((rows, cols), dtype=np.uint8)
+    row_edges, col_edges = [0, 1, 5, 6, 20, rows], [0, 2, 3, 17, cols]
+    for top, bottom in zip(row_edges, row_edges[1:]):
+        for left, right in zip(col_edges, col_edges[1:]):
+            stitched[top:bottom, left:right] = grid_engine.assign_tile_scripts(
+                11, top, left, bottom - top, right - left, rows, cols, len(SCRIPT_IDS), fixed, strategy, weights)
+
+    assert (stitched == whole).all()
+    assert stitched[0, 0] == stitched[0, 1] == SCRIPT_IDS["Latin"]
+    masks = grid_engine.neighbour_masks(stitched, np.ones(stitched.shape, dtype=bool))
+    clashes = ((masks >> stitched.astype(np.uint32)) & 1).astype(bool)
+    clashes[0, :2] = False
+    assert not clashes.any()
+    assert (grid_engine.assign_scripts_counter(rows, cols, len(SCRIPT_IDS), fixed, 11, strategy, weights,
+                                               band_rows=4) == whole).all()
+
+
+def test_alias_tables_and_usage_index():
+    weights = [3.0, 0.0, 1.0, 0.5, 2.5]
+    table = grid_engine.AliasTable([0, 1, 2, 3, 4], weights)
+    chances = np.zeros(5)
+    for column, (prob, alias) in enumerate(zip(table.prob, table.alias)):
+        chances[table.ids[column]] += prob / 5
+        chances[table.ids[alias]] += (1 - prob) / 5
+    assert np.allclose(chances, np.array(weights) / sum(weights))
+
+    sampler = grid_engine.AliasSampler(weights)
+    assert sampler.table(0b00101).ids == [1, 3, 4]
+    assert sampler.table(0b00101) is sampler.table(0b00101)
+
+    rng = np.random.default_rng(0)
+    usage = grid_engine.UsageIndex(6, preferred=[1, 2, 4])
+    for _ in range(300):
+        forbidden = int(rng.integers(0, 64))
+        expected = sorted((s for s in range(6) if not (forbidden >> s) & 1),
+                          key=lambda s: (s not in (1, 2, 4), usage.counts[s], s))
+        assert usage.ordered(forbidden) == expected
+        assert usage.least_used(forbidden) == (expected[0] if expected else 0)
+        usage.add(int(rng.integers(0, 6)))
+
+
+def test_counter_tiles_next_to_fixed_cells_match_the_whole_grid():
+    # A tile whose halo ends right beside a fixed cell must still avoid it there
+    rows, cols = 8, 12
+    fixed = {(0, 0): SCRIPT_IDS["Latin"], (0, 1): SCRIPT_IDS["Latin"]}
+    for seed in range(1000):
+        whole = grid_engine.assign_scripts_counter(rows, cols, len(SCRIPT_IDS), fixed, seed, band_rows=rows)
+        for left in (4, 5, 6):
+            tile = grid_engine.assign_tile_scripts(seed, 0, left, 3, 3, rows, cols, len(SCRIPT_IDS), fixed)
+            assert (tile == whole[:3, left:left + 3]).all(), (seed, left)
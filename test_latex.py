@@ -4,7 +4,19 @@ Test script to verify LaTeX generation functionality
 """
 import json
 import os
-from server import generate_latex_code, INDIAN_SCRIPT_DIGITS, FONT_MAPPING
+import re
+from main import generate_grid_latex
+from numeral_scripts import NUMERAL_SCRIPTS, script_font, to_script
+from pi_grid import PiGrid
+
+# Scripts in the order cells are given them below
+INDIAN_SCRIPT_DIGITS = NUMERAL_SCRIPTS
+
+
+def generate_latex_code(pi_data, title):
+    """LaTeX for data posted back by the web interface, as /generate_latex builds it."""
+    return generate_grid_latex(PiGrid.from_data(pi_data), title)
+
 
 def create_test_data():
     """Create a small test dataset with just a few cells"""
@@ -13,10 +25,12 @@ def create_test_data():
     for i in range(3):
         row = []
         for j in range(3):
+            value = "3" if i == 0 and j == 0 else str((i*3 + j) % 9 + 1)
+            script = "Latin" if i == 0 and j == 0 else list(INDIAN_SCRIPT_DIGITS.keys())[((i*3 + j) % len(INDIAN_SCRIPT_DIGITS))]
             cell = {
-                "digit": "3" if i == 0 and j == 0 else str((i*3 + j) % 9 + 1),
-                "script": "Latin" if i == 0 and j == 0 else list(INDIAN_SCRIPT_DIGITS.keys())[((i*3 + j) % len(INDIAN_SCRIPT_DIGITS))],
-                "value": "3" if i == 0 and j == 0 else str((i*3 + j) % 9 + 1),
+                "digit": to_script(value, script),
+                "script": script,
+                "value": value,
                 "highlight": (i == 1 and j == 1)  # Center cell highlighted
             }
             row.append(cell)
@@ -40,6 +54,19 @@ def create_test_data():
     
     return test_data
 
+def test_latex_from_posted_data():
+    test_data = create_test_data()
+    latex_code = generate_latex_code(test_data, "LaTeX Test")
+
+    assert "LaTeX Test" in latex_code
+    assert latex_code.rstrip().endswith("\\end{document}")
+    for row in test_data["grid"]:
+        for cell in row:
+            assert cell["digit"] in latex_code
+            assert script_font(cell["script"]) in latex_code
+    # Only the centre cell is highlighted
+    assert len(re.findall(r"^\\hc[a-zA-Z]*\{", latex_code, re.M)) == 1
+
 def main():
     # Create test data
     test_data = create_test_data()
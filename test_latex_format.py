@@ -0,0 +1,29 @@
+import latex_format
+from main import build_pi_grid, generate_grid_latex
+
+
+def test_preamble_split_keeps_fonts_out_of_the_dump():
+    latex_code = generate_grid_latex(build_pi_grid(9, 6, seed=1))
+    dumpable, rest = latex_format.split_preamble(latex_code)
+    assert dumpable.startswith(r"\documentclass")
+    assert r"\usepackage{fontspec}" in dumpable and r"\usepackage{tikz}" in dumpable
+    assert "setmainfont" not in dumpable
+    assert rest.startswith(r"\setmainfont")
+
+    source, _, name = latex_format.prepare_source(latex_code)
+    assert source.replace(latex_format.END_OF_DUMP + "\n", "") == latex_code
+    # Every poster shares the same preamble, and so the same format
+    other = generate_grid_latex(build_pi_grid(15, 11, seed=2), title="Other")
+    assert latex_format.prepare_source(other)[2] == name
+
+
+def test_needs_rerun():
+    assert latex_format.needs_rerun("LaTeX Warning: Label(s) may have changed. Rerun to get cross-references right.")
+    assert not latex_format.needs_rerun("Output written on pi_visualization.pdf (1 page).")
+
+
+def test_format_is_optional(tmp_path, monkeypatch):
+    monkeypatch.setenv(latex_format.FORMAT_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv("PATH", str(tmp_path))
+    assert latex_format.build_format(r"\documentclass{article}", "pi_preamble_test") is None
+    assert latex_format.warm_fonts() == []
@@ -0,0 +1,37 @@
+import re
+
+from main import build_pi_grid, generate_grid_latex
+from numeral_scripts import script_font
+
+
+def cell_count(latex_code):
+    """Cells drawn, whether as \\node lines or cell macro calls."""
+    return len(re.findall(r"^(\\node at|\\[dh]c[a-zP]*\{)", latex_code, re.M))
+
+
+def test_fonts_declared_once():
+    pi_grid = build_pi_grid(20, 20, seed=3)
+    inline = generate_grid_latex(pi_grid, style="inline")
+    macros = generate_grid_latex(pi_grid)
+
+    assert r"\fontspec{" in inline
+    assert r"\fontspec{" not in macros
+    assert macros.count(r"\selectfont") == 1
+    used_fonts = {script_font(script) for row in pi_grid.grid_scripts for script in row if script != "Latin"}
+    declared = re.findall(r"^\\newfontfamily\\digitfont[a-z]+\{(.*)\}$", macros, re.M)
+    assert len(declared) == len(set(declared))
+    assert used_fonts <= set(declared)
+    # Same cells, at a fraction of the size
+    assert cell_count(macros) == cell_count(inline) == 400
+    assert len(macros) * 3 < len(inline)
+
+
+def test_group_by_script():
+    pi_grid = build_pi_grid(12, 15, seed=5)
+    grouped = generate_grid_latex(pi_grid, group_by_script=True)
+    scopes = re.findall(r"^\\begin\{scope\}\[every node/.style=\{font=\\digitfont([a-z]+)\\digitsize\}\]$", grouped, re.M)
+    assert len(scopes) == len(set(scopes)) == grouped.count(r"\newfontfamily")
+    assert grouped.count(r"\end{scope}") == len(scopes)
+    assert cell_count(grouped) == 12 * 15
+    highlighted = sum(map(sum, pi_grid.mask))
+    assert len(re.findall(r"^\\hc[P]?\{", grouped, re.M)) == highlighted
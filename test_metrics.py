@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import metrics
+import server
+
+
+@pytest.fixture
+def client():
+    server.app.testing = True
+    server.response_cache.clear()
+    return server.app.test_client()
+
+
+def test_histogram_prometheus_format():
+    hist = metrics.Histogram("test_seconds", "Test durations.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value, "a")
+    text = hist.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 3' in text
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in text
+    assert 'test_seconds_count{stage="a"} 4' in text
+    assert 'test_seconds_sum{stage="a"} 4.05' in text
+
+
+def test_timed_and_server_timing():
+    metrics.start_request()
+    with metrics.timed("digits"):
+        pass
+
+    @metrics.timed("mask")
+    def mask():
+        return 1
+
+    assert mask() == 1 and mask() == 1
+    assert "".join(metrics.timed_iter("latex", ["a", "b"])) == "ab"
+    assert [stage for stage, _ in metrics.request_timings()] == ["digits", "mask", "mask", "latex"]
+    header = metrics.server_timing([("mask", 0.001), ("mask", 0.002)], total=0.01)
+    assert header == "mask;dur=3.00, total;dur=10.00"
+
+
+def test_metrics_endpoint_and_server_timing_header(client, monkeypatch):
+    monkeypatch.setenv(server.SERVER_TIMING_ENV, "1")
+    response = client.post("/generate_pi_data", json={"num_digits": 100, "seed": 3})
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert {"digits", "mask", "scripts", "serialize", "total"} <= set(stages)
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'pi_stage_seconds_count{stage="scripts"}' in text
+    assert 'pi_request_seconds_count{endpoint="generate_pi_data",method="POST",status="200"}' in text
+    assert "pi_cache_misses_total" in text and "pi_pdf_jobs_pending" in text
+
+    monkeypatch.delenv(server.SERVER_TIMING_ENV)
+    assert "Server-Timing" not in client.post("/generate_pi_data", json={"num_digits": 100}).headers
+
+
+def test_sampled_profiles_are_dumped(client, monkeypatch, tmp_path):
+    monkeypatch.setenv(metrics.PROFILE_RATE_ENV, "1")
+    monkeypatch.setenv(metrics.PROFILE_DIR_ENV, str(tmp_path))
+    assert client.post("/generate_pi_data", json={"num_digits": 50, "seed": 1}).status_code == 200
+    profiles = os.listdir(tmp_path)
+    assert len(profiles) == 1 and profiles[0].startswith("generate_pi_data-")
+
+    monkeypatch.setenv(metrics.PROFILE_RATE_ENV, "0")
+    client.post("/generate_pi_data", json={"num_digits": 50, "seed": 1})
+    assert len(os.listdir(tmp_path)) == 1
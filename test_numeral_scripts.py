@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from numeral_scripts import (
+    NUMERAL_SCRIPTS, SCRIPT_NAMES, CODE_POINTS, GLYPHS, DIGIT_TABLES, to_script, to_latin, digit_values,
+)
+from pi_grid import PiGrid
+from main import convert_digit, build_pi_grid
+
+
+def test_tables_match_code_point_arithmetic():
+    for script_id, script in enumerate(SCRIPT_NAMES):
+        for d in range(10):
+            char = chr(NUMERAL_SCRIPTS[script] + d)
+            assert CODE_POINTS[script_id, d] == ord(char) and GLYPHS[script_id, d] == char
+            assert convert_digit(str(d), script) == char
+        assert GLYPHS[script_id, 10] == "." and convert_digit(".", script) == "."
+        assert to_script("3.1415926535", script) == "".join(convert_digit(c, script) for c in "3.1415926535")
+    assert set(DIGIT_TABLES) == set(SCRIPT_NAMES)
+
+
+def test_reverse_table_and_validation():
+    mixed = "".join(to_script(d, script) for d, script in zip("3.14159265", SCRIPT_NAMES))
+    assert to_latin(mixed) == "3.14159265"
+    assert digit_values([ord(c) for c in mixed]).tolist() == [3, 10, 1, 4, 1, 5, 9, 2, 6, 5]
+    with pytest.raises(ValueError):
+        digit_values([ord("3"), ord("x")])
+
+
+def test_from_lists_rejects_digits_of_another_script():
+    pi_grid = build_pi_grid(6, 5, seed=4, engine="fast")
+    data = pi_grid.to_dict()
+    assert np.array_equal(PiGrid.from_data(data).digits, pi_grid.digits)
+    cell = data["grid"][1][1]
+    cell["digit"] = to_script("7", "Latin" if cell["script"] != "Latin" else "Tamil")
+    with pytest.raises(ValueError):
+        PiGrid.from_data(data)
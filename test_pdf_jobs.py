@@ -0,0 +1,161 @@
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+import pdf_jobs
+import server
+from main import pi_grid_data
+
+
+@pytest.fixture
+def fake_xelatex(tmp_path, monkeypatch):
+    """A stand-in xelatex that writes its working directory into the PDF."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "xelatex"
+    script.write_text(
+        '#!/bin/sh\n'
+        'sleep "${FAKE_XELATEX_SLEEP:-0}"\n'
+        'echo run >> calls\n'
+        'if [ -n "$FAKE_XELATEX_RERUN" ] && [ "$(wc -l < calls)" -lt 2 ]; then\n'
+        '  echo "LaTeX Warning: Label(s) may have changed. Rerun to get cross-references right." > pi_visualization.log\n'
+        'else\n'
+        '  : > pi_visualization.log\n'
+        'fi\n'
+        'printf "%%PDF %s %s" "$(wc -l < calls)" "$PWD" > pi_visualization.pdf\n'
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return script
+
+
+def test_compiles_use_isolated_directories(fake_xelatex):
+    queue = pdf_jobs.PdfJobQueue(workers=4)
+    jobs = [queue.submit(f"key{i}", "\\documentclass{article}") for i in range(8)]
+    for job in jobs:
+        assert queue.wait(job, 10)
+        assert job.status == pdf_jobs.DONE
+    workdirs = {job.result for job in jobs}
+    assert len(workdirs) == len(jobs)
+    assert not any(os.path.exists(result.decode().split()[2]) for result in workdirs)
+    queue.shutdown()
+
+
+def test_single_pass_unless_log_asks_for_rerun(fake_xelatex, monkeypatch):
+    assert pdf_jobs.compile_latex("x").split()[1] == b"1"
+    assert pdf_jobs.compile_latex("x", passes=2).split()[1] == b"2"
+    monkeypatch.setenv("FAKE_XELATEX_RERUN", "1")
+    assert pdf_jobs.compile_latex("x").split()[1] == b"2"
+
+
+def test_timeout_and_cancel_running_job(fake_xelatex, monkeypatch):
+    monkeypatch.setenv("FAKE_XELATEX_SLEEP", "5")
+    with pytest.raises(pdf_jobs.PdfCompileError, match="timed out"):
+        pdf_jobs.compile_latex("x", timeout=0.2)
+
+    queue = pdf_jobs.PdfJobQueue(workers=1)
+    job = queue.submit("slow", "x")
+    while job.process is None:
+        time.sleep(0.01)
+    queue.cancel(job.id)
+    assert queue.wait(job, 2)
+    assert job.status == pdf_jobs.CANCELLED
+    queue.shutdown()
+
+
+def test_back_pressure_dedupe_and_cancel_queued():
+    release = threading.Event()
+
+    def blocked_compile(latex_code, timeout, on_process):
+        release.wait(5)
+        return b"%PDF " + latex_code.encode()
+
+    queue = pdf_jobs.PdfJobQueue(workers=1, max_pending=2, compile_fn=blocked_compile)
+    first = queue.submit("a", "a")
+    second = queue.submit("b", "b")
+    assert queue.submit("a", "a") is first
+    with pytest.raises(pdf_jobs.QueueFull):
+        queue.submit("c", "c")
+
+    queue.cancel(second.id)
+    assert second.status == pdf_jobs.CANCELLED
+    release.set()
+    assert queue.wait(first, 5)
+    assert first.result == b"%PDF a"
+    assert queue.depth() == 0
+    queue.shutdown()
+
+
+def test_close_finishes_running_and_cancels_queued():
+    started = threading.Event()
+
+    def slow_compile(latex_code, timeout, on_process):
+        started.set()
+        time.sleep(0.3)
+        return b"%PDF " + latex_code.encode()
+
+    queue = pdf_jobs.PdfJobQueue(workers=1, compile_fn=slow_compile)
+    running = queue.submit("a", "a")
+    queued = queue.submit("b", "b")
+    assert started.wait(5)
+    assert queue.close(timeout=5) == 0
+    assert running.status == pdf_jobs.DONE
+    assert queued.status == pdf_jobs.CANCELLED
+    with pytest.raises(pdf_jobs.QueueFull, match="shutting down"):
+        queue.submit("c", "c")
+
+
+def test_pdf_endpoint_returns_job_then_cached_pdf(monkeypatch):
+    monkeypatch.setattr(server.pdf_queue, "compile_fn",
+                        lambda latex_code, timeout, on_process: b"%PDF fake")
+    client = server.app.test_client()
+    payload = {"data": pi_grid_data(50, 5), "title": "job test"}
+
+    response = client.post("/generate_pdf", json=payload)
+    assert response.status_code == 202
+    job = response.get_json()
+    assert server.pdf_queue.wait(server.pdf_queue.get(job["job_id"]), 5)
+
+    result = client.get(job["result_url"])
+    assert result.status_code == 200
+    assert result.data == b"%PDF fake"
+    assert client.get(job["status_url"]).get_json()["status"] == "done"
+
+    cached = client.post("/generate_pdf", json=payload)
+    assert cached.status_code == 200
+    assert cached.data == b"%PDF fake"
+    assert cached.headers["ETag"] == result.headers["ETag"]
+
+
+def test_waiting_for_a_failed_or_slow_job(monkeypatch):
+    def failing_compile(latex_code, timeout, on_process):
+        raise pdf_jobs.PdfCompileError("LaTeX compilation failed: ! Undefined control sequence")
+
+    monkeypatch.setattr(server.pdf_queue, "compile_fn", failing_compile)
+    client = server.app.test_client()
+    failed = client.post("/generate_pdf?wait=1", json={"data": pi_grid_data(50, 6), "title": "failing"})
+    assert failed.status_code == 500
+    assert "Undefined control sequence" in failed.get_json()["error"]
+
+    def slow_compile(latex_code, timeout, on_process):
+        time.sleep(0.5)
+        return b"%PDF slow"
+
+    monkeypatch.setattr(server.pdf_queue, "compile_fn", slow_compile)
+    monkeypatch.setattr(server.pdf_queue, "timeout", 0.05)
+    running = client.post("/generate_pdf?wait=1", json={"data": pi_grid_data(50, 7), "title": "slow"})
+    assert running.status_code == 202
+    job = server.pdf_queue.get(running.get_json()["job_id"])
+    assert server.pdf_queue.wait(job, 5)
+    assert client.get(running.get_json()["result_url"]).data == b"%PDF slow"
+
+
+def test_sync_mode_answers_with_the_pdf(monkeypatch):
+    monkeypatch.setattr(server.pdf_queue, "compile_fn", lambda latex_code, timeout, on_process: b"%PDF sync")
+    monkeypatch.setitem(server.app.config, "PDF_SYNC", True)
+    response = server.app.test_client().post("/generate_pdf", json={"data": pi_grid_data(50, 8), "title": "sync"})
+    assert response.status_code == 200
+    assert response.data == b"%PDF sync"
@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from main import build_pi_grid, create_pi_grid
+from numeral_scripts import NUMERAL_SCRIPTS
+from pi_grid import PiGrid, DECIMAL_POINT, adjacent_clashes
+from response_cache import ALGORITHM_VERSION
+from server import app
+
+
+def test_views_match_legacy_tuple():
+    pi_grid = build_pi_grid(16, 13, seed=42)
+    grid_digits, grid_scripts, script_usage, total_scripts_used, pi_mask = create_pi_grid(16, 13, seed=42)
+    assert pi_grid.grid_digits == grid_digits
+    assert pi_grid.grid_scripts == grid_scripts
+    assert pi_grid.script_usage == script_usage
+    assert pi_grid.total_scripts_used == total_scripts_used
+    assert (pi_grid.mask == pi_mask).all()
+    assert pi_grid.digits[0, 1] == DECIMAL_POINT
+
+
+def test_round_trip_through_data_object():
+    pi_grid = build_pi_grid(23, 19, seed=7, engine="fast")
+    copy = PiGrid.from_data(pi_grid.to_dict())
+    assert (copy.digits == pi_grid.digits).all()
+    assert (copy.script_ids == pi_grid.script_ids).all()
+    assert (copy.mask == pi_grid.mask).all()
+    assert copy.seed == 7
+
+
+def test_compact_storage():
+    pi_grid = build_pi_grid(300, 200, seed=1, engine="fast")
+    assert pi_grid.nbytes <= 2.2 * 300 * 200
+    assert pi_grid.mask.dtype == np.bool_
+
+
+def test_from_data_validates_uploads():
+    pi_data = build_pi_grid(9, 7, seed=3, engine="fast").to_dict()
+    PiGrid.from_data(pi_data)
+
+    ragged = {**pi_data, "grid": pi_data["grid"][:-1] + [pi_data["grid"][-1][:-1]]}
+    with pytest.raises(ValueError, match="rectangle"):
+        PiGrid.from_data(ragged)
+    with pytest.raises(ValueError, match="rows and cols"):
+        PiGrid.from_data({**pi_data, "rows": 10})
+
+    # Give cell (4, 3) the script (and matching numeral) of its neighbour below
+    clash = json.loads(json.dumps(pi_data))
+    below = clash["grid"][5][3]
+    cell = clash["grid"][4][3]
+    value = ord(cell["digit"]) - NUMERAL_SCRIPTS[cell["script"]]
+    cell["script"], cell["digit"] = below["script"], chr(NUMERAL_SCRIPTS[below["script"]] + value)
+    with pytest.raises(ValueError, match="share a script"):
+        PiGrid.from_data(clash)
+    assert adjacent_clashes(PiGrid.from_data(pi_data).script_ids).sum() == 0
+
+
+def test_rendering_from_a_seed_reference(monkeypatch, tmp_path):
+    # /generate_latex saves pi_visualization.tex to the working directory
+    monkeypatch.chdir(tmp_path)
+    client = app.test_client()
+    pi_data = client.post("/generate_pi_data", json={"num_digits": 120, "seed": 5}).get_json()
+    reference = {"num_digits": 120, "seed": 5, "algorithm_version": ALGORITHM_VERSION}
+
+    by_reference = client.post("/generate_latex", json={**reference, "title": "T"})
+    uploaded = client.post("/generate_latex", json={"data": pi_data, "title": "T"})
+    assert by_reference.status_code == uploaded.status_code == 200
+    assert by_reference.data == uploaded.data
+
+    stale = client.post("/generate_svg", json={**reference, "algorithm_version": "0"})
+    assert stale.status_code == 409
+    pi_data["grid"][0][0]["digit"] = "x"
+    assert client.post("/generate_svg", json={"data": pi_data}).status_code == 400
+    assert client.post("/generate_latex", json={"title": "T"}).status_code == 400
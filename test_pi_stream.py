@@ -0,0 +1,32 @@
+import digit_store
+from main import get_pi_digits
+from pi_stream import ChudnovskySeries, iter_pi_digits
+
+
+def test_stream_matches_get_pi_digits(tmp_path, monkeypatch):
+    monkeypatch.setenv(digit_store.STORE_PATH_ENV, str(tmp_path / "missing.dat"))
+    chunks = list(iter_pi_digits(3000, chunk_size=500))
+    assert max(len(chunk) for chunk in chunks) <= 500
+    assert "".join(chunks) == get_pi_digits(3000)
+
+
+def test_unbounded_stream_yields_increasing_prefixes():
+    stream = iter_pi_digits(chunk_size=4096)
+    text = ""
+    while len(text) < 5000:
+        text += next(stream)
+    assert text[:12] == "3.1415926535"
+    assert text[763:769] == "999999"
+
+
+def test_checkpoint_resume(tmp_path):
+    path = str(tmp_path / "series.ckpt")
+    first = ChudnovskySeries(path)
+    short = first.digits(1000)
+
+    resumed = ChudnovskySeries(path)
+    assert resumed.terms == first.terms
+    extended = resumed.digits(2000)
+    assert resumed.terms > first.terms
+    assert extended.startswith(short)
+    assert extended == ChudnovskySeries().digits(2000)
@@ -0,0 +1,65 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import raster_render
+from main import build_digit_grid, pi_grid_data
+from server import app
+
+
+def test_grid_is_blitted_from_the_atlas():
+    pi_grid = build_digit_grid(200, 3)
+    image = np.asarray(raster_render.render_image(pi_grid, dpi=72))
+    layout = raster_render.RasterLayout(raster_render.PosterLayout(pi_grid.rows, pi_grid.cols), 72)
+    cell = layout.cell_px
+    for row, col in [(0, 0), (0, 1), (5, 7), (pi_grid.rows - 1, pi_grid.cols - 1)]:
+        top, left = layout.grid_top + row * cell, layout.grid_left + col * cell
+        glyph = int(pi_grid.script_ids[row, col]) * raster_render.GLYPHS_PER_SCRIPT + pi_grid.digits[row, col]
+        tiles = raster_render.glyph_tiles(glyph, cell, layout.font_px)
+        assert (image[top:top + cell, left:left + cell] == tiles[int(pi_grid.mask[row, col])]).all()
+        assert raster_render.glyph_tiles(glyph, cell, layout.font_px) is tiles
+
+
+def test_only_used_glyphs_are_drawn_and_atlases_are_bounded(monkeypatch):
+    pi_grid = build_digit_grid(10, 1)
+    glyphs = raster_render.used_glyphs(pi_grid)
+    assert len(glyphs) == len(set(zip(pi_grid.script_ids.ravel(), pi_grid.digits.ravel())))
+    monkeypatch.setattr(raster_render, "tile_cache", raster_render.TileCache())
+    raster_render.render_image(pi_grid, dpi=72)
+    layout = raster_render.RasterLayout(raster_render.PosterLayout(pi_grid.rows, pi_grid.cols), 72)
+    assert raster_render.tile_cache.nbytes == raster_render.atlas_nbytes(layout.cell_px, len(glyphs))
+
+    small = raster_render.TileCache(max_bytes=3 * 2 * 8 * 8 * 3)
+    for glyph in range(5):
+        small.get(glyph, lambda: np.zeros((2, 8, 8, 3), dtype=np.uint8))
+    assert small.nbytes <= small.max_bytes
+
+    monkeypatch.setattr(raster_render, "MAX_ATLAS_BYTES", 1024)
+    with pytest.raises(raster_render.AtlasTooLarge):
+        raster_render.iter_bands(pi_grid, dpi=72)
+    client = app.test_client()
+    payload = {"data": pi_grid.to_dict(10), "dpi": 72}
+    assert client.post("/generate_png", json=payload).status_code == 400
+
+
+def test_tiled_png_matches_in_memory_render():
+    pi_grid = build_digit_grid(200, 3)
+    out = io.BytesIO()
+    size = raster_render.render_png_tiled(pi_grid, out, dpi=50, band_rows=3)
+    streamed = Image.open(io.BytesIO(out.getvalue()))
+    assert streamed.size == size
+    expected = raster_render.render_image(pi_grid, dpi=50)
+    assert (np.asarray(streamed.convert("RGB")) == np.asarray(expected)).all()
+
+
+def test_png_endpoint():
+    client = app.test_client()
+    payload = {"data": pi_grid_data(50, 2), "dpi": 40}
+    png = client.post("/generate_png", json=payload)
+    assert png.status_code == 200 and png.data.startswith(b"\x89PNG")
+    webp = client.post("/generate_png?format=webp", json=payload)
+    assert webp.status_code == 200 and webp.mimetype == "image/webp"
+    assert client.post("/generate_png", json=dict(payload, dpi=10000)).status_code == 400
+    assert client.post("/generate_png", json=dict(payload, format="gif")).status_code == 400
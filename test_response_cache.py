@@ -0,0 +1,76 @@
+import os
+
+from response_cache import ResponseCache, cache_key
+from server import app, response_cache
+
+
+def test_cache_key_is_stable_and_parameter_sensitive():
+    assert cache_key("pi_data", seed=1, num_digits=200) == cache_key("pi_data", num_digits=200, seed=1)
+    assert cache_key("pi_data", seed=1, num_digits=200) != cache_key("pi_data", seed=2, num_digits=200)
+    assert cache_key("latex", seed=1) != cache_key("pdf", seed=1)
+
+
+def test_lru_eviction_by_size():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", b"12345", "text/plain")
+    cache.put("b", b"12345", "text/plain")
+    assert cache.get("a") is not None  # "a" is now the most recently used
+    cache.put("c", b"12345", "text/plain")
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == b"12345"
+    assert cache.get("c")[0] == b"12345"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    cache.put("k", b"%PDF", "application/pdf", {"Content-Disposition": "attachment"})
+    restarted = ResponseCache(disk_dir=str(tmp_path))
+    assert restarted.get("k") == (b"%PDF", "application/pdf", {"Content-Disposition": "attachment"})
+    assert restarted.stats()["disk_hits"] == 1
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def test_endpoint_hits_cache_and_honours_etag():
+    client = app.test_client()
+    response_cache.clear()
+    before = response_cache.stats()
+    first = client.post("/generate_pi_data?format=compact", json={"num_digits": 200, "seed": 11})
+    second = client.post("/generate_pi_data?format=compact", json={"num_digits": 200, "seed": 11})
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert first.headers["ETag"] == second.headers["ETag"]
+
+    after = response_cache.stats()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+    revalidated = client.post("/generate_pi_data?format=compact", json={"num_digits": 200, "seed": 11},
+                              headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+
+def test_unseeded_requests_are_not_cached():
+    client = app.test_client()
+    response = client.post("/generate_pi_data?format=compact", json={"num_digits": 200})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_endpoint_honours_strategy_and_weights():
+    client = app.test_client()
+    request = {"num_digits": 400, "seed": 3, "sampling_strategy": "weighted",
+               "script_weights": {"Tamil": 20, "Urdu": 0}}
+    usage = client.post("/generate_pi_data?format=compact", json=request).get_json()["script_usage"]
+    assert "Urdu" not in usage
+    assert usage["Tamil"] == max(usage.values())
+
+    balanced = client.post("/generate_pi_data?format=compact",
+                           json={"num_digits": 400, "seed": 3, "sampling_strategy": "least_used"}).get_json()
+    assert balanced["sampling_strategy"] == "least_used"
+    assert max(balanced["script_usage"].values()) - min(balanced["script_usage"].values()) <= 2
+
+    for invalid in ({"sampling_strategy": "loudest"}, {"sampling_strategy": "weighted", "script_weights": {"Klingon": 1}},
+                    {"sampling_strategy": "weighted", "script_weights": {"Tamil": -1}}):
+        assert client.post("/generate_pi_data", json={"num_digits": 100, **invalid}).status_code == 400
@@ -0,0 +1,53 @@
+import re
+import json
+import signal
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_workers_serve_limit_bodies_and_stop_on_sigterm():
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--port", "0", "--workers", "2", "--no-preload", "--grace", "5",
+         "--max-request-bytes", "100000"],
+        cwd=REPO, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        for line in process.stderr:
+            match = re.search(r"Listening on (http://\S+) with 2 workers", line)
+            if match:
+                break
+        else:
+            raise AssertionError("server did not start")
+        url = match.group(1)
+
+        for seed in range(4):
+            status, body = post(f"{url}/generate_pi_data", json.dumps({"num_digits": 50, "seed": seed}).encode())
+            assert status == 200
+            assert json.loads(body)["num_digits"] == 50
+        status, body = post(f"{url}/generate_svg", b"[" + b"0," * 100000 + b"0]")
+        assert status == 413
+
+        # No PDF job that only one worker knows about (it fails here without xelatex)
+        status, _ = post(f"{url}/generate_pdf", json.dumps({"num_digits": 50, "seed": 1}).encode())
+        assert status in (200, 500)
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=15) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.communicate()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import shape_masks
+from shape_masks import shape_mask, shape_mask_rows, register_bitmap
+from main import generate_pi_shape_mask
+
+
+def pillow_pi_mask(rows, cols):
+    """The mask as generate_pi_shape_mask used to draw it with Pillow."""
+    img = Image.new('1', (cols, rows), 0)
+    draw = ImageDraw.Draw(img)
+    width = cols * 0.7
+    height = rows * 0.7
+    x_offset = (cols - width) / 2
+    y_offset = (rows - height) / 2
+    line_height = height * 0.2
+    draw.rectangle([(x_offset, y_offset), (x_offset + width, y_offset + line_height)], fill=1)
+    left_x = x_offset + width * 0.25
+    draw.rectangle([(left_x - width * 0.1, y_offset), (left_x + width * 0.1, y_offset + height)], fill=1)
+    right_x = x_offset + width * 0.75
+    draw.rectangle([(right_x - width * 0.1, y_offset), (right_x + width * 0.1, y_offset + height)], fill=1)
+    return np.array(img)
+
+
+def test_pi_mask_matches_pillow_drawing():
+    sizes = [(r, c) for r in range(1, 60) for c in range(1, 60)] + [(1000, 700), (2049, 33)]
+    for rows, cols in sizes:
+        assert np.array_equal(shape_mask(rows, cols), pillow_pi_mask(rows, cols)), (rows, cols)
+    assert np.array_equal(generate_pi_shape_mask(17, 12), pillow_pi_mask(17, 12))
+
+
+@pytest.mark.parametrize("shape", ["pi", "circle"])
+def test_row_ranges_match_full_mask(shape):
+    full = shape_mask(301, 97, shape)
+    for start, end in [(0, 301), (0, 1), (40, 120), (300, 301), (150, 150)]:
+        assert np.array_equal(shape_mask_rows(301, 97, start, end, shape), full[start:end])
+    with pytest.raises(ValueError):
+        shape_mask_rows(301, 97, 200, 302)
+
+
+def test_masks_are_cached_and_read_only():
+    assert shape_mask(40, 30) is shape_mask(40, 30)
+    with pytest.raises(ValueError):
+        shape_mask(40, 30)[0, 0] = True
+    # generate_pi_shape_mask hands out a writable copy
+    mask = generate_pi_shape_mask(40, 30)
+    mask[0, 0] = True
+    assert not shape_mask(40, 30)[0, 0]
+    assert shape_mask.cache_info().maxsize == shape_masks.MASK_CACHE_SIZE
+
+
+def test_circle_and_bitmap_shapes():
+    circle = shape_mask(50, 50, "circle")
+    assert circle[25, 25] and not circle[0, 0]
+    assert np.array_equal(circle, circle.T) and np.array_equal(circle, circle[::-1])
+
+    register_bitmap("test-checker", [[1, 0], [0, 1]])
+    mask = shape_mask(4, 6, "test-checker")
+    assert mask[:2, :3].all() and mask[2:, 3:].all() and not mask[:2, 3:].any()
+    assert np.array_equal(shape_mask_rows(4, 6, 1, 3, "test-checker"), mask[1:3])
+    with pytest.raises(ValueError):
+        shape_mask(4, 6, "no-such-shape")
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent
+
+# Self time (microseconds, as reported by -X importtime) of this repo's own
+# modules when the server is imported; third-party imports are not counted
+IMPORT_BUDGET_US = 100_000
+
+# Only needed by the code paths that use them, never at import
+LAZY_MODULES = ("mpmath", "PIL", "multiprocessing", "concurrent.futures.process")
+
+
+def import_times(module, pycache):
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    env["PYTHONPYCACHEPREFIX"] = str(pycache)
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    # The first run fills the bytecode cache so compiling is not measured
+    subprocess.run(command, cwd=REPO, env=env, check=True, capture_output=True)
+    result = subprocess.run(command, cwd=REPO, env=env, check=True, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def test_server_import_stays_within_budget(tmp_path):
+    times = import_times("server", tmp_path)
+    assert "server" in times
+    assert not [name for name in times if name.split(".")[0] in LAZY_MODULES or name in LAZY_MODULES]
+    own = sum(us for name, us in times.items() if (REPO / f"{name}.py").exists())
+    assert own < IMPORT_BUDGET_US, f"repo modules took {own} us to import"
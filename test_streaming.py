@@ -0,0 +1,43 @@
+import json
+
+import server
+from main import build_pi_grid, generate_grid_latex, iter_grid_latex
+
+
+def test_streamed_latex_matches_generate_latex():
+    pi_grid = build_pi_grid(14, 9, 2)
+    for options in ({}, {"group_by_script": True}, {"style": "inline"}):
+        chunks = list(iter_grid_latex(pi_grid, **options))
+        assert len(chunks) > pi_grid.rows
+        assert "".join(chunks) == generate_grid_latex(pi_grid, **options)
+
+
+def test_streamed_json_matches_json_dumps():
+    pi_grid = build_pi_grid(6, 11, 3)
+    assert "".join(pi_grid.iter_json(60)) == json.dumps(pi_grid.to_dict(60), indent=2)
+    compact = "".join(pi_grid.iter_json(indent=None, separators=(",", ":")))
+    assert compact == json.dumps(pi_grid.to_dict(), separators=(",", ":"))
+
+
+def test_large_responses_are_streamed(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "STREAM_MIN_CELLS", 100)
+    monkeypatch.chdir(tmp_path)
+    client = server.app.test_client()
+    data = client.post("/generate_pi_data", json={"num_digits": 150, "seed": 4}).get_json()
+    assert data["num_digits"] == 150 and data["rows"] * data["cols"] >= 100
+
+    response = client.post("/generate_latex", json={"data": data})
+    assert response.is_streamed and response.headers["ETag"]
+    latex_code = response.get_data(as_text=True)
+    assert latex_code.endswith(r"\end{document}")
+    assert (tmp_path / "pi_visualization.tex").read_text(encoding="utf-8") == latex_code
+    assert [path.name for path in tmp_path.iterdir()] == ["pi_visualization.tex"]
+
+
+def test_generated_grids_are_clamped_not_streamed():
+    client = server.app.test_client()
+    response = client.post("/generate_pi_data", json={"num_digits": server.STREAM_MIN_CELLS, "seed": 4})
+    assert response.content_length  # Sent whole (and cached), not streamed
+    data = response.get_json()
+    assert data["num_digits"] == server.MAX_DIGITS
+    assert client.post("/generate_pi_data", json={"num_digits": "many"}).status_code == 400
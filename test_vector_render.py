@@ -0,0 +1,63 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import font_files
+import vector_render
+from main import build_digit_grid, pi_grid_data
+from poster_layout import PosterLayout
+from server import app
+
+
+def test_pdf_structure_and_pages():
+    pi_grid = build_digit_grid(200, 3)
+    pdf = vector_render.render_pdf(pi_grid)
+    assert pdf.startswith(b"%PDF-1.7") and pdf.rstrip().endswith(b"%%EOF")
+    assert pdf.count(b"/Type /Page ") == 1
+    # The xref offsets point at the objects
+    xref = int(pdf.rsplit(b"startxref", 1)[1].split()[0])
+    first_offset = int(pdf[xref:].split(b"\n")[3].split()[0])
+    assert pdf[first_offset:].startswith(b"1 0 obj")
+
+    multi = vector_render.render_pdf(pi_grid, rows_per_page=5)
+    assert multi.count(b"/Type /Page ") == PosterLayout(pi_grid.rows, pi_grid.cols, rows_per_page=5).num_pages
+    assert vector_render.render_pdf(pi_grid) == pdf  # deterministic, so cacheable
+
+
+def test_pdf_embeds_fonts_when_available():
+    pi_grid = build_digit_grid(50, 1)
+    pdf = vector_render.render_pdf(pi_grid)
+    if font_files.resolve_font_file("Noto Sans") is None:
+        assert b"/BaseFont /Helvetica" in pdf
+    else:
+        assert b"/Subtype /Type0" in pdf and b"/Encoding /Identity-H" in pdf
+
+
+def test_svg_has_one_text_per_cell():
+    pi_grid = build_digit_grid(200, 3)
+    root = ET.fromstring(vector_render.render_svg(pi_grid, title="A & B"))
+    texts = root.findall("{http://www.w3.org/2000/svg}g/{http://www.w3.org/2000/svg}text")
+    assert len(texts) == pi_grid.rows * pi_grid.cols
+    highlighted = [t for t in texts if t.get("class").endswith(" h")]
+    assert len(highlighted) == int(pi_grid.mask.sum())
+    assert "".join(t.text for t in texts[:2]) == "3."
+
+
+def test_large_format_page_grows_with_cell_size():
+    layout = PosterLayout(100, 80, cell_size=20)
+    assert layout.page_width == 80 * 20 + 2 * layout.margin
+    a4 = PosterLayout(100, 80)
+    assert layout.font_size / layout.cell == pytest.approx(a4.font_size / a4.cell)
+
+
+def test_vector_endpoints():
+    client = app.test_client()
+    payload = {"data": pi_grid_data(50, 2), "renderer": "vector"}
+    pdf = client.post("/generate_pdf", json=payload)
+    assert pdf.status_code == 200 and pdf.mimetype == "application/pdf"
+    svg = client.post("/generate_svg", json=payload)
+    assert svg.status_code == 200 and svg.mimetype == "image/svg+xml"
+    assert client.post("/generate_svg", json=dict(payload, page="x")).status_code == 400
+    assert client.post("/generate_svg", json=dict(payload, page=1)).status_code == 400
+    assert client.post("/generate_svg", json=dict(payload, rows_per_page=2, page=1)).status_code == 200
+    assert client.post("/generate_png", json=dict(payload, dpi=20, page=7)).status_code == 400
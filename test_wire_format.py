@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import wire_format
+from main import build_pi_grid
+from server import app
+
+
+def test_binary_round_trip():
+    pi_grid = build_pi_grid(16, 13, seed=3)
+    decoded, header = wire_format.decode_binary(wire_format.encode_binary(pi_grid, 200))
+    assert header["num_digits"] == 200
+    assert (decoded.digits == pi_grid.digits).all()
+    assert (decoded.script_ids == pi_grid.script_ids).all()
+    assert (decoded.mask == pi_grid.mask).all()
+
+
+def test_compact_columns_match_legacy_cells():
+    pi_grid = build_pi_grid(16, 13, seed=3)
+    data = wire_format.compact_data(pi_grid)
+    runs = data["highlight_runs"]
+    highlighted = set()
+    for start, length in zip(runs[::2], runs[1::2]):
+        highlighted.update(range(start, start + length))
+
+    cells = [cell for row in pi_grid.to_dict()["grid"] for cell in row]
+    for index, cell in enumerate(cells):
+        script_id = int(data["script_ids"][index], 36)
+        assert data["scripts"][script_id] == cell["script"]
+        if data["digits"][index] != ".":
+            assert chr(data["script_zero_code_points"][script_id] + int(data["digits"][index])) == cell["digit"]
+        assert (index in highlighted) == cell["highlight"]
+
+
+@pytest.mark.parametrize("query, accept, mimetype", [
+    ("", None, "application/json"),
+    ("?format=compact", None, wire_format.MIME_TYPES["compact"]),
+    ("", wire_format.MIME_TYPES["binary"], wire_format.MIME_TYPES["binary"]),
+])
+def test_endpoint_negotiates_format(query, accept, mimetype):
+    headers = {"Accept": accept} if accept else {}
+    response = app.test_client().post("/generate_pi_data" + query, json={"num_digits": 430, "seed": 5}, headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    if mimetype == wire_format.MIME_TYPES["compact"]:
+        data = json.loads(response.data)
+        assert len(data["digits"]) == len(data["script_ids"]) == data["rows"] * data["cols"]
+
+
+def test_unknown_format_is_rejected():
+    response = app.test_client().post("/generate_pi_data?format=xml", json={"num_digits": 50})
+    assert response.status_code == 400
@@ -0,0 +1,409 @@
+"""
+Native PDF and SVG rendering of the pi poster, without LaTeX.
+
+The poster is laid out with poster_layout (the LaTeX poster's page and font
+geometry) and every digit is set in the font generate_latex would use for
+its script (numeral_scripts.script_font). PDFs embed those fonts as
+Identity-H CID fonts, subsetted to the used glyphs when fontTools is
+installed; SVGs reference them by family name.
+"""
+import zlib
+import hashlib
+import logging
+from html import escape
+
+import numpy as np
+
+import book_layout
+import metrics
+from numeral_scripts import NUMERAL_SCRIPTS, SCRIPT_NAMES, SCRIPT_IDS, script_font
+from font_files import resolve_font_file, load_font, compressed_font_data
+from poster_layout import (
+    PosterLayout, TITLE_FONT_PT, FOOTER_FONT_PT, HIGHLIGHT_RGB, TEXT_RGB, TITLE_RGB,
+)
+from main import LEFT_RIGHT_MARGIN_PT, resolve_seed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TITLE = "π in Indian Scripts"
+
+# Font for the title, the footer and the decimal point (\setmainfont)
+MAIN_FONT = "Noto Sans"
+
+_DIGIT_CODE_POINTS = [range(NUMERAL_SCRIPTS[script], NUMERAL_SCRIPTS[script] + 10) for script in SCRIPT_NAMES]
+
+# Fonts already reported as missing
+_warned_fonts = set()
+
+# Helvetica digit width, for placing text when no font file is installed
+_FALLBACK_ADVANCE = 0.556
+
+
+def _cell_fonts():
+    """Font name for every script id (the decimal point uses MAIN_FONT)."""
+    return [script_font(script) for script in SCRIPT_NAMES]
+
+
+def _used_text(pi_grid):
+    """
+    {(font name, bold): set of code points} needed to draw the grid. Cell
+    fonts get all ten digits of their scripts, so font subsets (and their
+    cache entries) are the same for every poster.
+    """
+    fonts = _cell_fonts()
+    used = {(MAIN_FONT, False): {ord(".")}}
+    for script_id in np.unique(pi_grid.script_ids).tolist():
+        used.setdefault((fonts[script_id], False), set()).update(_DIGIT_CODE_POINTS[script_id])
+    return used
+
+
+class _PdfWriter:
+    """
+    Serializes objects as they are added, so a document can be written out
+    (see drain) while later pages are still being produced. Objects that
+    refer to later ones reserve a number first and are added when complete.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.offsets = {}
+        self.chunks = [b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"]
+        self.position = len(self.chunks[0])
+
+    def reserve(self):
+        self.count += 1
+        return self.count
+
+    def add(self, body, number=None):
+        if number is None:
+            number = self.reserve()
+        data = f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+        self.offsets[number] = self.position
+        self.chunks.append(data)
+        self.position += len(data)
+        return number
+
+    def stream(self, data, extra="", compress=True):
+        """Add a stream object; compress=False means data is already Flate-compressed."""
+        data = zlib.compress(data, 6) if compress else data
+        extra += " /Filter /FlateDecode"
+        return self.add(f"<< /Length {len(data)}{extra} >>\nstream\n".encode("latin-1") + data + b"\nendstream")
+
+    def drain(self):
+        """The bytes serialized since the last call."""
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+    def finish(self, root, info=None):
+        """Add the cross-reference table and trailer; returns the remaining bytes."""
+        xref = self.position
+        out = [f"xref\n0 {self.count + 1}\n0000000000 65535 f \n".encode("latin-1")]
+        for number in range(1, self.count + 1):
+            out.append(f"{self.offsets[number]:010d} 00000 n \n".encode("latin-1"))
+        trailer = f"<< /Size {self.count + 1} /Root {root} 0 R"
+        if info:
+            trailer += f" /Info {info} 0 R"
+        out.append(f"trailer\n{trailer} >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+        self.chunks.extend(out)
+        return self.drain()
+
+
+def _pdf_string(text):
+    """A PDF text string (UTF-16BE with BOM) for document metadata."""
+    return "<FEFF" + text.encode("utf-16-be").hex().upper() + ">"
+
+
+class _PdfFont:
+    """One font resource: an embedded CID font or, failing that, Helvetica."""
+
+    def __init__(self, resource, font_info=None, bold=False):
+        self.resource = resource
+        self.info = font_info
+        self.bold = bold
+        self.code_points = set()
+
+    def encode(self, text):
+        """Hex string operand for Tj."""
+        if self.info is None:
+            return "<" + text.encode("cp1252", "replace").hex().upper() + ">"
+        return "<" + "".join(f"{self.info.glyph_id(ord(char)):04X}" for char in text) + ">"
+
+    def width(self, text, size):
+        if self.info is None:
+            return len(text) * _FALLBACK_ADVANCE * size
+        return self.info.text_width(text, size)
+
+    def baseline_offset(self, size):
+        """Distance from the vertical centre of a digit down to its baseline."""
+        if self.info is None:
+            return 0.36 * size
+        return self.info.cap_height / 2 * size / self.info.units_per_em
+
+    def write(self, writer):
+        if self.info is None:
+            base = "Helvetica-Bold" if self.bold else "Helvetica"
+            return writer.add(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>"
+                              .encode("latin-1"))
+
+        info = self.info
+        code_points = frozenset(code for code in self.code_points if info.has_glyph(code))
+        glyphs = sorted({info.glyph_id(code): code for code in code_points}.items())
+        font_data, length, subsetted = compressed_font_data(info.path, code_points)
+        name = info.postscript_name
+        if subsetted:
+            tag = hashlib.sha1(repr(sorted(code_points)).encode("ascii")).digest()
+            name = "".join(chr(ord("A") + byte % 26) for byte in tag[:6]) + "+" + name
+
+        scale = 1000 / info.units_per_em
+        if info.is_cff:
+            font_file = writer.stream(font_data, " /Subtype /OpenType", compress=False)
+            file_key, subtype, gid_map = "FontFile3", "CIDFontType0", ""
+        else:
+            font_file = writer.stream(font_data, f" /Length1 {length}", compress=False)
+            file_key, subtype, gid_map = "FontFile2", "CIDFontType2", " /CIDToGIDMap /Identity"
+        x_min, y_min, x_max, y_max = (round(v * scale) for v in info.bbox)
+        descriptor = writer.add(
+            (f"<< /Type /FontDescriptor /FontName /{name} /Flags 4 /FontBBox [{x_min} {y_min} {x_max} {y_max}]"
+             f" /ItalicAngle 0 /Ascent {round(info.ascent * scale)} /Descent {round(info.descent * scale)}"
+             f" /CapHeight {round(info.cap_height * scale)} /StemV 80 /{file_key} {font_file} 0 R >>").encode("latin-1")
+        )
+        widths = " ".join(f"{gid} [{round(info.advance(gid) * scale)}]" for gid, _ in [(0, None)] + glyphs)
+        cid_font = writer.add(
+            (f"<< /Type /Font /Subtype /{subtype} /BaseFont /{name}"
+             f" /CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >>"
+             f" /FontDescriptor {descriptor} 0 R /W [{widths}]{gid_map} >>").encode("latin-1")
+        )
+        to_unicode = writer.stream(_to_unicode_cmap(glyphs))
+        return writer.add(
+            (f"<< /Type /Font /Subtype /Type0 /BaseFont /{name} /Encoding /Identity-H"
+             f" /DescendantFonts [{cid_font} 0 R] /ToUnicode {to_unicode} 0 R >>").encode("latin-1")
+        )
+
+
+def _to_unicode_cmap(glyphs):
+    lines = [
+        "/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+        "1 begincodespacerange", "<0000> <FFFF>", "endcodespacerange",
+    ]
+    for start in range(0, len(glyphs), 100):
+        chunk = glyphs[start:start + 100]
+        lines.append(f"{len(chunk)} beginbfchar")
+        lines.extend(f"<{gid:04X}> <{chr(code).encode('utf-16-be').hex().upper()}>" for gid, code in chunk)
+        lines.append("endbfchar")
+    lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+    return "\n".join(lines).encode("ascii")
+
+
+def _rgb(color):
+    return " ".join(f"{c / 255:.4g}" for c in color) + " rg"
+
+
+def _pdf_fonts(used):
+    """
+    ({(font name, bold): _PdfFont}, [distinct _PdfFont]) for the code points
+    in used, with one PDF font resource per font file (or per missing font).
+    """
+    fonts = {}
+    by_file = {}
+    for (font_name, bold), code_points in sorted(used.items()):
+        path = resolve_font_file(font_name, bold, code_points)
+        key = path or (None, bold)
+        if key not in by_file:
+            by_file[key] = _PdfFont(f"F{len(by_file) + 1}", load_font(path) if path else None, bold)
+        by_file[key].code_points |= code_points
+        fonts[(font_name, bold)] = by_file[key]
+        if font_name not in _warned_fonts:
+            if path is None:
+                logger.warning("No font file found for %s; using Helvetica", font_name)
+                _warned_fonts.add(font_name)
+            elif not all(load_font(path).has_glyph(code) for code in code_points):
+                logger.warning("No installed font has all glyphs for %s; some digits will be blank", font_name)
+                _warned_fonts.add(font_name)
+    return fonts, list(by_file.values())
+
+
+def _page_ops(layout, pi_grid, start, end, fonts, title, footer):
+    """
+    Content stream operators of one page, showing rows start..end of
+    pi_grid at rows start..end of the layout's page.
+    """
+    cell_fonts = _cell_fonts()
+    cell_pdf_fonts = [fonts.get((name, False)) for name in cell_fonts] + [fonts[(MAIN_FONT, False)]]
+    title_font = fonts[(MAIN_FONT, True)]
+    footer_font = fonts[(MAIN_FONT, False)]
+    height = layout.page_height
+    ops = ["BT", _rgb(TITLE_RGB), f"/{title_font.resource} {TITLE_FONT_PT} Tf",
+           f"1 0 0 1 {(layout.page_width - title_font.width(title, TITLE_FONT_PT)) / 2:.2f} "
+           f"{height - layout.title_baseline:.2f} Tm {title_font.encode(title)} Tj"]
+
+    # Cells sorted by font and colour so each page switches font/colour rarely
+    codes = pi_grid.code_points[start:end]
+    mask = pi_grid.mask_rows(start, end)
+    font_index = np.where(pi_grid.digits[start:end] == 10, len(cell_fonts), pi_grid.script_ids[start:end])
+    rows, cols = np.indices((end - start, layout.cols)).reshape(2, -1)
+    order = np.lexsort((cols, rows, mask[rows, cols], font_index[rows, cols]))
+    current_font, current_highlight = None, None
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        font = cell_pdf_fonts[font_index[row, col]]
+        highlight = bool(mask[row, col])
+        if font is not current_font:
+            ops.append(f"/{font.resource} {layout.font_size:.2f} Tf")
+            current_font = font
+        if highlight != current_highlight:
+            ops.append(_rgb(HIGHLIGHT_RGB if highlight else TEXT_RGB))
+            current_highlight = highlight
+        char = chr(codes[row, col])
+        x, y = layout.cell_center(start + row, col)
+        x -= font.width(char, layout.font_size) / 2
+        y += font.baseline_offset(layout.font_size)
+        ops.append(f"1 0 0 1 {x:.2f} {height - y:.2f} Tm {font.encode(char)} Tj")
+
+    ops += [_rgb(TEXT_RGB), f"/{footer_font.resource} {FOOTER_FONT_PT} Tf",
+            f"1 0 0 1 {(layout.page_width - footer_font.width(footer, FOOTER_FONT_PT)) / 2:.2f} "
+            f"{height - layout.footer_baseline:.2f} Tm {footer_font.encode(footer)} Tj", "ET"]
+    return "\n".join(ops).encode("latin-1")
+
+
+def _add_page(writer, layout, pages_ref, font_refs, content):
+    return writer.add(
+        (f"<< /Type /Page /Parent {pages_ref} 0 R /MediaBox [0 0 {layout.page_width:.2f} {layout.page_height:.2f}]"
+         f" /Resources << /Font << {font_refs} >> >> /Contents {writer.stream(content)} 0 R >>").encode("latin-1")
+    )
+
+
+def _finish_pdf(writer, pages_ref, page_refs, title):
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs)
+    writer.add(f"<< /Type /Pages /Kids [{kids}] /Count {len(page_refs)} >>".encode("latin-1"), pages_ref)
+    catalog = writer.add(f"<< /Type /Catalog /Pages {pages_ref} 0 R >>".encode("latin-1"))
+    info = writer.add(f"<< /Title {_pdf_string(title)} /Producer (pi_day_indian_scripts) >>".encode("latin-1"))
+    return writer.finish(catalog, info)
+
+
+@metrics.timed("render_pdf")
+def render_pdf(pi_grid, title=DEFAULT_TITLE, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT,
+               rows_per_page=None, cell_size=None):
+    """
+    Render a PiGrid as PDF bytes.
+
+    Parameters:
+    -----------
+    pi_grid : PiGrid
+        The grid to draw
+    title : str
+        Poster title
+    left_right_margin_pt : float
+        Left and right page margin
+    rows_per_page : int or None
+        Split the grid over several pages of this many rows
+    cell_size : float or None
+        Cell size in points for large-format output (see PosterLayout)
+    """
+    layout = PosterLayout(pi_grid.rows, pi_grid.cols, left_right_margin_pt, rows_per_page, cell_size)
+
+    used = _used_text(pi_grid)
+    used.setdefault((MAIN_FONT, True), set()).update(map(ord, title))
+    used.setdefault((MAIN_FONT, False), set()).update(map(ord, layout.footer_text(0, pi_grid.total_scripts_used)
+                                                          + "0123456789"))
+    fonts, pdf_fonts = _pdf_fonts(used)
+
+    writer = _PdfWriter()
+    pages_ref = writer.reserve()
+    font_refs = " ".join(f"/{font.resource} {font.write(writer)} 0 R" for font in pdf_fonts)
+    page_refs = []
+    for page in range(layout.num_pages):
+        start, end = layout.page_rows(page)
+        footer = layout.footer_text(page, pi_grid.total_scripts_used)
+        page_refs.append(_add_page(writer, layout, pages_ref, font_refs,
+                                   _page_ops(layout, pi_grid, start, end, fonts, title, footer)))
+    return _finish_pdf(writer, pages_ref, page_refs, title)
+
+
+def iter_book_pdf(book, seed=None, title=DEFAULT_TITLE, sampling_strategy="random", script_weights=None):
+    """
+    Render a BookLayout as PDF, yielding the bytes page by page as each page
+    is generated (see book_layout.iter_book_pages), so books of any length
+    are written with one page in memory at a time.
+
+    The fonts are written first. Since every cell font carries all ten
+    digits of its script, they only need the scripts the book uses, which
+    book_script_usage counts beforehand from the script ids alone.
+    """
+    seed = resolve_seed(seed)
+    layout = book.poster_layout()
+    usage = book_layout.book_script_usage(book, seed, sampling_strategy, script_weights)
+    cell_fonts = _cell_fonts()
+    used = {(MAIN_FONT, False): {ord(".")}}
+    for script in usage:
+        used.setdefault((cell_fonts[SCRIPT_IDS[script]], False), set()).update(_DIGIT_CODE_POINTS[SCRIPT_IDS[script]])
+    used.setdefault((MAIN_FONT, True), set()).update(map(ord, title))
+    used[(MAIN_FONT, False)].update(map(ord, layout.footer_text(0, len(usage)) + "0123456789"))
+    fonts, pdf_fonts = _pdf_fonts(used)
+
+    writer = _PdfWriter()
+    pages_ref = writer.reserve()
+    font_refs = " ".join(f"/{font.resource} {font.write(writer)} 0 R" for font in pdf_fonts)
+    yield writer.drain()
+    page_refs = []
+    for page, page_grid in book_layout.iter_book_pages(book, seed, sampling_strategy, script_weights):
+        footer = layout.footer_text(page, len(usage))
+        page_refs.append(_add_page(writer, layout, pages_ref, font_refs,
+                                   _page_ops(layout, page_grid, 0, page_grid.rows, fonts, title, footer)))
+        yield writer.drain()
+    yield _finish_pdf(writer, pages_ref, page_refs, title)
+
+
+@metrics.timed("render_svg")
+def render_svg(pi_grid, title=DEFAULT_TITLE, left_right_margin_pt=LEFT_RIGHT_MARGIN_PT,
+               rows_per_page=None, cell_size=None, page=0):
+    """
+    Render one page of a PiGrid as an SVG document (see render_pdf for the
+    parameters). Digits reference their script's font by family name.
+    """
+    layout = PosterLayout(pi_grid.rows, pi_grid.cols, left_right_margin_pt, rows_per_page, cell_size)
+    start, end = layout.page_rows(page)
+    fonts = _cell_fonts()
+    width, height = layout.page_width, layout.page_height
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.2f}pt" height="{height:.2f}pt" '
+        f'viewBox="0 0 {width:.2f} {height:.2f}">',
+        "<style>",
+        "text{text-anchor:middle;dominant-baseline:central}",
+        f".t{{font-family:'{MAIN_FONT}',sans-serif;font-weight:bold;font-size:{TITLE_FONT_PT}px;"
+        f"fill:rgb{TITLE_RGB}}}",
+        f".f{{font-family:'{MAIN_FONT}',sans-serif;font-size:{FOOTER_FONT_PT}px}}",
+        f".h{{fill:rgb{HIGHLIGHT_RGB}}}",
+        f".p{{font-family:'{MAIN_FONT}',sans-serif}}",
+    ]
+    out += [f".s{i}{{font-family:'{font}',sans-serif}}" for i, font in enumerate(fonts)]
+    out += [
+        "</style>",
+        '<rect width="100%" height="100%" fill="white"/>',
+        f'<text class="t" x="{width / 2:.2f}" y="{layout.title_baseline:.2f}" '
+        f'style="dominant-baseline:alphabetic">{escape(title)}</text>',
+        f'<g font-size="{layout.font_size:.2f}" fill="rgb{TEXT_RGB}">',
+    ]
+
+    codes = pi_grid.code_points[start:end].tolist()
+    script_ids = pi_grid.script_ids[start:end].tolist()
+    digits = pi_grid.digits[start:end].tolist()
+    mask = pi_grid.mask[start:end].tolist()
+    for r, (code_row, script_row, digit_row, mask_row) in enumerate(zip(codes, script_ids, digits, mask)):
+        for c, (code, script_id, digit, highlight) in enumerate(zip(code_row, script_row, digit_row, mask_row)):
+            x, y = layout.cell_center(start + r, c)
+            cls = "p" if digit == 10 else f"s{script_id}"
+            if highlight:
+                cls += " h"
+            out.append(f'<text class="{cls}" x="{x:.2f}" y="{y:.2f}">{escape(chr(code))}</text>')
+
+    footer = layout.footer_text(page, pi_grid.total_scripts_used)
+    out += [
+        "</g>",
+        f'<text class="f" x="{width / 2:.2f}" y="{layout.footer_baseline:.2f}" '
+        f'style="dominant-baseline:alphabetic">{escape(footer)}</text>',
+        "</svg>",
+    ]
+    return "\n".join(out)
@@ -0,0 +1,164 @@
+"""
+Compact encodings of a PiGrid for /generate_pi_data.
+
+- "legacy": the per-cell object JSON (see pi_data.json).
+- "compact": columnar JSON. The digits are one ASCII string, script ids one
+  character per cell indexing a script table, and the highlight mask a list
+  of (start, length) runs over the row-major cell index.
+- "binary": a raw typed-array body (see encode_binary).
+- "msgpack": the compact object as MessagePack, with the digit, script-id
+  and mask columns as raw bytes (requires the optional msgpack package).
+"""
+import json
+import struct
+import numpy as np
+
+from numeral_scripts import NUMERAL_SCRIPTS, SCRIPT_NAMES
+from pi_grid import PiGrid
+from response_cache import ALGORITHM_VERSION
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+COMPACT_VERSION = "compact-v1"
+BINARY_MAGIC = b"PIG1"
+
+# One character per script id in the compact "script_ids" string
+SCRIPT_ID_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+MIME_TYPES = {
+    "legacy": "application/json",
+    "compact": "application/vnd.pi-grid.compact+json",
+    "binary": "application/vnd.pi-grid.binary",
+    "msgpack": "application/msgpack",
+}
+
+# Digit value -> ASCII character, with the decimal point as "."
+_DIGIT_CHARS = np.frombuffer(b"0123456789.", dtype=np.uint8)
+
+
+def negotiate_format(requested=None, accept=None):
+    """
+    Pick the response format from an explicit ?format= value or, failing
+    that, the Accept header. Defaults to "legacy".
+    """
+    if requested:
+        requested = requested.lower()
+        if requested not in MIME_TYPES:
+            raise ValueError(f"Unknown format: {requested}")
+        if requested == "msgpack" and msgpack is None:
+            raise ValueError("The msgpack format requires the msgpack package")
+        return requested
+    if accept:
+        for name in ("compact", "binary", "msgpack"):
+            if MIME_TYPES[name] in accept and (name != "msgpack" or msgpack is not None):
+                return name
+        if "application/octet-stream" in accept:
+            return "binary"
+    return "legacy"
+
+
+def highlight_runs(mask):
+    """(start, length) pairs, flattened, for each run of highlighted cells in row-major order."""
+    flat = np.concatenate(([0], np.asarray(mask, dtype=np.int8).ravel(), [0]))
+    edges = np.diff(flat)
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    return np.column_stack((starts, lengths)).ravel().tolist()
+
+
+def _metadata(pi_grid, num_digits, seed):
+    script_usage = pi_grid.script_usage
+    return {
+        "format": COMPACT_VERSION,
+        "rows": pi_grid.rows,
+        "cols": pi_grid.cols,
+        "num_digits": num_digits if num_digits is not None else pi_grid.rows * pi_grid.cols,
+        "seed": seed if seed is not None else pi_grid.seed,
+        "sampling_strategy": pi_grid.sampling_strategy,
+        # Lets clients refer back to the grid by seed (see server.requested_grid)
+        "algorithm_version": ALGORITHM_VERSION,
+        "scripts": SCRIPT_NAMES,
+        "script_zero_code_points": [NUMERAL_SCRIPTS[script] for script in SCRIPT_NAMES],
+        "script_usage": script_usage,
+        "total_scripts_used": len(script_usage),
+    }
+
+
+def compact_data(pi_grid, num_digits=None, seed=None):
+    """Columnar data object for the "compact" format."""
+    data = _metadata(pi_grid, num_digits, seed)
+    data["digits"] = _DIGIT_CHARS[pi_grid.digits.ravel()].tobytes().decode("ascii")
+    alphabet = np.frombuffer(SCRIPT_ID_ALPHABET.encode("ascii"), dtype=np.uint8)
+    data["script_ids"] = alphabet[pi_grid.script_ids.ravel()].tobytes().decode("ascii")
+    data["highlight_runs"] = highlight_runs(pi_grid.mask)
+    return data
+
+
+def encode_binary(pi_grid, num_digits=None, seed=None):
+    """
+    Raw typed-array encoding:
+
+        4 bytes   magic "PIG1"
+        uint32    length of the JSON header (little-endian)
+        header    UTF-8 JSON with the compact metadata
+        n bytes   digit values (0-9, 10 for the decimal point), row-major
+        n bytes   script ids, row-major
+        n/8 bytes highlight mask, bit-packed most significant bit first
+    """
+    header = json.dumps(_metadata(pi_grid, num_digits, seed), separators=(",", ":")).encode("utf-8")
+    mask_bits = np.packbits(pi_grid.mask.ravel())
+    return b"".join([
+        BINARY_MAGIC,
+        struct.pack("<I", len(header)),
+        header,
+        pi_grid.digits.tobytes(),
+        pi_grid.script_ids.tobytes(),
+        mask_bits.tobytes(),
+    ])
+
+
+def decode_binary(body):
+    """Inverse of encode_binary; returns (PiGrid, header dict)."""
+    if body[:4] != BINARY_MAGIC:
+        raise ValueError("Not a binary pi grid body")
+    (header_len,) = struct.unpack_from("<I", body, 4)
+    header = json.loads(body[8:8 + header_len].decode("utf-8"))
+    rows, cols = header["rows"], header["cols"]
+    n = rows * cols
+    offset = 8 + header_len
+    digits = np.frombuffer(body, dtype=np.uint8, count=n, offset=offset).reshape(rows, cols)
+    script_ids = np.frombuffer(body, dtype=np.uint8, count=n, offset=offset + n).reshape(rows, cols)
+    mask_bits = np.frombuffer(body, dtype=np.uint8, offset=offset + 2 * n)
+    mask = np.unpackbits(mask_bits, count=n).reshape(rows, cols).astype(bool)
+    return PiGrid(digits, script_ids, mask, header["seed"], header["sampling_strategy"]), header
+
+
+def encode_msgpack(pi_grid, num_digits=None, seed=None):
+    """The compact object as MessagePack, with the columns as raw bytes."""
+    data = _metadata(pi_grid, num_digits, seed)
+    data["digits"] = pi_grid.digits.tobytes()
+    data["script_ids"] = pi_grid.script_ids.tobytes()
+    data["highlight"] = np.packbits(pi_grid.mask.ravel()).tobytes()
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def encode(pi_grid, fmt, num_digits=None, seed=None):
+    """
+    Serialize pi_grid in the given format. Returns (body, mimetype); the
+    legacy format is returned as a dict for the caller to jsonify.
+    """
+    if fmt == "compact":
+        body = json.dumps(compact_data(pi_grid, num_digits, seed), separators=(",", ":"))
+    elif fmt == "binary":
+        body = encode_binary(pi_grid, num_digits, seed)
+    elif fmt == "msgpack":
+        body = encode_msgpack(pi_grid, num_digits, seed)
+    else:
+        data = pi_grid.to_dict(num_digits)
+        if seed is not None:
+            data["seed"] = seed
+        return data, MIME_TYPES["legacy"]
+    return body, MIME_TYPES[fmt]